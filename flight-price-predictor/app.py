@@ -1,46 +1,156 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-import pandas as pd
-import joblib
+import numpy as np
 import logging
 import os
+import threading
 from datetime import datetime, timedelta
 import random
+from serving.features import (FEATURE_ORDER, NUMERIC_FIELDS, CATEGORY_BLOCKS, CATEGORY_COLUMNS, TIME_SLOTS,
+                               TIME_SLOT_CODES, FeatureEncoder, days_until, is_compact)
+from serving.cache import create_prediction_cache
+from serving.metrics import Metrics
+from serving.price_history import CITY_CODES, DEFAULT_DB_PATH, open_price_history
+from serving.registry import ModelBundle, ModelRegistry, RegistryWatcher, ShadowRecorder
+from serving.route_search import RouteGrid
 
 app = Flask(__name__)
 CORS(app)
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper())
 logger = logging.getLogger(__name__)
 
-# Load model - using more robust path handling
-MODEL_PATH = os.path.join(os.path.dirname(__file__), 'models', 'xgboost_model.pkl')
+# Request payloads and predictions are only logged for a sampled fraction of
+# requests, and only when LOG_LEVEL=DEBUG, so the hot path skips the formatting
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0.01))
 
-try:
-    if os.path.exists(MODEL_PATH):
-        model = joblib.load(MODEL_PATH)
-        logger.info("Model loaded successfully from: %s", MODEL_PATH)
-    else:
-        logger.error("Model file not found at: %s", MODEL_PATH)
-        raise FileNotFoundError(f"Model file not found at: {MODEL_PATH}")
-except Exception as e:
-    logger.error(f"Model loading failed: {str(e)}")
-    raise
-
-FEATURE_ORDER = [
-    'duration', 'days_left', 'departure_time', 'arrival_time',
-    'airline_AirAsia', 'airline_Air_India', 'airline_GO_FIRST',
-    'airline_Indigo', 'airline_SpiceJet', 'airline_Vistara',
-    'source_city_Bangalore', 'source_city_Chennai', 'source_city_Delhi',
-    'source_city_Hyderabad', 'source_city_Kolkata', 'source_city_Mumbai',
-    'destination_city_Bangalore', 'destination_city_Chennai',
-    'destination_city_Delhi', 'destination_city_Hyderabad',
-    'destination_city_Kolkata', 'destination_city_Mumbai',
-    'class_Business', 'class_Economy', 
-    'stops_one', 'stops_two_or_more', 'stops_zero'
-]
+# Per-stage latency histograms and counters served at /metrics
+metrics = Metrics()
+
+def trace_sampled() -> bool:
+    return logger.isEnabledFor(logging.DEBUG) and random.random() < TRACE_SAMPLE_RATE
+
+# Load model - using more robust path handling. The native .ubj export is
+# preferred; the legacy pickle is only used when it is missing.
+MODEL_DIR = os.path.join(os.path.dirname(__file__), 'models')
+MODEL_PATH = os.environ.get('MODEL_PATH', os.path.join(MODEL_DIR, 'xgboost_model.ubj'))
+if not os.path.exists(MODEL_PATH) and 'MODEL_PATH' not in os.environ:
+    MODEL_PATH = os.path.join(MODEL_DIR, 'xgboost_model.pkl')
+
+# With LAZY_MODEL_LOAD=1 the model is loaded on the first request instead of
+# at import. Keep it off under gunicorn --preload so workers share the pages.
+LAZY_MODEL_LOAD = os.environ.get('LAZY_MODEL_LOAD', '0') == '1'
+_model_lock = threading.Lock()
+
+# Inference engine: 'xgboost', 'numpy' (serving/tree_engine.py) or 'auto',
+# which sends batches of up to NUMPY_ENGINE_MAX_ROWS rows to the NumPy engine
+INFERENCE_ENGINE = os.environ.get('INFERENCE_ENGINE', 'auto')
+NUMPY_ENGINE_MAX_ROWS = int(os.environ.get('NUMPY_ENGINE_MAX_ROWS', 16))
+
+# FAST_STARTUP=1 serves registry versions from their pre-flattened NumPy forest
+# and loads the XGBoost model (and with it scikit-learn, SciPy and pandas) only
+# when something needs it. With INFERENCE_ENGINE=numpy as well, requests never do.
+FAST_STARTUP = os.environ.get('FAST_STARTUP', '0') == '1'
+
+# Threads each process's XGBoost model may use (0: every core). gunicorn.conf.py
+# sets it from the worker plan in serving/workers.py so workers do not oversubscribe.
+MODEL_THREADS = int(os.environ.get('MODEL_THREADS', 0))
+
+# Optional precomputed lookup table (see serving/fare_table.py); rows it
+# cannot answer fall back to the live model. A fare_table.npy inside a
+# registry version directory takes precedence for that version. The table is
+# only used when its largest validated error against the model (in rupees) is
+# within FARE_TABLE_TOLERANCE.
+FARE_TABLE_PATH = os.environ.get('FARE_TABLE_PATH', os.path.join(os.path.dirname(__file__), 'models', 'fare_table.npy'))
+FARE_TABLE_TOLERANCE = float(os.environ.get('FARE_TABLE_TOLERANCE', 500))
+USE_FARE_TABLE = True
+
+# Versioned model registry (see serving/registry.py). When it has a CURRENT
+# version that is served instead of MODEL_PATH, and a background thread
+# hot-swaps to whatever CURRENT points at (MODEL_RELOAD_INTERVAL=0 disables
+# polling; POST /admin/reload still works). Requests keep the bundle they
+# started with, so in-flight requests finish on the old model.
+MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR', os.path.join(MODEL_DIR, 'registry'))
+MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', 2.0))
+# Fraction of requests also scored (in the background) by the SHADOW version
+SHADOW_SAMPLE_RATE = float(os.environ.get('SHADOW_SAMPLE_RATE', 1.0))
+# Required in X-Admin-Token for /admin/reload; without it only localhost may reload
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+bundle = None
+shadow_bundle = None
+shadow_recorder = ShadowRecorder()
+
+def load_bundle(model_path: str, version: str = None) -> ModelBundle:
+    if not os.path.exists(model_path):
+        logger.error("Model file not found at: %s", model_path)
+        raise FileNotFoundError(f"Model file not found at: {model_path}")
+    loaded = ModelBundle.load(model_path, version, use_forest=INFERENCE_ENGINE != 'xgboost',
+                              fare_table_path=FARE_TABLE_PATH, fare_table_tolerance=FARE_TABLE_TOLERANCE,
+                              nthread=MODEL_THREADS, lazy_model=FAST_STARTUP)
+    logger.info("Model %s loaded successfully from: %s", loaded.version, model_path)
+    return loaded
+
+def _swap_bundle(new_bundle: ModelBundle) -> None:
+    # A single reference assignment: requests already holding the old bundle keep it
+    global bundle
+    bundle = new_bundle
+
+def _swap_shadow(new_shadow) -> None:
+    global shadow_bundle
+    shadow_recorder.reset(new_shadow.version if new_shadow is not None else None)
+    shadow_bundle = new_shadow
+
+registry = ModelRegistry(MODEL_REGISTRY_DIR)
+watcher = RegistryWatcher(registry, load_bundle, _swap_bundle, _swap_shadow, MODEL_RELOAD_INTERVAL)
+
+def current_bundle() -> ModelBundle:
+    """Return the bundle serving requests right now, loading it on first use."""
+    if bundle is None:
+        with _model_lock:
+            if bundle is None:
+                try:
+                    # Registry CURRENT if there is one, the single MODEL_PATH file otherwise
+                    if not watcher.check():
+                        _swap_bundle(load_bundle(MODEL_PATH))
+                except Exception as e:
+                    logger.error(f"Model loading failed: {str(e)}")
+                    raise
+    if MODEL_RELOAD_INTERVAL > 0:
+        watcher.ensure_running()
+    return bundle
+
+def get_model():
+    """Return the loaded model, loading it on first use."""
+    return current_bundle().model
+
+if not LAZY_MODEL_LOAD:
+    current_bundle()
+
+encoder = FeatureEncoder()
+
+# Prediction cache keyed on the encoded feature vector and model version (size 0 disables it)
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 10000))
+PREDICTION_CACHE_TTL = float(os.environ['PREDICTION_CACHE_TTL']) if os.environ.get('PREDICTION_CACHE_TTL') else None
+PREDICTION_CACHE_SOCKET = os.environ.get('PREDICTION_CACHE_SOCKET')
+prediction_cache = create_prediction_cache(
+    PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL, PREDICTION_CACHE_SOCKET, MODEL_PATH
+)
+
+# Observed fares (see serving/price_history.py) behind /predict_trend's history
+PRICE_HISTORY_DB = os.environ.get('PRICE_HISTORY_DB', DEFAULT_DB_PATH)
+HISTORY_DAYS = int(os.environ.get('HISTORY_DAYS', 30))
+price_history = None
+
+DAYS_LEFT_COLUMN = FEATURE_ORDER.index('days_left')
+
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 1000))
+MAX_FORECAST_DAYS = int(os.environ.get('MAX_FORECAST_DAYS', 120))
+MAX_SEARCH_RESULTS = int(os.environ.get('MAX_SEARCH_RESULTS', 50))
 
 def validate_input(data: dict) -> None:
     """Enhanced validation for all required fields"""
+    if is_compact(data):
+        return validate_compact_input(data)
     required_numeric = ['days_left', 'duration', 'departure_time', 'arrival_time']
     for field in required_numeric:
         if field not in data:
@@ -64,8 +174,47 @@ def validate_input(data: dict) -> None:
         if not any(data.get(key) == 1 for key in matching_keys):
             raise ValueError(f"Exactly one {category} must be selected (set to 1)")
 
-def preprocess_input(data: dict) -> pd.DataFrame:
-    """Create feature array in exact order expected by model."""
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def validate_compact_input(data: dict) -> None:
+    """Validate a v2 request, e.g. {"airline": "Indigo", "source_city": "Delhi", ...,
+    "departure_time": "Morning", "duration": 2.5, "departure_date": "2025-03-01"}.
+
+    Each category is one lookup in CATEGORY_COLUMNS. Time slots may be names
+    or numeric codes; days_left is optional when departure_date is given.
+    """
+    for category, columns in CATEGORY_COLUMNS.items():
+        value = data.get(category)
+        if value is None:
+            raise ValueError(f"Missing required field: {category}")
+        if not isinstance(value, str) or value not in columns:
+            raise ValueError(f"Unknown {category}: {value!r}. Expected one of {list(columns)}")
+    for field in ('duration', 'departure_time', 'arrival_time'):
+        value = data.get(field)
+        if value is None:
+            raise ValueError(f"Missing required field: {field}")
+        if isinstance(value, str) and field != 'duration':
+            if value not in TIME_SLOT_CODES:
+                raise ValueError(f"Unknown {field}: {value!r}. Expected one of {TIME_SLOTS}")
+        elif not _is_number(value):
+            raise ValueError(f"{field} must be numeric")
+    if 'days_left' in data:
+        if not _is_number(data['days_left']):
+            raise ValueError("days_left must be numeric")
+    elif 'departure_date' in data:
+        days_until(data['departure_date'])
+    else:
+        raise ValueError("Missing required field: departure_date (or days_left)")
+
+def preprocess_input(data: dict) -> 'pandas.DataFrame':
+    """Create feature array in exact order expected by model.
+
+    Kept for callers that want a DataFrame; request handlers use FeatureEncoder,
+    so pandas is only imported here.
+    """
+    import pandas as pd
+
     features = {feature: 0 for feature in FEATURE_ORDER}
     
     # Set numeric values
@@ -78,125 +227,519 @@ def preprocess_input(data: dict) -> pd.DataFrame:
         if feature in data:
             features[feature] = int(data[feature])
 
-    logger.info("Final feature vector: %s", features)
+    if trace_sampled():
+        logger.debug("Final feature vector: %s", features)
     return pd.DataFrame([features], columns=FEATURE_ORDER)
 
-def generate_historical_data(base_price, departure_date, days=30):
-    history = []
+def _as_number(value) -> float:
+    """Return value as a float, or NaN when it is not a JSON number."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    return np.nan
 
-    for i in range(days, 0, -1):
-        historical_date = departure_date - timedelta(days=i)
+def build_feature_matrix(items: list) -> np.ndarray:
+    """Build one contiguous float32 matrix (len(items) x 27) in FEATURE_ORDER.
 
-        # Fluctuation: ±1500 randomly around base_price
-        fluctuation = random.randint(-1500, 1500)
-        historical_price = base_price + fluctuation
+    Missing or non-numeric fields are left as NaN so validate_batch can
+    report them; non-dict items become an all-NaN row.
+    """
+    rows = [
+        [_as_number(item.get(feature)) for feature in FEATURE_ORDER]
+        if isinstance(item, dict) else [np.nan] * len(FEATURE_ORDER)
+        for item in items
+    ]
+    return np.array(rows, dtype=np.float32).reshape(len(items), len(FEATURE_ORDER))
 
-        history.append({
-            'date': historical_date.strftime('%Y-%m-%d'),
-            'price': round(historical_price, 2)
-        })
+def validate_batch(items: list, matrix: np.ndarray) -> list:
+    """Vectorized equivalent of validate_input over a whole feature matrix.
 
-    return history
+    Returns one error message per item (None for valid items). Valid rows
+    have their unset one-hot columns zeroed in place, matching preprocess_input;
+    valid v2 items are encoded into their rows.
+    """
+    errors = [None] * len(items)
 
+    def flag(mask, message):
+        for i in np.flatnonzero(mask):
+            if errors[i] is None:
+                errors[i] = message
 
-def predict_future_prices(data: dict, days_ahead: int = 10) -> list:
-    """Predict prices for future dates using the model, ensuring correct days_left adjustment."""
-    forecast = []
-    
-    # Get the user-selected departure date
-    departure_date = datetime.strptime(data.get('departure_date', datetime.now().strftime('%Y-%m-%d')), '%Y-%m-%d')
+    flag(np.array([not isinstance(item, dict) for item in items], dtype=bool),
+         "Each itinerary must be a JSON object")
+
+    # Numeric fields: tell "missing" apart from "not a number"
+    for field in NUMERIC_FIELDS:
+        column = matrix[:, FEATURE_ORDER.index(field)]
+        present = np.array([isinstance(item, dict) and field in item for item in items], dtype=bool)
+        flag(~present, f"Missing required field: {field}")
+        flag(present & np.isnan(column), f"{field} must be numeric")
+
+    # One-hot blocks: at least one key present and one of them set to 1
+    for category, start, stop in CATEGORY_BLOCKS:
+        block = matrix[:, start:stop]
+        flag(np.isnan(block).all(axis=1),
+             f"No {category} features found. At least one {category} feature must be set.")
+        flag(~(block == 1).any(axis=1), f"Exactly one {category} must be selected (set to 1)")
+
+    # Same int() truncation preprocess_input applies to one-hot values
+    onehot = matrix[:, 4:]
+    onehot[np.isnan(onehot)] = 0
+    np.trunc(onehot, out=onehot)
+
+    # v2 items are validated and encoded one at a time; both are table lookups
+    for i, item in enumerate(items):
+        if isinstance(item, dict) and is_compact(item):
+            try:
+                validate_compact_input(item)
+                encoder.encode(item, matrix[i:i + 1])
+                errors[i] = None
+            except ValueError as e:
+                errors[i] = str(e)
+    return errors
+
+def model_predict(matrix: np.ndarray, active: ModelBundle = None) -> np.ndarray:
+    """Run the model, using the NumPy forest engine where it is faster."""
+    active = active or current_bundle()
+    if active.forest is not None and (INFERENCE_ENGINE == 'numpy' or len(matrix) <= NUMPY_ENGINE_MAX_ROWS):
+        return active.forest.predict(matrix)
+    return active.predict(matrix)
+
+def score_uncached(matrix: np.ndarray, active: ModelBundle = None) -> np.ndarray:
+    """Price encoded rows, answering from the fare table where possible."""
+    active = active or current_bundle()
+    if active.fare_table is None or not USE_FARE_TABLE:
+        return model_predict(matrix, active)
+    prices = active.fare_table.lookup_many(matrix)
+    missing = np.isnan(prices)
+    if missing.any():
+        prices[missing] = model_predict(matrix[missing], active)
+    return prices
+
+def score_rows(matrix: np.ndarray, active: ModelBundle = None) -> np.ndarray:
+    """Price encoded rows, serving repeats from the prediction cache."""
+    active = active or current_bundle()
+    shadow = shadow_bundle
+    if shadow is not None and len(matrix) and random.random() < SHADOW_SAMPLE_RATE:
+        shadow_recorder.submit(active, shadow, matrix)
+    if prediction_cache is None:
+        return score_uncached(matrix, active)
+    keys = [prediction_cache.key(row, active.version) for row in matrix]
+    cached = prediction_cache.get_many(keys)
+    missing = [i for i, price in enumerate(cached) if price is None]
+    prices = np.array([np.nan if price is None else price for price in cached])
+    if missing:
+        computed = score_uncached(matrix[missing], active)
+        prices[missing] = computed
+        prediction_cache.put_many([keys[i] for i in missing], computed)
+    return prices
+
+def parse_days_ahead(data: dict, default: int = 10) -> int:
+    """Read the optional forecast horizon from a request, bounded by MAX_FORECAST_DAYS."""
+    days_ahead = data.get('days_ahead', default)
+    if isinstance(days_ahead, bool) or not isinstance(days_ahead, int):
+        raise ValueError("days_ahead must be an integer")
+    if not 1 <= days_ahead <= MAX_FORECAST_DAYS:
+        raise ValueError(f"days_ahead must be between 1 and {MAX_FORECAST_DAYS}")
+    return days_ahead
+
+def build_forecast_matrix(row: np.ndarray, departure_date: datetime, days_ahead: int):
+    """Repeat one encoded row over the horizon, varying only the days_left column.
+
+    Returns the forecast dates and a (days_ahead x 27) float32 matrix.
+    """
     today = datetime.now()
+    future_dates = [departure_date + timedelta(days=day) for day in range(1, days_ahead + 1)]
+    matrix = np.repeat(row.reshape(1, -1).astype(np.float32), days_ahead, axis=0)
+    matrix[:, DAYS_LEFT_COLUMN] = [(future_date - today).days for future_date in future_dates]
+    return future_dates, matrix
 
-    # Ensure days_left is calculated from departure_date
-    base_days_left = (departure_date - today).days
-    data['days_left'] = base_days_left
-
-    for day in range(1, days_ahead + 1):
-        future_date = departure_date + timedelta(days=day)
-        data['days_left'] = (future_date - today).days  # Correct days_left adjustment
-        
-        processed_data = preprocess_input(data)
-        predicted_price = float(model.predict(processed_data)[0])
-        
-        forecast.append({
-            'date': future_date.strftime('%Y-%m-%d'),
-            'price': round(predicted_price, 2)
-        })
+def format_forecast(future_dates: list, prices) -> list:
+    return [
+        {'date': future_date.strftime('%Y-%m-%d'), 'price': round(float(price), 2)}
+        for future_date, price in zip(future_dates, prices)
+    ]
+
+def build_trend_matrix(data: dict, out: np.ndarray = None):
+    """Rows to score for a validated /predict_trend request.
+
+    Row 0 is the requested itinerary (the same prediction /predict returns),
+    followed by the forecast horizon, so everything is scored in one call.
+    Pass `out` when the encoded row has to outlive the request thread.
+    """
+    days_ahead = parse_days_ahead(data)
+    departure_date = datetime.strptime(data.get('departure_date', datetime.now().strftime('%Y-%m-%d')), '%Y-%m-%d')
+    row = encoder.encode(data, out)
+    future_dates, horizon = build_forecast_matrix(row, departure_date, days_ahead)
+    return future_dates, np.vstack([row, horizon])
+
+def selected_category(data: dict, prefix: str):
+    """Value of the one-hot field set to 1 under `prefix`, e.g. 'Delhi' for source_city_."""
+    value = data.get(prefix[:-1])
+    if isinstance(value, str):
+        return value
+    return next((key[len(prefix):] for key, value in data.items() if key.startswith(prefix) and value == 1), None)
+
+def get_price_history():
+    """The observed-fare store, opened once its database exists."""
+    global price_history
+    if price_history is None and os.path.exists(PRICE_HISTORY_DB):
+        price_history = open_price_history(PRICE_HISTORY_DB)
+    return price_history
+
+def historical_prices(data: dict, days: int = HISTORY_DAYS) -> list:
+    """Daily median/min/max observed fares for the request's route over the last `days` days."""
+    store = get_price_history()
+    if store is None:
+        return []
+    origin = CITY_CODES.get(selected_category(data, 'source_city_'))
+    destination = CITY_CODES.get(selected_category(data, 'destination_city_'))
+    if origin is None or destination is None:
+        return []
+    today = datetime.now().date()
+    return store.route_history(origin, destination, today - timedelta(days=days), today - timedelta(days=1),
+                               selected_category(data, 'airline_'), selected_category(data, 'class_'))
+
+def trend_response(future_dates: list, prices, model_version: str, historical: list) -> dict:
+    return {
+        'historical': historical,
+        'forecast': format_forecast(future_dates, prices[1:]),
+        'model_version': model_version,
+        'status': 'success'
+    }
 
-    return forecast
+def _bounded_int(data: dict, field: str, default: int, low: int, high: int) -> int:
+    value = data.get(field, default)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"{field} must be an integer")
+    if not low <= value <= high:
+        raise ValueError(f"{field} must be between {low} and {high}")
+    return value
 
+def _search_filter(data: dict, field: str, allowed: list) -> list:
+    """A /search_cheapest filter: one name, a list of names, or absent for all of `allowed`."""
+    value = data.get(field)
+    if value is None:
+        return list(allowed)
+    names = [value] if isinstance(value, str) else value
+    if not isinstance(names, list) or not names or any(name not in allowed for name in names):
+        raise ValueError(f"{field} must be one of {allowed} or a non-empty list of them")
+    return [name for name in allowed if name in names]
+
+def build_route_grid(data: dict):
+    """Validate a /search_cheapest request into the RouteGrid to price, its first date and top_k."""
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object")
+    choices = {category: [feature[len(category) + 1:] for feature in FEATURE_ORDER[start:stop]]
+               for category, start, stop in CATEGORY_BLOCKS}
+    for field in ('source_city', 'destination_city'):
+        if not isinstance(data.get(field), str):
+            raise ValueError(f"Missing required field: {field}")
+    source, destination = (_search_filter(data, field, choices[field])[0]
+                           for field in ('source_city', 'destination_city'))
+    if source == destination:
+        raise ValueError("source_city and destination_city must differ")
+
+    today = datetime.now().date()
+    try:
+        start_date = (datetime.strptime(data['start_date'], '%Y-%m-%d').date() if 'start_date' in data
+                      else today + timedelta(days=1))
+    except (TypeError, ValueError):
+        raise ValueError("start_date must be a YYYY-MM-DD string")
+    if start_date <= today:
+        raise ValueError("start_date must be after today")
+    window_days = _bounded_int(data, 'window_days', 60, 1, MAX_FORECAST_DAYS)
+    top_k = _bounded_int(data, 'top_k', 10, 1, MAX_SEARCH_RESULTS)
+
+    stops = _search_filter(data, 'stops', choices['stops'])
+    durations = None
+    if 'duration' in data:
+        duration = data['duration']
+        if isinstance(duration, bool) or not isinstance(duration, (int, float)) or duration <= 0:
+            raise ValueError("duration must be a positive number of hours")
+        durations = [duration] * len(stops)
+
+    first_day = (start_date - today).days
+    grid = RouteGrid(source, destination,
+                     _search_filter(data, 'airline', choices['airline']),
+                     _search_filter(data, 'class', choices['class']),
+                     stops,
+                     [TIME_SLOTS.index(slot) for slot in _search_filter(data, 'departure_time', TIME_SLOTS)],
+                     [TIME_SLOTS.index(slot) for slot in _search_filter(data, 'arrival_time', TIME_SLOTS)],
+                     np.arange(first_day, first_day + window_days), durations)
+    return grid, start_date, top_k
+
+def price_grid(grid: RouteGrid, active: ModelBundle) -> np.ndarray:
+    """Approximate prices for every cell of a search grid."""
+    if active.categorical is not None:
+        # Leaf boxes need numeric splits; categorical models score every cell
+        return model_predict(grid.rows(np.arange(grid.size)), active).reshape(grid.shape)
+    return grid.price(active.leaf_boxes())
+
+def search_response(grid: RouteGrid, start_date, top_k: int, cheapest, prices, model_version: str) -> dict:
+    """Exactly rescored prices for the candidate cells, reordered, plus the cheapest fare per date."""
+    def option(index, price):
+        itinerary = grid.describe(index)
+        itinerary['date'] = (start_date + timedelta(days=itinerary.pop('date_index'))).strftime('%Y-%m-%d')
+        itinerary['price'] = round(float(price), 2)
+        return itinerary
+
+    ranked = sorted(zip(prices[:len(cheapest)].tolist(), cheapest.tolist()))[:top_k]
+    return {
+        'options': [option(index, price) for price, index in ranked],
+        'calendar': [{'date': (start_date + timedelta(days=day)).strftime('%Y-%m-%d'), 'price': round(float(price), 2)}
+                     for day, price in enumerate(prices[len(cheapest):])],
+        'searched': grid.size,
+        'currency': '₹',
+        'model_version': model_version,
+        'status': 'success'
+    }
 
 
 @app.route('/predict', methods=['POST'])
 def predict():
+    timer = metrics.timer('predict')
     try:
         data = request.json
-        logger.info(f"Received prediction request with data: {data}")
-        
+        timer.mark('parse')
+        traced = trace_sampled()
+        if traced:
+            logger.debug("Received prediction request with data: %s", data)
+
         validate_input(data)
-        processed_data = preprocess_input(data)
-        prediction = model.predict(processed_data)
-        logger.info(f"Predicted price: {prediction[0]}")
-        
-        return jsonify({
+        timer.mark('validate')
+        row = encoder.encode(data)
+        timer.mark('preprocess')
+        active = current_bundle()
+        prediction = score_rows(row, active)
+        timer.mark('predict')
+        if traced:
+            logger.debug("Predicted price: %s", prediction[0])
+
+        response = jsonify({
             'price': round(float(prediction[0]), 2),
             'currency': '₹',
+            'model_version': active.version,
             'status': 'success'
         })
-        
+        timer.mark('serialize')
+        timer.finish()
+        return response
+
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
+        metrics.count_error('predict', e)
+        timer.finish(400)
         return jsonify({'error': str(e), 'status': 'error'}), 400
     except Exception as e:
         logger.error(f"Prediction failed: {str(e)}", exc_info=True)
+        metrics.count_error('predict', e)
+        timer.finish(500)
+        return jsonify({'error': str(e), 'status': 'error'}), 500
+
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    timer = metrics.timer('predict_batch')
+    try:
+        items = request.json
+        timer.mark('parse')
+        if not isinstance(items, list):
+            raise ValueError("Request body must be a JSON array of itineraries")
+        if len(items) > MAX_BATCH_SIZE:
+            raise ValueError(f"Batch too large: {len(items)} itineraries (max {MAX_BATCH_SIZE})")
+        if trace_sampled():
+            logger.debug("Received batch prediction request with %d itineraries", len(items))
+
+        matrix = build_feature_matrix(items)
+        timer.mark('preprocess')
+        errors = validate_batch(items, matrix)
+        valid = np.array([error is None for error in errors], dtype=bool)
+        timer.mark('validate')
+
+        # Score every valid row in a single model call
+        active = current_bundle()
+        prices = score_rows(matrix[valid], active) if valid.any() else []
+        timer.mark('predict')
+        prices = iter(prices)
+
+        results = []
+        for i, error in enumerate(errors):
+            if error is None:
+                results.append({'index': i, 'price': round(float(next(prices)), 2), 'status': 'success'})
+            else:
+                results.append({'index': i, 'error': error, 'status': 'error'})
+
+        response = jsonify({
+            'results': results,
+            'currency': '₹',
+            'count': len(results),
+            'errors': int((~valid).sum()),
+            'model_version': active.version,
+            'status': 'success'
+        })
+        timer.mark('serialize')
+        timer.finish()
+        return response
+
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        metrics.count_error('predict_batch', e)
+        timer.finish(400)
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+    except Exception as e:
+        logger.error(f"Batch prediction failed: {str(e)}", exc_info=True)
+        metrics.count_error('predict_batch', e)
+        timer.finish(500)
+        return jsonify({'error': str(e), 'status': 'error'}), 500
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    if prediction_cache is None:
+        return jsonify({'enabled': False, 'status': 'success'})
+    return jsonify(dict(prediction_cache.stats(), enabled=True, status='success'))
+
+@app.route('/admin/model', methods=['GET'])
+def admin_model():
+    active = current_bundle()
+    return jsonify({
+        'model_version': active.version,
+        'model_path': active.model_path,
+        'loaded_at': datetime.fromtimestamp(active.loaded_at).strftime('%Y-%m-%dT%H:%M:%S'),
+        'engine': 'numpy+xgboost' if active.forest is not None else 'xgboost',
+        'fare_table': active.fare_table is not None and USE_FARE_TABLE,
+        'registry': {
+            'current': registry.current_version(),
+            'versions': registry.versions(),
+            'swaps': watcher.swaps,
+            'last_error': watcher.last_error,
+        },
+        'shadow': shadow_recorder.stats(),
+        'status': 'success'
+    })
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    if ADMIN_TOKEN is not None:
+        authorized = request.headers.get('X-Admin-Token') == ADMIN_TOKEN
+    else:
+        authorized = request.remote_addr in ('127.0.0.1', '::1')
+    if not authorized:
+        return jsonify({'error': 'Not authorized', 'status': 'error'}), 403
+    try:
+        data = request.get_json(silent=True) or {}
+        # Optionally move CURRENT/SHADOW first; other workers follow via their watchers
+        if 'version' in data:
+            registry.activate(data['version'])
+        if 'shadow' in data:
+            registry.set_shadow(data['shadow'])
+        current_bundle()
+        watcher.check()
+        return jsonify({'model_version': bundle.version,
+                        'shadow_version': shadow_bundle.version if shadow_bundle is not None else None,
+                        'status': 'success'})
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+    except Exception as e:
+        logger.error(f"Model reload failed: {str(e)}", exc_info=True)
         return jsonify({'error': str(e), 'status': 'error'}), 500
 
 @app.route('/predict_trend', methods=['POST'])
 def predict_trend():
+    timer = metrics.timer('predict_trend')
     try:
         data = request.json
-        logger.info(f"Received trend prediction request with data: {data}")
+        timer.mark('parse')
+        if trace_sampled():
+            logger.debug("Received trend prediction request with data: %s", data)
 
         # Validate and preprocess input
         validate_input(data)
-        processed_data = preprocess_input(data)
-        
-        # Use the same model prediction as /predict
-        base_price = float(model.predict(processed_data)[0])
-
-        # Generate past 30 days of real predictions instead of mock data
-        historical_data = []
-        today = datetime.now()
-
-        for i in range(30, 0, -1):
-            past_date = today - timedelta(days=i)
-            data['days_left'] = (past_date - today).days  # Adjust days_left for history
-            
-            fluctuation = random.randint(-1500, 1500)
-            fluctuated_price = base_price + fluctuation
-
-            historical_data.append({
-                'date': past_date.strftime('%Y-%m-%d'),
-                'price': round(fluctuated_price, 2)
-            })
-
-        # Predict future prices using the fixed function
-        forecast = predict_future_prices(data, days_ahead=10)
-
-        return jsonify({
-            'historical': historical_data,
-            'forecast': forecast,
-            'status': 'success'
-        })
+        timer.mark('validate')
+        future_dates, matrix = build_trend_matrix(data)
+        timer.mark('preprocess')
+        active = current_bundle()
+        prices = score_rows(matrix, active)
+        timer.mark('predict')
+        historical = historical_prices(data)
+        timer.mark('history')
+        response = jsonify(trend_response(future_dates, prices, active.version, historical))
+        timer.mark('serialize')
+        timer.finish()
+        return response
 
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
+        metrics.count_error('predict_trend', e)
+        timer.finish(400)
         return jsonify({'error': str(e), 'status': 'error'}), 400
     except Exception as e:
         logger.error(f"Trend prediction failed: {str(e)}", exc_info=True)
+        metrics.count_error('predict_trend', e)
+        timer.finish(500)
         return jsonify({'error': str(e), 'status': 'error'}), 500
 
+@app.route('/search_cheapest', methods=['POST'])
+def search_cheapest():
+    """Cheapest itineraries for a route across a window of departure dates.
+
+    Every airline, class, stops value and departure/arrival slot (narrowed
+    by the optional filters) is priced for every date in one pass over the
+    forest's leaves; the cheapest cells are then rescored with the model so
+    prices match /predict.
+    """
+    timer = metrics.timer('search_cheapest')
+    try:
+        data = request.json
+        timer.mark('parse')
+        if trace_sampled():
+            logger.debug("Received cheapest-day search with data: %s", data)
+
+        grid, start_date, top_k = build_route_grid(data)
+        timer.mark('validate')
+        active = current_bundle()
+        cheapest, by_date = grid.candidates(price_grid(grid, active), top_k)
+        timer.mark('grid')
+        prices = score_rows(grid.rows(np.concatenate([cheapest, by_date])), active)
+        timer.mark('predict')
+        response = jsonify(search_response(grid, start_date, top_k, cheapest, prices, active.version))
+        timer.mark('serialize')
+        timer.finish()
+        return response
+
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        metrics.count_error('search_cheapest', e)
+        timer.finish(400)
+        return jsonify({'error': str(e), 'status': 'error'}), 400
+    except Exception as e:
+        logger.error(f"Cheapest-day search failed: {str(e)}", exc_info=True)
+        metrics.count_error('search_cheapest', e)
+        timer.finish(500)
+        return jsonify({'error': str(e), 'status': 'error'}), 500
+
+def render_metrics() -> str:
+    """Prometheus text for this process: request metrics plus cache and model state."""
+    counters, gauges = {}, {}
+    if prediction_cache is not None:
+        stats = prediction_cache.stats()
+        counters.update(prediction_cache_hits_total=stats['hits'], prediction_cache_misses_total=stats['misses'],
+                        prediction_cache_invalidations_total=stats['invalidations'])
+        if 'evictions' in stats:
+            counters['prediction_cache_evictions_total'] = stats['evictions']
+        if 'size' in stats:
+            gauges['prediction_cache_entries'] = stats['size']
+    counters['model_swaps_total'] = watcher.swaps
+    info = None
+    if bundle is not None:
+        gauges['model_loaded_timestamp_seconds'] = bundle.loaded_at
+        info = {'version': bundle.version, 'engine': 'numpy+xgboost' if bundle.forest is not None else 'xgboost'}
+    return metrics.render(counters, gauges, info)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # The debugger and reloader are for development only (FLASK_DEBUG=1)
+    app.run(host='0.0.0.0', port=port, debug=os.environ.get('FLASK_DEBUG') == '1')
\ No newline at end of file
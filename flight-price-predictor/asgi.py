@@ -0,0 +1,159 @@
+"""ASGI serving mode with requests coalesced into micro-batches.
+
+Exposes the same ``/predict`` and ``/predict_trend`` contracts as the Flask
+app (and reuses its validation, encoding, cache, fare table and model
+registry), but handlers run on an event loop and only enqueue their encoded
+rows; serving/batcher.py scores everything that arrived together in one
+vectorized call on a worker thread. Stage timings go into the same
+/metrics histograms as the Flask app (``predict`` includes time queued in
+the batcher)::
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+    python asgi.py            # same, honouring PORT
+
+Batching is tuned with MICRO_BATCH_MAX_SIZE (rows) and MICRO_BATCH_MAX_WAIT_US.
+"""
+import json
+import logging
+import os
+
+import numpy as np
+
+import app as flask_app
+from serving.batcher import MicroBatcher
+from serving.features import FEATURE_ORDER
+
+logger = logging.getLogger(__name__)
+
+MICRO_BATCH_MAX_SIZE = int(os.environ.get('MICRO_BATCH_MAX_SIZE', 64))
+MICRO_BATCH_MAX_WAIT_US = int(os.environ.get('MICRO_BATCH_MAX_WAIT_US', 2000))
+MAX_BODY_BYTES = 1 << 20
+
+
+def score_batch(matrix: np.ndarray):
+    """Score one coalesced batch with the bundle being served right now."""
+    active = flask_app.current_bundle()
+    return flask_app.score_rows(matrix, active), active.version
+
+
+batcher = MicroBatcher(score_batch, MICRO_BATCH_MAX_SIZE, MICRO_BATCH_MAX_WAIT_US)
+
+
+def _new_row() -> np.ndarray:
+    # Encoded rows wait in the batch queue, so they cannot use the encoder's shared buffer
+    return np.empty((1, len(FEATURE_ORDER)), dtype=np.float32)
+
+
+async def predict(data: dict, timer) -> dict:
+    flask_app.validate_input(data)
+    timer.mark('validate')
+    row = flask_app.encoder.encode(data, _new_row())
+    timer.mark('preprocess')
+    prices, version = await batcher.submit(row)
+    timer.mark('predict')
+    return {
+        'price': round(float(prices[0]), 2),
+        'currency': '₹',
+        'model_version': version,
+        'status': 'success'
+    }
+
+
+async def predict_trend(data: dict, timer) -> dict:
+    flask_app.validate_input(data)
+    timer.mark('validate')
+    future_dates, matrix = flask_app.build_trend_matrix(data, _new_row())
+    timer.mark('preprocess')
+    prices, version = await batcher.submit(matrix)
+    timer.mark('predict')
+    historical = flask_app.historical_prices(data)
+    timer.mark('history')
+    return flask_app.trend_response(future_dates, prices, version, historical)
+
+
+ROUTES = {
+    '/predict': predict,
+    '/predict_trend': predict_trend,
+}
+
+
+async def _read_body(receive) -> bytes:
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if len(body) > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        if not message.get('more_body'):
+            return body
+
+
+async def _send(send, status: int, body: bytes, content_type: bytes = b'application/json') -> None:
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', content_type),
+                            (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_json(send, status: int, payload: dict) -> None:
+    await _send(send, status, json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+
+
+async def _lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            flask_app.current_bundle()
+            batcher.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await batcher.stop()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    if scope['method'] == 'GET' and scope['path'] == '/batcher/stats':
+        return await _send_json(send, 200, dict(batcher.stats(), status='success'))
+    if scope['method'] == 'GET' and scope['path'] == '/metrics':
+        return await _send(send, 200, flask_app.render_metrics().encode(), b'text/plain; version=0.0.4; charset=utf-8')
+    handler = ROUTES.get(scope['path'])
+    if handler is None:
+        return await _send_json(send, 404, {'error': 'Not found', 'status': 'error'})
+    if scope['method'] != 'POST':
+        return await _send_json(send, 405, {'error': 'Method not allowed', 'status': 'error'})
+
+    endpoint = scope['path'].lstrip('/')
+    timer = flask_app.metrics.timer(endpoint)
+    try:
+        try:
+            data = json.loads(await _read_body(receive))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON body: {e}")
+        if not isinstance(data, dict):
+            raise ValueError("Request body must be a JSON object")
+        timer.mark('parse')
+        body = json.dumps(await handler(data, timer), ensure_ascii=False).encode('utf-8')
+        timer.mark('serialize')
+        timer.finish()
+        return await _send(send, 200, body)
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        flask_app.metrics.count_error(endpoint, e)
+        timer.finish(400)
+        return await _send_json(send, 400, {'error': str(e), 'status': 'error'})
+    except Exception as e:
+        logger.error(f"Prediction failed: {str(e)}", exc_info=True)
+        flask_app.metrics.count_error(endpoint, e)
+        timer.finish(500)
+        return await _send_json(send, 500, {'error': str(e), 'status': 'error'})
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), log_level='warning')
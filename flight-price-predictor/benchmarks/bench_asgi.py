@@ -0,0 +1,94 @@
+"""p50/p99 latency and throughput of sync Flask vs. the micro-batched ASGI mode.
+
+Each server runs as its own process on a free local port; an aiohttp load
+generator keeps `concurrency` requests in flight (closed loop) against
+``/predict`` (or ``/predict_trend``) for a fixed duration. Per-request INFO
+logging is silenced in every mode and the prediction cache is off, so the
+numbers compare request handling and model calls only.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from benchmarks.common import free_port, generate_load, random_payloads, wait_until_up
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUIET = "import logging; logging.getLogger('app').setLevel(logging.WARNING); "
+GUNICORN_CONF = """
+import logging
+def post_worker_init(worker):
+    logging.getLogger('app').setLevel(logging.WARNING)
+"""
+
+MODES = {
+    'flask-threaded': lambda port, conf: [sys.executable, '-c', QUIET +
+                                          f"import app; app.app.run(port={port}, threaded=True)"],
+    'gunicorn-sync': lambda port, conf: ['gunicorn', '-w', '1', '-b', f'127.0.0.1:{port}', '-c', conf,
+                                         '--log-level', 'warning', 'app:app'],
+    'asgi-unbatched': lambda port, conf: [sys.executable, '-c', QUIET +
+                                          f"import asgi, uvicorn; asgi.batcher.max_batch_size = 1; "
+                                          f"uvicorn.run(asgi.app, port={port}, log_level='warning')"],
+    'asgi-batched': lambda port, conf: [sys.executable, '-c', QUIET +
+                                        f"import asgi, uvicorn; uvicorn.run(asgi.app, port={port}, log_level='warning')"],
+}
+
+
+def run_mode(mode, endpoint, payloads, concurrency, duration, conf):
+    port = free_port()
+    env = dict(os.environ, PREDICTION_CACHE_SIZE='0', MODEL_RELOAD_INTERVAL='0')
+    process = subprocess.Popen(MODES[mode](port, conf), cwd=BASE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(port, process)
+        latencies, errors = asyncio.run(generate_load(f"http://127.0.0.1:{port}{endpoint}", payloads,
+                                                      concurrency, duration))
+        batch_rows = None
+        if mode.startswith('asgi'):
+            import urllib.request
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/batcher/stats") as response:
+                batch_rows = json.load(response)['mean_batch_rows']
+    finally:
+        process.terminate()
+        process.wait()
+    ms = np.array(latencies) * 1000
+    return {'requests': len(ms), 'rps': len(ms) / duration, 'p50': np.percentile(ms, 50),
+            'p99': np.percentile(ms, 99), 'errors': errors, 'batch_rows': batch_rows}
+
+
+def bench_asgi(modes, concurrencies, duration=10.0, endpoint='/predict'):
+    payloads = random_payloads(1000)
+    if endpoint == '/predict_trend':
+        payloads = [dict(payload, days_ahead=30) for payload in payloads]
+    with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+        f.write(GUNICORN_CONF)
+        conf = f.name
+
+    print(f"{endpoint}, {duration:.0f}s per run, closed-loop clients\n")
+    print(f"{'Mode':<16} {'Conc':>5} {'Req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'Errors':>7} {'Rows/batch':>11}")
+    print('-' * 68)
+    try:
+        for concurrency in concurrencies:
+            for mode in modes:
+                r = run_mode(mode, endpoint, payloads, concurrency, duration, conf)
+                batch_rows = f"{r['batch_rows']:.1f}" if r['batch_rows'] is not None else '-'
+                print(f"{mode:<16} {concurrency:>5} {r['rps']:>8.0f} {r['p50']:>8.2f} {r['p99']:>8.2f} "
+                      f"{r['errors']:>7} {batch_rows:>11}")
+    finally:
+        os.unlink(conf)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark sync Flask against the micro-batched ASGI mode')
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES), help='Servers to compare')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32], help='Requests in flight')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per run')
+    parser.add_argument('--endpoint', default='/predict', choices=['/predict', '/predict_trend'])
+    args = parser.parse_args()
+    bench_asgi(args.modes, args.concurrency, args.duration, args.endpoint)
@@ -0,0 +1,89 @@
+"""One-hot vs native categorical models: accuracy, size, training and inference speed.
+
+Encodes the raw dataset both ways with processing.py (27 one-hot columns vs
+9 columns holding category codes), trains the serving model's estimator
+(training.make_regressor) on the same split of each and compares test
+accuracy, model file size, matrix bytes per row, training time and
+prediction latency, including the request encoding step.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+from benchmarks.common import compact_payload, random_payloads, timed
+from models.model_training.training import make_regressor, regression_metrics
+from serving.features import CategoricalEncoder, FeatureEncoder
+from src.data_processing.processing import CATEGORICAL_COLS, NUMERICAL_COLS, fit_encoder, read_chunks, transform_chunk
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def per_call_us(fn, items, loops=5):
+    start = time.perf_counter()
+    for _ in range(loops):
+        for item in items:
+            fn(item)
+    return (time.perf_counter() - start) / (loops * len(items)) * 1e6
+
+
+def bench_categorical(raw_path, n_estimators=1000, batch_rows=1000):
+    encoder = fit_encoder(raw_path)
+    raw = next(read_chunks(raw_path, NUMERICAL_COLS + CATEGORICAL_COLS + ['price']))
+    train_rows, test_rows = train_test_split(np.arange(len(raw)), test_size=0.2, random_state=42)
+    categories = {col: [str(value) for value in values] for col, values in zip(CATEGORICAL_COLS, encoder.categories_)}
+    payloads = random_payloads(500)
+    print(f"{len(raw)} rows ({len(train_rows)} train / {len(test_rows)} test), {n_estimators} trees\n")
+
+    results = []
+    for encoding in ['onehot', 'categorical']:
+        columns = transform_chunk(raw, encoder, encoding)
+        y = columns.pop('price').astype(np.float32)
+        X = np.column_stack(list(columns.values())).astype(np.float32)
+        feature_types = ['c' if name in CATEGORICAL_COLS else 'q' for name in columns]
+
+        model = make_regressor(feature_types, n_estimators=n_estimators)
+        start = time.perf_counter()
+        model.fit(X[train_rows], y[train_rows])
+        fit_seconds = time.perf_counter() - start
+        booster = model.get_booster()
+        metrics = regression_metrics(y[test_rows], booster.inplace_predict(X[test_rows]))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'model.ubj')
+            booster.save_model(path)
+            size_mb = os.path.getsize(path) / 1e6
+
+        batch = X[test_rows[:batch_rows]]
+        row_encoder = CategoricalEncoder(categories) if encoding == 'categorical' else FeatureEncoder()
+        results.append({
+            'encoding': encoding,
+            'columns': X.shape[1],
+            'fit_s': fit_seconds,
+            'size_mb': size_mb,
+            'row_bytes': X[0].nbytes,
+            'single_us': per_call_us(lambda row: booster.inplace_predict(row), [X[i:i + 1] for i in test_rows[:200]]),
+            'batch_ms': timed(lambda: booster.inplace_predict(batch), 5) * 1000,
+            'request_us': per_call_us(lambda p: booster.inplace_predict(row_encoder.encode(p)),
+                                      [compact_payload(p) for p in payloads]),
+            **metrics,
+        })
+
+    print(f"{'Encoding':<12} {'Cols':>5} {'MAE':>9} {'RMSE':>9} {'R2':>7} {'Fit s':>7} {'Model MB':>9} "
+          f"{'Row B':>6} {'1 row us':>9} {f'{batch_rows} rows ms':>13} {'Request us':>11}")
+    print('-' * 108)
+    for r in results:
+        print(f"{r['encoding']:<12} {r['columns']:>5} {r['mae']:>9.1f} {r['rmse']:>9.1f} {r['r2']:>7.4f} "
+              f"{r['fit_s']:>7.1f} {r['size_mb']:>9.2f} {r['row_bytes']:>6} {r['single_us']:>9.1f} "
+              f"{r['batch_ms']:>13.2f} {r['request_us']:>11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare one-hot and native categorical models')
+    parser.add_argument('--raw', default=os.path.join(BASE_DIR, 'data', 'raw', 'Clean_Dataset.csv'), help='Raw CSV')
+    parser.add_argument('--n_estimators', type=int, default=1000, help='Trees per model')
+    parser.add_argument('--batch_rows', type=int, default=1000, help='Rows per batch prediction')
+    args = parser.parse_args()
+    bench_categorical(args.raw, args.n_estimators, args.batch_rows)
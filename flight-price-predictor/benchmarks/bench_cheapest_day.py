@@ -0,0 +1,61 @@
+"""Latency of /search_cheapest against scoring the whole route grid row by row.
+
+For each window, the full grid (every airline, class, stops value and slot
+pair on every date of a random route) is priced once through the model and
+once from the leaf boxes, checking both agree; then /search_cheapest
+requests for random routes are timed through the Flask test client against
+the latency budget.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from benchmarks.common import CITIES, quiet_app, timed
+
+
+def bench_cheapest_day(windows=(7, 30, 60, 120), requests=50, budget_ms=100.0, seed=0):
+    app = quiet_app()
+    client = app.app.test_client()
+    active = app.current_bundle()
+    rng = random.Random(seed)
+
+    start = time.perf_counter()
+    boxes = active.leaf_boxes()
+    print(f"Leaf boxes for {len(boxes.value)} leaves built in {(time.perf_counter() - start) * 1000:.0f} ms\n")
+
+    print(f"{'Window':>7} {'Cells':>7} {'Row scoring ms':>15} {'Leaf grid ms':>13} {'Max diff':>9} "
+          f"{'Search p50 ms':>14} {'p99 ms':>8} {'Budget':>7}")
+    print('-' * 88)
+    for window in windows:
+        source, destination = rng.sample(CITIES, 2)
+        grid, _, _ = app.build_route_grid({'source_city': source, 'destination_city': destination,
+                                           'window_days': window})
+        rows = grid.rows(np.arange(grid.size))
+        exact = app.model_predict(rows, active)
+        diff = np.abs(grid.price(boxes).reshape(-1) - exact).max()
+        row_time = timed(lambda: app.model_predict(grid.rows(np.arange(grid.size)), active), 2)
+        grid_time = timed(lambda: grid.price(boxes), 5)
+
+        latencies = []
+        for _ in range(requests):
+            source, destination = rng.sample(CITIES, 2)
+            body = {'source_city': source, 'destination_city': destination, 'window_days': window}
+            t = time.perf_counter()
+            response = client.post('/search_cheapest', json=body)
+            latencies.append(time.perf_counter() - t)
+            assert response.status_code == 200, response.json
+        ms = np.array(latencies) * 1000
+        p99 = np.percentile(ms, 99)
+        print(f"{window:>7} {grid.size:>7} {row_time * 1000:>15.1f} {grid_time * 1000:>13.1f} {diff:>9.3f} "
+              f"{np.percentile(ms, 50):>14.1f} {p99:>8.1f} {'ok' if p99 <= budget_ms else 'OVER':>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the cheapest-day route search')
+    parser.add_argument('--windows', nargs='+', type=int, default=[7, 30, 60, 120], help='Search windows in days')
+    parser.add_argument('--requests', type=int, default=50, help='Timed searches per window')
+    parser.add_argument('--budget_ms', type=float, default=100.0, help='p99 latency budget per search')
+    args = parser.parse_args()
+    bench_cheapest_day(args.windows, args.requests, args.budget_ms)
@@ -0,0 +1,62 @@
+"""Microbenchmark FeatureEncoder.encode against the pandas preprocess_input path.
+
+Also compares validating and encoding the one-hot request schema with the
+v2 compact schema, and their JSON sizes.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.common import compact_payload, quiet_app, random_payloads
+
+
+def per_call_us(fn, payloads, loops):
+    start = time.perf_counter()
+    for _ in range(loops):
+        for payload in payloads:
+            fn(payload)
+    return (time.perf_counter() - start) / (loops * len(payloads)) * 1e6
+
+
+def bench_encoder(n_payloads=200, loops=20):
+    app = quiet_app()
+    payloads = random_payloads(n_payloads)
+    compact = [compact_payload(payload) for payload in payloads]
+
+    for payload, v2 in zip(payloads, compact):
+        expected = app.preprocess_input(payload).to_numpy(dtype=np.float32)
+        assert np.array_equal(app.encoder.encode(payload), expected), "encoder differs from preprocess_input"
+        assert np.array_equal(app.encoder.encode(v2), expected), "v2 encoding differs from one-hot"
+
+    cases = [
+        ('preprocess_input', app.preprocess_input),
+        ('FeatureEncoder.encode', app.encoder.encode),
+        ('preprocess_input + predict', lambda p: app.get_model().predict(app.preprocess_input(p))),
+        ('FeatureEncoder.encode + predict', lambda p: app.get_model().predict(app.encoder.encode(p))),
+    ]
+    print(f"{'Path':<34} {'us/call':>10}")
+    print('-' * 45)
+    for name, fn in cases:
+        # model.predict dominates these cases; one pass is enough
+        n_loops = loops if 'predict' not in name else 1
+        print(f"{name:<34} {per_call_us(fn, payloads, n_loops):>10.1f}")
+
+    def validate_and_encode(payload):
+        app.validate_input(payload)
+        app.encoder.encode(payload)
+
+    print(f"\n{'Schema':<34} {'us/call':>10} {'JSON bytes':>11}")
+    print('-' * 57)
+    for name, batch in [('one-hot (v1) validate + encode', payloads), ('compact (v2) validate + encode', compact)]:
+        size = np.mean([len(json.dumps(payload)) for payload in batch])
+        print(f"{name:<34} {per_call_us(validate_and_encode, batch, loops):>10.1f} {size:>11.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark request encoding paths')
+    parser.add_argument('--payloads', type=int, default=200, help='Distinct payloads to encode')
+    parser.add_argument('--loops', type=int, default=20, help='Passes over the payloads')
+    args = parser.parse_args()
+    bench_encoder(args.payloads, args.loops)
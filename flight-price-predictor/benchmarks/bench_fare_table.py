@@ -0,0 +1,46 @@
+"""Compare fare-table lookups with the live model for latency and accuracy.
+
+Requires a table built with ``python -m serving.fare_table materialize``.
+"""
+import argparse
+import os
+
+import numpy as np
+
+from benchmarks.common import quiet_app, random_payloads, timed
+from serving.fare_table import FareTable, _random_grid_inputs
+
+
+def bench_fare_table(table_path, samples=20000, repeat=20):
+    app = quiet_app()
+    fare_table = FareTable.load(table_path)
+
+    # Accuracy on fresh random in-grid inputs (different seed from materialize)
+    X = _random_grid_inputs(samples, fare_table.anchors, seed=7)
+    expected = app.get_model().predict(X)
+    looked_up = fare_table.lookup_many(X)
+    answered = ~np.isnan(looked_up)
+    abs_error = np.abs(looked_up[answered] - expected[answered])
+    print(f"Table answered {answered.sum()} of {samples} inputs (the rest fall back to the model); "
+          f"max abs error {abs_error.max() if answered.any() else 0.0:.4f}")
+
+    rows = np.vstack([app.encoder.encode(p).copy() for p in random_payloads(1000)])
+    _, horizon = app.build_forecast_matrix(rows[0], app.datetime.now(), 90)
+    cases = [('single row', rows[:1]), ('90-day horizon', horizon), ('1000-row batch', rows)]
+
+    print(f"\n{'Workload':<16} {'Model ms':>10} {'Table ms':>10} {'Speedup':>8}")
+    print('-' * 47)
+    for name, matrix in cases:
+        model_time = timed(lambda: app.get_model().predict(matrix), repeat)
+        table_time = timed(lambda: fare_table.lookup_many(matrix), repeat)
+        print(f"{name:<16} {model_time * 1000:>10.3f} {table_time * 1000:>10.3f} {model_time / table_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    default_table = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models', 'fare_table.npy')
+    parser = argparse.ArgumentParser(description='Benchmark the fare lookup table')
+    parser.add_argument('--table', default=default_table, help='Materialized table (.npy)')
+    parser.add_argument('--samples', type=int, default=20000, help='Random inputs for the accuracy check')
+    parser.add_argument('--repeat', type=int, default=20, help='Repetitions per measurement')
+    args = parser.parse_args()
+    bench_fare_table(args.table, args.samples, args.repeat)
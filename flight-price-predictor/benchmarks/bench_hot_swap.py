@@ -0,0 +1,130 @@
+"""Latency of /predict while the model registry swaps versions under load.
+
+Publishes the served model and a truncated copy of it into a temporary
+registry, then keeps several client threads calling /predict through the
+Flask test client while CURRENT is flipped between the two versions.
+Requests that start within `--window` seconds of a flip are reported
+separately from steady-state requests, so any stall caused by loading or
+swapping shows up as a gap between the two rows.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.common import random_payloads
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def build_registry(root, model_path, truncate_to):
+    from serving.model_io import export_native_model, load_model
+    from serving.registry import ModelRegistry
+
+    registry = ModelRegistry(root)
+    first = registry.publish(model_path, activate=True)
+    booster = load_model(model_path).get_booster()
+    truncated_path = os.path.join(root, 'truncated.ubj')
+    export_native_model(booster[:truncate_to], truncated_path, feature_names=booster.feature_names)
+    second = registry.publish(truncated_path)
+    return registry, [first, second]
+
+
+def percentiles(latencies):
+    if not latencies:
+        return None
+    ms = np.array(latencies) * 1000
+    return len(ms), np.percentile(ms, 50), np.percentile(ms, 99), ms.max()
+
+
+def bench_hot_swap(model_path, clients=4, duration=20.0, swap_every=2.0, window=0.5, interval=0.1,
+                   shadow=False, truncate_to=500):
+    root = tempfile.mkdtemp(prefix='registry-')
+    registry, versions = build_registry(root, model_path, truncate_to)
+    os.environ.update(MODEL_REGISTRY_DIR=root, MODEL_RELOAD_INTERVAL=str(interval), PREDICTION_CACHE_SIZE='0')
+
+    from benchmarks.common import quiet_app
+    app = quiet_app()
+    if shadow:
+        registry.set_shadow(versions[1])
+        app.watcher.check()
+
+    payloads = random_payloads(500)
+    samples = []  # (start, latency, version, status) per request
+    stop = threading.Event()
+
+    def client(seed):
+        test_client = app.app.test_client()
+        local = []
+        i = seed
+        while not stop.is_set():
+            payload = payloads[i % len(payloads)]
+            i += 1
+            start = time.perf_counter()
+            response = test_client.post('/predict', json=payload)
+            elapsed = time.perf_counter() - start
+            local.append((start, elapsed, (response.json or {}).get('model_version'), response.status_code))
+        samples.extend(local)
+
+    # Warm up every client path before measuring
+    app.app.test_client().post('/predict', json=payloads[0])
+    threads = [threading.Thread(target=client, args=(seed * 97,)) for seed in range(clients)]
+    for thread in threads:
+        thread.start()
+
+    flips = []
+    deadline = time.perf_counter() + duration
+    turn = 1
+    while time.perf_counter() + swap_every < deadline:
+        time.sleep(swap_every)
+        flips.append(time.perf_counter())
+        registry.activate(versions[turn % 2])
+        turn += 1
+    time.sleep(max(0.0, deadline - time.perf_counter()))
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    flip_times = np.array(flips)
+    steady, swapping = [], []
+    for start, elapsed, _, _ in samples:
+        since = start - flip_times[flip_times <= start + elapsed]
+        (swapping if len(since) and since.min() < window else steady).append(elapsed)
+
+    errors = sum(status != 200 for _, _, _, status in samples)
+    seen = {}
+    for _, _, version, _ in samples:
+        seen[version] = seen.get(version, 0) + 1
+
+    print(f"{clients} client threads, {duration:.0f}s, CURRENT flipped every {swap_every:.1f}s "
+          f"({len(flips)} flips, watcher interval {interval:.2f}s, shadow {'on' if shadow else 'off'})\n")
+    print(f"{'Requests':<24} {'Count':>7} {'p50 ms':>8} {'p99 ms':>8} {'Max ms':>8}")
+    print('-' * 60)
+    for name, latencies in [('steady state', steady), (f'within {window:.1f}s of a flip', swapping)]:
+        row = percentiles(latencies)
+        if row:
+            print(f"{name:<24} {row[0]:>7} {row[1]:>8.2f} {row[2]:>8.2f} {row[3]:>8.2f}")
+    print(f"\nErrors: {errors}   swaps completed: {app.watcher.swaps}   "
+          f"throughput: {len(samples) / duration:.0f} req/s")
+    print("Responses per version: " + ', '.join(f"{v}={n}" for v, n in sorted(seen.items(), key=str)))
+    if shadow:
+        print(f"Shadow divergence: {app.shadow_recorder.stats()}")
+    if steady and swapping:
+        print(f"p99 change around flips: {statistics.quantiles(swapping, n=100)[98] * 1000 - statistics.quantiles(steady, n=100)[98] * 1000:+.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark /predict latency during model hot swaps')
+    parser.add_argument('--model', default=os.path.join(BASE_DIR, 'models', 'xgboost_model.ubj'), help='Native model to publish')
+    parser.add_argument('--clients', type=int, default=4, help='Concurrent client threads')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds of load')
+    parser.add_argument('--swap_every', type=float, default=2.0, help='Seconds between CURRENT flips')
+    parser.add_argument('--window', type=float, default=0.5, help='Seconds after a flip counted as "swapping"')
+    parser.add_argument('--interval', type=float, default=0.1, help='Watcher poll interval in seconds')
+    parser.add_argument('--shadow', action='store_true', help='Also score every request with the other version')
+    args = parser.parse_args()
+    bench_hot_swap(args.model, args.clients, args.duration, args.swap_every, args.window, args.interval, args.shadow)
@@ -0,0 +1,48 @@
+"""Compare cold-start time of the legacy pickle with the native model format.
+
+Each measurement runs in a fresh interpreter so import costs are included.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+import time
+start = time.perf_counter()
+{load}
+print(time.perf_counter() - start)
+"""
+
+
+def cold_load_seconds(load_statement):
+    script = SCRIPT.format(load=load_statement)
+    result = subprocess.run([sys.executable, '-c', script], cwd=BASE_DIR,
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def bench_model_load(pkl_path, native_path, runs=5):
+    cases = [
+        ('pickle (joblib.load)', f"import joblib; joblib.load({pkl_path!r})", pkl_path),
+        ('native (load_native_model)',
+         f"from serving.model_io import load_native_model; load_native_model({native_path!r})", native_path),
+    ]
+    print(f"{'Format':<28} {'Size MB':>8} {'Median s':>9} {'Min s':>8}")
+    print('-' * 56)
+    for name, statement, path in cases:
+        times = [cold_load_seconds(statement) for _ in range(runs)]
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{name:<28} {size_mb:>8.2f} {statistics.median(times):>9.3f} {min(times):>8.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark model load time by format')
+    parser.add_argument('--pickle', default=os.path.join(BASE_DIR, 'models', 'xgboost_model.pkl'), help='Pickled model')
+    parser.add_argument('--native', default=os.path.join(BASE_DIR, 'models', 'xgboost_model.ubj'), help='Native model')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per format')
+    args = parser.parse_args()
+    bench_model_load(args.pickle, args.native, args.runs)
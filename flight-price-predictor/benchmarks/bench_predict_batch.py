@@ -0,0 +1,38 @@
+"""Compare rows/sec of one-at-a-time /predict calls against /predict_batch."""
+import argparse
+
+from benchmarks.common import quiet_app, random_payloads, timed
+
+
+def bench_predict_batch(sizes=(1, 10, 100, 1000), repeat=3):
+    app = quiet_app()
+    client = app.app.test_client()
+
+    print(f"{'Rows':>6} {'/predict rows/s':>16} {'/predict_batch rows/s':>22} {'Speedup':>8}")
+    print('-' * 56)
+    for n in sizes:
+        payloads = random_payloads(n)
+
+        def one_at_a_time():
+            for payload in payloads:
+                client.post('/predict', json=payload)
+
+        def batched():
+            client.post('/predict_batch', json=payloads)
+
+        # Sanity check: both paths must agree before timing them
+        single = [client.post('/predict', json=p).get_json()['price'] for p in payloads]
+        batch = [r['price'] for r in client.post('/predict_batch', json=payloads).get_json()['results']]
+        assert single == batch, "batch predictions differ from /predict"
+
+        single_time = timed(one_at_a_time, repeat)
+        batch_time = timed(batched, repeat)
+        print(f"{n:>6} {n / single_time:>16.0f} {n / batch_time:>22.0f} {single_time / batch_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark /predict vs /predict_batch')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1, 10, 100, 1000], help='Batch sizes')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions per measurement')
+    args = parser.parse_args()
+    bench_predict_batch(args.sizes, args.repeat)
@@ -0,0 +1,52 @@
+"""Show that forecast latency stays flat as the /predict_trend horizon grows.
+
+Times what the handler runs (build_trend_matrix, then one score_rows call)
+against the previous per-day loop, and checks both give the same forecast.
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from benchmarks.common import quiet_app, random_payloads, timed
+
+
+def legacy_future_prices(app, data, days_ahead):
+    """The previous per-day loop: one DataFrame and one model call per day."""
+    departure_date = datetime.strptime(data['departure_date'], '%Y-%m-%d')
+    today = datetime.now()
+    forecast = []
+    for day in range(1, days_ahead + 1):
+        future_date = departure_date + timedelta(days=day)
+        data['days_left'] = (future_date - today).days
+        price = float(app.get_model().predict(app.preprocess_input(data))[0])
+        forecast.append({'date': future_date.strftime('%Y-%m-%d'), 'price': round(price, 2)})
+    return forecast
+
+
+def trend_forecast(app, data):
+    """The forecast /predict_trend returns for `data` (row 0 of the matrix is the itinerary itself)."""
+    future_dates, matrix = app.build_trend_matrix(data)
+    return app.format_forecast(future_dates, app.score_rows(matrix)[1:])
+
+
+def bench_predict_trend(horizons=(10, 30, 60, 90, 120), repeat=5):
+    app = quiet_app()
+    data = random_payloads(1)[0]
+    data['departure_date'] = (datetime.now() + timedelta(days=20)).strftime('%Y-%m-%d')
+
+    print(f"{'Horizon':>8} {'Loop ms':>10} {'Vectorized ms':>14} {'Speedup':>8}")
+    print('-' * 44)
+    for days_ahead in horizons:
+        request = dict(data, days_ahead=days_ahead)
+        assert legacy_future_prices(app, dict(data), days_ahead) == trend_forecast(app, request)
+
+        loop_time = timed(lambda: legacy_future_prices(app, dict(data), days_ahead), repeat)
+        vector_time = timed(lambda: trend_forecast(app, request), repeat)
+        print(f"{days_ahead:>8} {loop_time * 1000:>10.2f} {vector_time * 1000:>14.2f} {loop_time / vector_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark forecast latency across horizons')
+    parser.add_argument('--horizons', nargs='+', type=int, default=[10, 30, 60, 90, 120], help='Forecast horizons in days')
+    parser.add_argument('--repeat', type=int, default=5, help='Repetitions per measurement')
+    args = parser.parse_args()
+    bench_predict_trend(args.horizons, args.repeat)
@@ -0,0 +1,88 @@
+"""Query latency of 30-day fare histories from the SQLite price store.
+
+Fills a temporary database with synthetic observations (every route,
+airline and class, `fares` fares per day over `days` days), then times
+route_history() on the daily rollups against aggregating the raw
+observations for the same window.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from itertools import permutations
+
+import numpy as np
+
+from benchmarks.common import AIRLINES, CLASSES
+from serving.price_history import CITY_CODES, PriceHistoryStore
+
+
+def fill_store(store, days, fares, seed=0):
+    rng = random.Random(seed)
+    routes = list(permutations(CITY_CODES.values(), 2))
+    today = date.today()
+    total = 0
+    for offset in range(days, 0, -1):
+        observed = (today - timedelta(days=offset)).isoformat()
+        departure = (today + timedelta(days=rng.randint(1, 49))).isoformat()
+        rows = [(origin, destination, airline, travel_class, observed, departure,
+                 float(rng.randint(2500, 25000)), 'bench')
+                for origin, destination in routes for airline in AIRLINES for travel_class in CLASSES
+                for _ in range(fares)]
+        total += store.add_observations(rows)
+    return routes, total
+
+
+def raw_history(store, origin, destination, start, end, airline, travel_class):
+    rows = store._connection().execute(
+        'SELECT observed_date, price FROM observations WHERE origin = ? AND destination = ? AND airline = ? '
+        'AND travel_class = ? AND observed_date BETWEEN ? AND ?',
+        (origin, destination, airline, travel_class, start.isoformat(), end.isoformat())).fetchall()
+    by_day = {}
+    for day, price in rows:
+        by_day.setdefault(day, []).append(price)
+    return [{'date': day, 'price': float(np.median(prices)), 'min': min(prices), 'max': max(prices)}
+            for day, prices in sorted(by_day.items())]
+
+
+def bench_price_history(days=180, fares=10, queries=2000):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PriceHistoryStore(os.path.join(tmp, 'history.sqlite'))
+        start = time.perf_counter()
+        routes, total = fill_store(store, days, fares)
+        ingest = time.perf_counter() - start
+        size_mb = os.path.getsize(store.path) / 1e6
+        print(f"Ingested {total} fares ({len(routes)} routes, {days} days) in {ingest:.1f}s "
+              f"({total / ingest:.0f} fares/s), database {size_mb:.1f} MB\n")
+
+        rng = random.Random(1)
+        end = date.today() - timedelta(days=1)
+        begin = end - timedelta(days=29)
+        cases = [(*rng.choice(routes), rng.choice(AIRLINES), rng.choice(CLASSES)) for _ in range(queries)]
+        reader = PriceHistoryStore(store.path, readonly=True)
+
+        print(f"{'30-day history query':<28} {'p50 ms':>8} {'p99 ms':>8} {'Days':>6}")
+        print('-' * 54)
+        for name, query in [
+            ('rollups (airline, class)', lambda c: reader.route_history(c[0], c[1], begin, end, c[2], c[3])),
+            ('rollups (whole route)', lambda c: reader.route_history(c[0], c[1], begin, end)),
+            ('raw observations', lambda c: raw_history(reader, c[0], c[1], begin, end, c[2], c[3])),
+        ]:
+            latencies = []
+            for case in cases:
+                t = time.perf_counter()
+                history = query(case)
+                latencies.append(time.perf_counter() - t)
+            ms = np.array(latencies) * 1000
+            print(f"{name:<28} {np.percentile(ms, 50):>8.3f} {np.percentile(ms, 99):>8.3f} {len(history):>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark price history queries')
+    parser.add_argument('--days', type=int, default=180, help='Days of synthetic history')
+    parser.add_argument('--fares', type=int, default=10, help='Fares per route, airline, class and day')
+    parser.add_argument('--queries', type=int, default=2000, help='History queries per variant')
+    args = parser.parse_args()
+    bench_price_history(args.days, args.fares, args.queries)
@@ -0,0 +1,102 @@
+"""Tasks/minute of the scraping scheduler against the offline results stand-in.
+
+The legacy pattern (a fresh session per search plus a fixed wait, one search
+at a time) is compared with the scheduler's pooled sessions at several
+concurrency levels. Also checks that a rerun resumes from the JSONL store.
+
+Use ``--backend selenium`` to drive real headless Chrome (needs a local
+Chrome/chromedriver, still no network); the default ``http`` backend
+fetches the same page without a browser.
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import date
+
+from scraper import sites
+from scraper.backends import create_backend
+from scraper.fixture_server import start_fixture_server
+from scraper.scheduler import ResultStore, build_tasks
+
+ROUTES = ['DEL-BOM', 'BOM-DEL', 'BLR-DEL', 'DEL-BLR', 'HYD-BOM']
+
+
+def legacy_tasks_per_minute(tasks, backend_name, fixed_wait):
+    """One search at a time, each in a fresh session followed by a fixed wait."""
+    start = time.perf_counter()
+    for task in tasks:
+        backend = create_backend(backend_name, workers=1) if backend_name == 'selenium' else create_backend(backend_name)
+        try:
+            backend.search(*task)
+            time.sleep(fixed_wait)
+        except Exception:
+            pass
+        finally:
+            backend.close()
+    return len(tasks) / (time.perf_counter() - start) * 60
+
+
+def run_scheduler(backend_name, tasks, store_path, workers, rate, retries=3):
+    options = {'workers': workers} if backend_name == 'selenium' else {}
+    store = ResultStore(store_path)
+    try:
+        with create_backend(backend_name, **options) as backend:
+            scheduler = backend.scheduler(workers=workers, rate=rate, retries=retries, backoff=0.05)
+            summary = scheduler.run(tasks, store)
+            summary['sessions_created'] = getattr(getattr(backend, 'pool', None), 'created', 1)
+            return summary
+    finally:
+        store.close()
+
+
+def bench_scraper(backend='http', days=12, latency=0.25, failure_rate=0.05, fixed_wait=1.0,
+                  workers=(1, 2, 4, 8), rate=0.0):
+    # Injected failures are expected; keep per-attempt warnings out of the table
+    logging.getLogger('scraper.scheduler').setLevel(logging.ERROR)
+    server, base_url = start_fixture_server(latency=latency, failure_rate=failure_rate)
+    # Point the MMT search URLs at the mock
+    sites.MMT_BASE_URL = base_url
+    tasks = build_tasks(ROUTES, date(2025, 1, 1), days)
+
+    print(f"{len(tasks)} tasks, {latency * 1000:.0f} ms page latency, {failure_rate:.0%} injected failures\n")
+    print(f"{'Mode':<34} {'Tasks/min':>10} {'OK':>5} {'Failed':>7} {'Sessions':>9}")
+    print('-' * 70)
+    legacy_sample = tasks[:min(len(tasks), 10)]
+    legacy = legacy_tasks_per_minute(legacy_sample, backend, fixed_wait)
+    print(f"{f'legacy (new session, {fixed_wait:.1f}s wait)':<34} {legacy:>10.1f} {'-':>5} {'-':>7} {len(legacy_sample):>9}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in workers:
+            summary = run_scheduler(backend, tasks, os.path.join(tmp, f"w{n}.jsonl"), n, rate)
+            print(f"{f'scheduler, {n} workers':<34} {summary['tasks_per_minute']:>10.1f} "
+                  f"{summary['ok']:>5} {summary['failed']:>7} {summary['sessions_created']:>9}")
+
+        # Resume: a partial run followed by a full one scrapes only the remainder
+        store_path = os.path.join(tmp, 'resume.jsonl')
+        half = len(tasks) // 2
+        first = run_scheduler(backend, tasks[:half], store_path, workers[-1], rate)
+        second = run_scheduler(backend, tasks, store_path, workers[-1], rate)
+        with open(store_path) as f:
+            ok_ids = [r['task_id'] for r in map(json.loads, f) if r['status'] == 'ok']
+        assert second['skipped'] == first['ok'], "resume did not skip completed tasks"
+        assert len(ok_ids) == len(set(ok_ids)), "a completed task was scraped twice"
+        print(f"\nResume: first run stored {first['ok']} tasks, rerun skipped {second['skipped']} "
+              f"and scraped {second['ok'] + second['failed']}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the scraping scheduler offline')
+    parser.add_argument('--backend', choices=['http', 'selenium'], default='http', help='Session type')
+    parser.add_argument('--days', type=int, default=12, help='Dates per route')
+    parser.add_argument('--latency', type=float, default=0.25, help='Stand-in page latency in seconds')
+    parser.add_argument('--failure_rate', type=float, default=0.05, help='Fraction of 503 responses')
+    parser.add_argument('--fixed_wait', type=float, default=1.0, help='Fixed wait of the legacy pattern')
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4, 8], help='Concurrency levels')
+    parser.add_argument('--rate', type=float, default=0.0, help='Requests/sec per host (0 = unlimited)')
+    args = parser.parse_args()
+    bench_scraper(args.backend, args.days, args.latency, args.failure_rate, args.fixed_wait,
+                  args.workers, args.rate)
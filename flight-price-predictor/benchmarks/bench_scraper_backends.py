@@ -0,0 +1,84 @@
+"""Pages/sec and peak memory of each scraper backend against the local mock.
+
+Each backend runs in a fresh interpreter so its peak RSS (including child
+processes such as Chrome for the selenium backend) is measured in
+isolation. No network access is needed; selenium is reported as
+unavailable when Chrome/chromedriver are not installed.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [
+    ('http', 'mmt', {}),
+    ('http', 'mmt', {'headers': {'Accept': 'text/html'}}),
+    ('http', 'google', {}),
+    ('selenium', 'mmt', {'workers': 2}),
+    ('selenium', 'google', {'workers': 2}),
+]
+
+WORKER = """
+import json, resource, sys, time
+from scraper import sites
+from scraper.backends import create_backend
+from scraper.fixture_server import start_fixture_server
+
+backend_name, site, options, pages, latency = json.loads(sys.argv[1])
+server, base_url = start_fixture_server(latency=latency)
+sites.MMT_BASE_URL = sites.GOOGLE_FLIGHTS_BASE_URL = base_url
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+try:
+    backend = create_backend(backend_name, site, **options)
+except Exception as e:
+    print(json.dumps({'error': f"{type(e).__name__}: {e}"}))
+    sys.exit(0)
+urls = [backend.search_url('DEL', 'BOM', f"{day % 28 + 1:02d}/01/2025") for day in range(pages)]
+backend.fetch_many(urls[:2])
+start = time.perf_counter()
+results = backend.fetch_many(urls)
+elapsed = time.perf_counter() - start
+backend.close()
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+print(json.dumps({
+    'pages_per_sec': pages / elapsed,
+    'failed': sum(isinstance(r, Exception) for r in results),
+    'prices': sum(len(r) for r in results if not isinstance(r, Exception)),
+    'baseline_mb': before / 1e3,
+    'peak_mb': peak / 1e3,
+}))
+"""
+
+
+def run_case(backend, site, options, pages, latency):
+    args = json.dumps([backend, site, options, pages, latency])
+    result = subprocess.run([sys.executable, '-c', WORKER, args], cwd=BASE_DIR,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return {'error': result.stderr.strip().splitlines()[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def bench_scraper_backends(pages=200, latency=0.05):
+    print(f"{pages} pages per backend, {latency * 1000:.0f} ms mock latency\n")
+    print(f"{'Backend':<10} {'Site':<7} {'Variant':<14} {'Pages/s':>8} {'Failed':>7} {'Peak MB':>8} {'Baseline MB':>12}")
+    print('-' * 72)
+    for backend, site, options in CASES:
+        variant = 'html' if options.get('headers') else ('json' if backend == 'http' and site == 'mmt' else 'default')
+        result = run_case(backend, site, options, pages, latency)
+        if 'error' in result:
+            print(f"{backend:<10} {site:<7} {variant:<14} unavailable: {result['error'][:60]}")
+            continue
+        print(f"{backend:<10} {site:<7} {variant:<14} {result['pages_per_sec']:>8.1f} {result['failed']:>7} "
+              f"{result['peak_mb']:>8.1f} {result['baseline_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark scraper backends against the local mock')
+    parser.add_argument('--pages', type=int, default=200, help='Pages fetched per backend')
+    parser.add_argument('--latency', type=float, default=0.05, help='Mock latency per page in seconds')
+    args = parser.parse_args()
+    bench_scraper_backends(args.pages, args.latency)
@@ -0,0 +1,124 @@
+"""Import-time budget for the service and training entry points.
+
+Each entry point is imported in a fresh interpreter under ``python -X
+importtime`` (the median of a few runs is kept), and the modules it loaded
+are checked against the ones it must not import: the serving path should
+never load matplotlib or seaborn, and in fast-startup mode (FAST_STARTUP=1
+with INFERENCE_ENGINE=numpy against a registry version) not XGBoost or
+pandas either. Times are compared with benchmarks/startup_budget.json;
+anything over budget or importing a forbidden module is reported and the
+exit status is 1. --record rewrites the budget from this machine's timings.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_PATH = os.path.join(BASE_DIR, 'benchmarks', 'startup_budget.json')
+DEFAULT_MODEL_PATH = os.path.join(BASE_DIR, 'models', 'xgboost_model.ubj')
+
+PLOTTING = ['matplotlib', 'seaborn']
+HEAVY = ['xgboost', 'sklearn', 'scipy', 'pandas']
+
+# name -> (module to import, environment, top-level packages it must not load)
+ENTRY_POINTS = {
+    'app (lazy model)': ('app', {'LAZY_MODEL_LOAD': '1'}, PLOTTING + HEAVY),
+    'app (fast startup)': ('app', {'FAST_STARTUP': '1', 'INFERENCE_ENGINE': 'numpy'}, PLOTTING + HEAVY),
+    'app (eager model)': ('app', {}, PLOTTING),
+    'asgi (fast startup)': ('asgi', {'FAST_STARTUP': '1', 'INFERENCE_ENGINE': 'numpy'}, PLOTTING + HEAVY),
+    'xg_boost_training': ('xg_boost_training', {}, PLOTTING),
+    'model_training.training': ('models.model_training.training', {}, PLOTTING),
+    'data_processing.processing': ('src.data_processing.processing', {}, PLOTTING),
+}
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)')
+
+
+def parse_importtime(stderr):
+    """(total import ms, top-level packages loaded) from `-X importtime` output."""
+    total_us, packages = 0, set()
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, module = match.groups()
+        packages.add(module.split('.')[0])
+        # Top-level imports have a single space of indentation; their cumulative times add up to the total
+        if len(indent) == 1:
+            total_us += int(cumulative)
+    return total_us / 1000, packages
+
+
+def time_import(module, env):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=BASE_DIR,
+                            env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def base_env(registry_dir):
+    """Environment shared by every run: a private registry, no fare table or background reloads."""
+    env = dict(os.environ, MODEL_REGISTRY_DIR=registry_dir, FARE_TABLE_PATH=os.path.join(registry_dir, 'none.npy'),
+               MODEL_RELOAD_INTERVAL='0', LOG_LEVEL='WARNING')
+    for name in ('FAST_STARTUP', 'INFERENCE_ENGINE', 'LAZY_MODEL_LOAD', 'MODEL_PATH'):
+        env.pop(name, None)
+    return env
+
+
+def bench_startup(model_path, names, repeats, record, headroom):
+    from serving.registry import ModelRegistry
+
+    with open(BUDGET_PATH) as f:
+        budget = json.load(f)
+    results, failures = {}, []
+    with tempfile.TemporaryDirectory() as registry_dir:
+        # Fast startup needs a published version (with its pre-flattened forest)
+        version = ModelRegistry(registry_dir).publish(model_path, activate=True)
+        print(f"Registry version {version} from {model_path}, median of {repeats} runs\n")
+        print(f"{'Entry point':<28} {'Import ms':>10} {'Budget ms':>10}  Status")
+        print('-' * 62)
+        for name in names:
+            module, extra_env, forbidden = ENTRY_POINTS[name]
+            env = dict(base_env(registry_dir), **extra_env)
+            runs = [time_import(module, env) for _ in range(repeats)]
+            ms = float(np.median([total for total, _ in runs]))
+            loaded = set().union(*(packages for _, packages in runs))
+            results[name] = ms
+
+            limit = budget.get(name)
+            problems = [f"imports {package}" for package in forbidden if package in loaded]
+            if limit is not None and ms > limit and not record:
+                problems.append(f"{ms - limit:.0f} ms over budget")
+            status = '; '.join(problems) or 'ok'
+            failures += [f"{name}: {problem}" for problem in problems]
+            print(f"{name:<28} {ms:>10.0f} {limit if limit is not None else '-':>10}  {status}")
+
+    if record:
+        budget.update({name: int(round(ms * headroom, -1)) for name, ms in results.items()})
+        with open(BUDGET_PATH, 'w') as f:
+            json.dump(budget, f, indent=2)
+            f.write('\n')
+        print(f"\nRecorded budget ({headroom:g}x the measured times) in {BUDGET_PATH}")
+    if failures:
+        print("\nStartup regressions:\n  " + '\n  '.join(failures))
+    return not failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Check entry-point import times against the startup budget')
+    parser.add_argument('--model_path', default=os.environ.get('MODEL_PATH', DEFAULT_MODEL_PATH),
+                        help='Model published to the temporary registry')
+    parser.add_argument('--entry_points', nargs='+', default=list(ENTRY_POINTS), choices=list(ENTRY_POINTS),
+                        metavar='NAME', help='Entry points to check (default: all)')
+    parser.add_argument('--repeats', type=int, default=5, help='Interpreter starts per entry point')
+    parser.add_argument('--record', action='store_true', help='Write the measured times as the new budget')
+    parser.add_argument('--headroom', type=float, default=1.5, help='Budget = measured time x headroom (--record)')
+    args = parser.parse_args()
+    sys.exit(0 if bench_startup(args.model_path, args.entry_points, args.repeats, args.record, args.headroom) else 1)
@@ -0,0 +1,52 @@
+"""Parity check and latency/throughput sweep of the NumPy forest engine vs XGBoost."""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import random_payloads
+from serving.features import FeatureEncoder
+from serving.model_io import load_model
+from serving.tree_engine import ForestEvaluator
+
+
+def per_call_seconds(fn, X, min_time=0.5):
+    fn(X)
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < min_time:
+        fn(X)
+        calls += 1
+    return (time.perf_counter() - start) / calls
+
+
+def bench_tree_engine(model_path, sizes=(1, 10, 100, 1000, 10000), tolerance=0.01):
+    model = load_model(model_path)
+    forest = ForestEvaluator.from_booster(model.get_booster())
+    encoder = FeatureEncoder()
+    X = np.vstack([encoder.encode(p).copy() for p in random_payloads(max(sizes))])
+
+    # Parity, including rows with missing values that take the default branch
+    check = X[:2000].copy()
+    check[::7, 0] = np.nan
+    expected = model.predict(check)
+    actual = forest.predict(check)
+    max_diff = float(np.abs(actual - expected).max())
+    print(f"Parity on {len(check)} rows: max |diff| {max_diff:.6f}, "
+          f"exact matches {np.mean(actual == expected):.1%}")
+    assert max_diff <= tolerance, f"NumPy engine differs from model.predict by {max_diff}"
+
+    print(f"\n{'Rows':>6} {'XGBoost ms':>11} {'NumPy ms':>10} {'XGBoost rows/s':>15} {'NumPy rows/s':>13}")
+    print('-' * 60)
+    for n in sizes:
+        xgb_time = per_call_seconds(model.predict, X[:n])
+        numpy_time = per_call_seconds(forest.predict, X[:n])
+        print(f"{n:>6} {xgb_time * 1000:>11.3f} {numpy_time * 1000:>10.3f} "
+              f"{n / xgb_time:>15.0f} {n / numpy_time:>13.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the NumPy forest engine')
+    parser.add_argument('--model', default='models/xgboost_model.ubj', help='Trained model')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1, 10, 100, 1000, 10000], help='Batch sizes')
+    args = parser.parse_args()
+    bench_tree_engine(args.model, args.sizes)
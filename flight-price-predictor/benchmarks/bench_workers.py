@@ -0,0 +1,93 @@
+"""Throughput and tail latency of gunicorn worker/thread plans (serving/workers.py).
+
+Each configuration ``WxT`` starts ``python -m serving.workers --workers W
+--threads T`` (a trailing ``p`` adds ``--pin``; ``T=0`` leaves XGBoost's
+default of one thread per core in every worker, the oversubscribed baseline)
+and drives it with closed-loop aiohttp clients. /predict_trend scores 30
+rows per request, which goes through XGBoost rather than the NumPy engine,
+so it shows the thread budget at work. The cache is off and reloads are
+disabled, so every request pays for a model call.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from benchmarks.common import child_pids, free_port, generate_load, random_payloads, wait_until_up
+from serving.workers import THREAD_ENV_VARS, usable_cores
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TREND_DAYS_AHEAD = 30
+
+
+def parse_config(spec):
+    """'4x1p' -> (4 workers, 1 thread, pinned)"""
+    pinned = spec.endswith('p')
+    workers, threads = spec.rstrip('p').split('x')
+    return int(workers), int(threads), pinned
+
+
+def default_configs(cores):
+    configs = [f"{cores}x0", f"{cores}x1", f"{cores}x1p", f"{max(1, cores // 2)}x2", f"1x{cores}"]
+    return list(dict.fromkeys(configs))
+
+
+def os_threads(pids):
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith('Threads:'))
+        except (OSError, StopIteration):
+            continue
+    return total
+
+
+def run_config(workers, threads, pinned, endpoint, payloads, concurrency, duration):
+    port = free_port()
+    env = {k: v for k, v in os.environ.items() if k not in THREAD_ENV_VARS}
+    env.update(PREDICTION_CACHE_SIZE='0', MODEL_RELOAD_INTERVAL='0', LOG_LEVEL='WARNING')
+    command = [sys.executable, '-m', 'serving.workers', '--workers', str(workers), '--threads', str(threads),
+               '-b', f'127.0.0.1:{port}', '--log-level', 'warning'] + (['--pin'] if pinned else [])
+    # The launcher execs gunicorn, so this pid becomes the gunicorn master
+    process = subprocess.Popen(command, cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(port, process)
+        latencies, errors = asyncio.run(generate_load(f"http://127.0.0.1:{port}{endpoint}", payloads,
+                                                      concurrency, duration))
+        threads_running = os_threads(child_pids(process.pid))
+    finally:
+        process.terminate()
+        process.wait()
+    ms = np.array(latencies) * 1000
+    return {'rps': len(ms) / duration, 'p50': np.percentile(ms, 50), 'p99': np.percentile(ms, 99),
+            'errors': errors, 'os_threads': threads_running}
+
+
+def bench_workers(configs, endpoints, concurrency, duration):
+    payloads = random_payloads(1000)
+    print(f"{usable_cores()} usable cores, {concurrency} clients, {duration:.0f}s per run\n")
+    print(f"{'Config':<8} {'Endpoint':<15} {'Req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'Errors':>7} {'OS threads':>11}")
+    print('-' * 70)
+    for endpoint in endpoints:
+        endpoint_payloads = payloads
+        if endpoint == '/predict_trend':
+            endpoint_payloads = [dict(payload, days_ahead=TREND_DAYS_AHEAD) for payload in payloads]
+        for spec in configs:
+            r = run_config(*parse_config(spec), endpoint, endpoint_payloads, concurrency, duration)
+            print(f"{spec:<8} {endpoint:<15} {r['rps']:>8.0f} {r['p50']:>8.2f} {r['p99']:>8.2f} "
+                  f"{r['errors']:>7} {r['os_threads']:>11}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Sweep gunicorn worker/thread configurations')
+    parser.add_argument('--configs', nargs='+', default=None,
+                        help='WxT[p] plans, e.g. 4x0 4x1 4x1p 2x2 (default: derived from the core count)')
+    parser.add_argument('--endpoints', nargs='+', default=['/predict', '/predict_trend'])
+    parser.add_argument('--concurrency', type=int, default=16, help='Closed-loop clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per run')
+    args = parser.parse_args()
+    bench_workers(args.configs or default_configs(usable_cores()), args.endpoints, args.concurrency, args.duration)
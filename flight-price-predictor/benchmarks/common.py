@@ -0,0 +1,200 @@
+"""Shared helpers for the benchmark scripts.
+
+Run benchmarks from the flight-price-predictor directory as modules, e.g.
+``python -m benchmarks.bench_predict_batch``.
+"""
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+
+from serving.features import CATEGORY_BLOCKS, FEATURE_ORDER
+
+
+def _block_values(category):
+    """Category values of one one-hot block, e.g. 'airline' -> ['AirAsia', ...]."""
+    _, start, stop = next(block for block in CATEGORY_BLOCKS if block[0] == category)
+    return [feature[len(category) + 1:] for feature in FEATURE_ORDER[start:stop]]
+
+
+AIRLINES = _block_values('airline')
+CITIES = _block_values('source_city')
+CLASSES = _block_values('class')
+STOPS = _block_values('stops')
+
+
+def random_payload(rng=random):
+    """Return one valid one-hot /predict payload drawn from the categorical space."""
+    source, destination = rng.sample(CITIES, 2)
+    payload = {
+        'duration': round(rng.uniform(1.0, 30.0), 2),
+        'days_left': rng.randint(1, 49),
+        'departure_time': rng.randint(0, 5),
+        'arrival_time': rng.randint(0, 5),
+    }
+    airline = rng.choice(AIRLINES)
+    for name in AIRLINES:
+        payload[f'airline_{name}'] = int(name == airline)
+    for city in CITIES:
+        payload[f'source_city_{city}'] = int(city == source)
+        payload[f'destination_city_{city}'] = int(city == destination)
+    travel_class = rng.choice(CLASSES)
+    for name in CLASSES:
+        payload[f'class_{name}'] = int(name == travel_class)
+    stops = rng.choice(STOPS)
+    for name in STOPS:
+        payload[f'stops_{name}'] = int(name == stops)
+    return payload
+
+
+def compact_payload(payload):
+    """The same itinerary in the v2 request schema (plain category values, named time slots)."""
+    from serving.features import CATEGORY_COLUMNS, TIME_SLOTS
+    compact = {
+        'duration': payload['duration'],
+        'days_left': payload['days_left'],
+        'departure_time': TIME_SLOTS[payload['departure_time']],
+        'arrival_time': TIME_SLOTS[payload['arrival_time']],
+    }
+    for category, columns in CATEGORY_COLUMNS.items():
+        compact[category] = next(value for value in columns if payload.get(f'{category}_{value}') == 1)
+    return compact
+
+
+def random_payloads(n, seed=42):
+    """Return n reproducible random payloads."""
+    rng = random.Random(seed)
+    return [random_payload(rng) for _ in range(n)]
+
+
+def payload_mix(n, seed=42, repeat_fraction=0.0, hot_set=50):
+    """Return n payloads where `repeat_fraction` of them repeat a small set of popular searches.
+
+    Real traffic concentrates on a few routes and dates, which is what the
+    prediction cache and fare table exploit; repeat_fraction=0 gives all
+    distinct itineraries.
+    """
+    rng = random.Random(seed)
+    hot = [random_payload(rng) for _ in range(hot_set)]
+    return [rng.choice(hot) if rng.random() < repeat_fraction else random_payload(rng) for _ in range(n)]
+
+
+def timed(fn, repeat=3):
+    """Run fn() repeat times and return the best wall-clock time in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def quiet_app(live_model=True):
+    """Import the Flask app with its per-request INFO logging silenced.
+
+    With live_model (the default) the prediction cache and fare table are
+    switched off so every request pays for a real model call.
+    """
+    import app
+    logging.getLogger(app.__name__).setLevel(logging.WARNING)
+    if live_model:
+        app.prediction_cache = None
+        app.USE_FARE_TABLE = False
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(port, process, timeout=60):
+    """Block until something listens on `port`, failing early if `process` exits."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Server did not start in time")
+
+
+async def generate_load(url, payloads, concurrency, duration):
+    """Keep `concurrency` POSTs in flight against url for `duration` seconds.
+
+    Returns the per-request latencies in seconds and the number of non-200
+    responses.
+    """
+    import aiohttp
+
+    latencies, errors = [], 0
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        deadline = None
+
+        async def client(offset):
+            nonlocal errors
+            i = offset
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                async with session.post(url, json=payloads[i % len(payloads)]) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                latencies.append(time.perf_counter() - start)
+                i += concurrency
+
+        # Warm up connections and the model before timing
+        for payload in payloads[:concurrency]:
+            async with session.post(url, json=payload) as response:
+                await response.read()
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(client(offset) for offset in range(concurrency)))
+    return latencies, errors
+
+
+def _proc_memory_kb(pid, field):
+    with open(f'/proc/{pid}/smaps_rollup' if field == 'Pss' else f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    return 0
+
+
+def child_pids(pid):
+    """Pids of the direct children of `pid` (Linux /proc)."""
+    children = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # Field 4 is the parent pid; the command name may contain spaces
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        children.append(int(entry))
+            except (OSError, ValueError, IndexError):
+                continue
+    return children
+
+
+def process_tree_memory_mb(pid):
+    """(RSS, PSS) in MB summed over `pid` and its children, or (None, None) off Linux.
+
+    PSS splits shared pages between the processes sharing them, so unlike
+    RSS it does not double-count a model preloaded before forking workers.
+    """
+    if not os.path.exists(f'/proc/{pid}'):
+        return None, None
+    rss = pss = 0
+    for child in [pid] + child_pids(pid):
+        try:
+            rss += _proc_memory_kb(child, 'VmRSS')
+            pss += _proc_memory_kb(child, 'Pss')
+        except OSError:
+            continue
+    return rss / 1024, pss / 1024
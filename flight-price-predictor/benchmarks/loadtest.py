@@ -0,0 +1,238 @@
+"""Load-test harness for the prediction API with saved, comparable results.
+
+Drives ``/predict`` and ``/predict_trend`` with payloads drawn from the
+FEATURE_ORDER categorical space, either in-process through the Flask test
+client (one thread per concurrent client) or over HTTP against a local
+gunicorn started from gunicorn.conf.py. Each run reports throughput,
+latency percentiles and memory, and is saved as JSON so that results from
+different commits can be compared::
+
+    python -m benchmarks.loadtest run --target inprocess gunicorn --concurrency 1 8 32
+    python -m benchmarks.loadtest compare benchmarks/results/a.json benchmarks/results/b.json
+
+`compare` exits with status 1 when throughput drops or p99 latency grows by
+more than --threshold, so it can gate CI.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.common import free_port, generate_load, payload_mix, process_tree_memory_mb, wait_until_up
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BASE_DIR, 'benchmarks', 'results')
+TARGETS = ['inprocess', 'gunicorn']
+ENDPOINTS = ['/predict', '/predict_trend']
+TREND_DAYS_AHEAD = 30
+
+
+def endpoint_payloads(endpoint, n, seed, repeat_fraction):
+    payloads = payload_mix(n, seed, repeat_fraction)
+    if endpoint == '/predict_trend':
+        payloads = [dict(payload, days_ahead=TREND_DAYS_AHEAD) for payload in payloads]
+    return payloads
+
+
+def summarize(latencies, errors, duration):
+    ms = np.array(latencies) * 1000
+    if not len(ms):
+        return {'requests': 0, 'errors': errors, 'rps': 0.0}
+    return {
+        'requests': int(len(ms)),
+        'errors': int(errors),
+        'rps': len(ms) / duration,
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p90_ms': float(np.percentile(ms, 90)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'max_ms': float(ms.max()),
+    }
+
+
+def run_inprocess(app_module, endpoint, payloads, concurrency, duration):
+    """Closed loop of `concurrency` threads, each with its own Flask test client."""
+    barrier = threading.Barrier(concurrency + 1)
+    results = []
+
+    def client(offset):
+        test_client = app_module.app.test_client()
+        test_client.post(endpoint, json=payloads[offset])
+        latencies, errors, i = [], 0, offset
+        barrier.wait()
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = test_client.post(endpoint, json=payloads[i % len(payloads)])
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code != 200
+            i += concurrency
+        results.append((latencies, errors))
+
+    threads = [threading.Thread(target=client, args=(offset,)) for offset in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    result = summarize([x for latencies, _ in results for x in latencies], sum(e for _, e in results), duration)
+    result['rss_mb'], result['pss_mb'] = process_tree_memory_mb(os.getpid())
+    result['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+
+def start_gunicorn(workers):
+    port = free_port()
+    env = dict(os.environ, LOG_LEVEL='WARNING')
+    command = ['gunicorn', '-c', 'gunicorn.conf.py', '-b', f'127.0.0.1:{port}', '-w', str(workers),
+               '--log-level', 'warning', 'app:app']
+    process = subprocess.Popen(command, cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(port, process)
+    except RuntimeError:
+        process.terminate()
+        raise
+    return process, port
+
+
+def run_gunicorn(process, port, endpoint, payloads, concurrency, duration):
+    latencies, errors = asyncio.run(generate_load(f"http://127.0.0.1:{port}{endpoint}", payloads,
+                                                  concurrency, duration))
+    result = summarize(latencies, errors, duration)
+    result['rss_mb'], result['pss_mb'] = process_tree_memory_mb(process.pid)
+    return result
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BASE_DIR,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_row(target, endpoint, concurrency, r):
+    memory = f"{r['pss_mb']:.0f}" if r.get('pss_mb') is not None else '-'
+    if not r['requests']:
+        print(f"{target:<10} {endpoint:<15} {concurrency:>5}  no requests completed ({r['errors']} errors)")
+        return
+    print(f"{target:<10} {endpoint:<15} {concurrency:>5} {r['rps']:>8.0f} {r['p50_ms']:>8.2f} {r['p90_ms']:>8.2f} "
+          f"{r['p99_ms']:>8.2f} {r['max_ms']:>8.2f} {r['errors']:>6} {memory:>7}")
+
+
+def run(targets, endpoints, concurrencies, duration, workers, repeat_fraction, output, seed=42):
+    meta = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'duration': duration,
+        'gunicorn_workers': workers,
+        'repeat_fraction': repeat_fraction,
+    }
+    results = []
+    print(f"{duration:.0f}s per run, repeat fraction {repeat_fraction:.2f}, revision {meta['revision']}\n")
+    print(f"{'Target':<10} {'Endpoint':<15} {'Conc':>5} {'Req/s':>8} {'p50 ms':>8} {'p90 ms':>8} "
+          f"{'p99 ms':>8} {'Max ms':>8} {'Errors':>6} {'PSS MB':>7}")
+    print('-' * 94)
+
+    for target in targets:
+        if target == 'inprocess':
+            from benchmarks.common import quiet_app
+            app_module = quiet_app(live_model=False)
+        else:
+            process, port = start_gunicorn(workers)
+        try:
+            for endpoint in endpoints:
+                for concurrency in concurrencies:
+                    # A fresh payload set per case, so earlier cases do not warm the cache for later ones
+                    payloads = endpoint_payloads(endpoint, 2000, seed + concurrency, repeat_fraction)
+                    if target == 'inprocess':
+                        r = run_inprocess(app_module, endpoint, payloads, concurrency, duration)
+                    else:
+                        r = run_gunicorn(process, port, endpoint, payloads, concurrency, duration)
+                    print_row(target, endpoint, concurrency, r)
+                    results.append(dict(r, target=target, endpoint=endpoint, concurrency=concurrency))
+        finally:
+            if target != 'inprocess':
+                process.terminate()
+                process.wait()
+
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"loadtest-{time.strftime('%Y%m%d-%H%M%S')}-{meta['revision'] or 'nogit'}.json")
+    with open(output, 'w') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2)
+    print(f"\nSaved results to {output}")
+    return output
+
+
+def compare(baseline_path, candidate_path, threshold=0.15):
+    """Print per-case changes; returns the number of regressions beyond `threshold`."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+    key = lambda r: (r['target'], r['endpoint'], r['concurrency'])
+    before = {key(r): r for r in baseline['results']}
+
+    print(f"Baseline  {baseline['meta'].get('revision')} ({baseline['meta'].get('timestamp')})")
+    print(f"Candidate {candidate['meta'].get('revision')} ({candidate['meta'].get('timestamp')})\n")
+    print(f"{'Target':<10} {'Endpoint':<15} {'Conc':>5} {'Req/s':>16} {'p50 ms':>16} {'p99 ms':>16} {'PSS MB':>12}")
+    print('-' * 96)
+
+    def change(old, new):
+        if old is None or new is None:
+            return '-'
+        return f"{new:.1f} ({(new - old) / old * 100:+.0f}%)" if old else f"{new:.1f}"
+
+    regressions = 0
+    for r in candidate['results']:
+        old = before.get(key(r))
+        if old is None or not old['requests'] or not r['requests']:
+            continue
+        regressed = (r['rps'] < old['rps'] * (1 - threshold) or r['p99_ms'] > old['p99_ms'] * (1 + threshold)
+                     or r['errors'] > old['errors'])
+        regressions += regressed
+        memory = change(old.get('pss_mb'), r.get('pss_mb'))
+        print(f"{r['target']:<10} {r['endpoint']:<15} {r['concurrency']:>5} {change(old['rps'], r['rps']):>16} "
+              f"{change(old['p50_ms'], r['p50_ms']):>16} {change(old['p99_ms'], r['p99_ms']):>16} {memory:>12}"
+              f"{'  REGRESSION' if regressed else ''}")
+    print(f"\n{regressions} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Load-test the prediction API and compare saved results')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help='Run the load test and save JSON results')
+    run_parser.add_argument('--target', nargs='+', default=['inprocess'], choices=TARGETS, help='Where to send load')
+    run_parser.add_argument('--endpoint', nargs='+', default=ENDPOINTS, choices=ENDPOINTS, help='Endpoints to drive')
+    run_parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8], help='Requests in flight')
+    run_parser.add_argument('--duration', type=float, default=10.0, help='Seconds per case')
+    run_parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    run_parser.add_argument('--repeat_fraction', type=float, default=0.2,
+                            help='Share of requests repeating popular searches (exercises the cache)')
+    run_parser.add_argument('--output', help='Results file (default benchmarks/results/loadtest-<time>-<rev>.json)')
+    compare_parser = subparsers.add_parser('compare', help='Compare two saved results files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--threshold', type=float, default=0.15, help='Relative change counted as a regression')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        run(args.target, args.endpoint, args.concurrency, args.duration, args.workers, args.repeat_fraction, args.output)
+    else:
+        sys.exit(1 if compare(args.baseline, args.candidate, args.threshold) else 0)
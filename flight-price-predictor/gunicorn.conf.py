@@ -0,0 +1,38 @@
+# Gunicorn settings for the prediction service:
+#   gunicorn -c gunicorn.conf.py app:app
+#   python -m serving.workers [--workers N] [--threads T] [--pin]   (plans the counts, then runs this)
+import os
+
+from serving.workers import assign_slot, pin_worker, plan_workers, thread_env
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Worker count and per-worker model threads (serving/workers.py): by default
+# one single-threaded worker per usable core, so workers never compete for
+# cores. WEB_CONCURRENCY and MODEL_THREADS override either count.
+workers, model_threads = plan_workers(
+    workers=int(os.environ['WEB_CONCURRENCY']) if os.environ.get('WEB_CONCURRENCY') else None,
+    threads=int(os.environ['MODEL_THREADS']) if os.environ.get('MODEL_THREADS') else None,
+)
+# Set before app.py is imported, so the preloaded model and OpenMP in every
+# worker start with the budget
+os.environ['MODEL_THREADS'] = str(model_threads)
+for name, value in thread_env(model_threads).items():
+    os.environ.setdefault(name, value)
+
+# Import app.py (and load the model) once in the master before forking, so
+# every worker shares the model's pages copy-on-write instead of loading its
+# own copy. Set PRELOAD_MODEL=0 to load per worker.
+preload_app = os.environ.get('PRELOAD_MODEL', '1') == '1'
+
+# PIN_WORKERS=1 gives each worker its own model_threads cores
+pin_workers = os.environ.get('PIN_WORKERS', '0') == '1'
+
+
+def pre_fork(server, worker):
+    assign_slot(server, worker)
+
+
+def post_fork(server, worker):
+    if pin_workers:
+        pin_worker(worker, model_threads)
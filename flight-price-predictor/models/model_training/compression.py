@@ -0,0 +1,220 @@
+# models/model_training/compression.py
+"""Shrink a trained model and report the latency/accuracy trade-off of each candidate
+
+Candidates built from the teacher (the published 1000-tree model by default):
+
+* truncate-N     the teacher's first N trees (no retraining)
+* refit-NxD      N trees of depth D (at a larger learning rate) fitted on the training split
+* distill-NxD    the same shape fitted to the teacher's predictions on the training rows
+                 plus the full categorical grid (every airline, route, class, stops and
+                 slot pair, with sampled days_left and a duration seen for that stops value)
+
+Every candidate is scored on training.py's test split and timed on single rows
+(XGBoost and the NumPy engine, which serves small batches) and on a batch, then
+exported with its metadata sidecar to --out_dir so the chosen one can be
+published with ``python -m serving.registry publish``.
+
+    python models/model_training/compression.py --truncate 250 500 --refit 200:6:0.05 --distill 100:8:0.1
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+# Make the project root importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..'))
+from serving.features import CATEGORY_BLOCKS, FEATURE_ORDER
+from serving.model_io import export_native_model, load_model
+from serving.tree_engine import ForestEvaluator
+from src.data_processing.processing import load_processed
+from models.model_training.training import MODEL_SAVE_PATH, PROCESSED_DATA_PATH, make_regressor, regression_metrics
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(BASE_DIR, '../../models/compressed')
+
+DAYS_LEFT_RANGE = (1, 49)
+TIME_SLOT_COUNT = 6
+
+def parse_shape(spec):
+    """'trees:depth:learning_rate' -> (n_estimators, max_depth, learning_rate)"""
+    trees, depth, eta = spec.split(':')
+    return int(trees), int(depth), float(eta)
+
+def categorical_grid(X_train, samples_per_cell=4, seed=42):
+    """Every airline x route x class x stops x slot-pair cell, `samples_per_cell` times
+
+    days_left is drawn uniformly and duration from the training rows with the
+    same stops value, so the student sees realistic durations for each cell.
+    """
+    rng = np.random.default_rng(seed)
+    axes = [stop - start for _, start, stop in CATEGORY_BLOCKS] + [TIME_SLOT_COUNT, TIME_SLOT_COUNT]
+    codes = np.indices(axes).reshape(len(axes), -1)
+    names = [name for name, _, _ in CATEGORY_BLOCKS]
+    source, destination = names.index('source_city'), names.index('destination_city')
+    codes = np.repeat(codes[:, codes[source] != codes[destination]], samples_per_cell, axis=1)
+
+    n = codes.shape[1]
+    X = np.zeros((n, len(FEATURE_ORDER)), dtype=np.float32)
+    rows = np.arange(n)
+    for axis, (_, start, _) in enumerate(CATEGORY_BLOCKS):
+        X[rows, start + codes[axis]] = 1
+    X[:, FEATURE_ORDER.index('departure_time')] = codes[-2]
+    X[:, FEATURE_ORDER.index('arrival_time')] = codes[-1]
+    X[:, FEATURE_ORDER.index('days_left')] = rng.integers(DAYS_LEFT_RANGE[0], DAYS_LEFT_RANGE[1] + 1, n)
+
+    stops_start, stops_stop = CATEGORY_BLOCKS[-1][1:]
+    train_stops = X_train[:, stops_start:stops_stop].argmax(axis=1)
+    grid_stops = codes[len(CATEGORY_BLOCKS) - 1]
+    duration = FEATURE_ORDER.index('duration')
+    for stops in range(stops_stop - stops_start):
+        seen = X_train[train_stops == stops, duration]
+        picked = grid_stops == stops
+        X[picked, duration] = rng.choice(seen, picked.sum()) if len(seen) else np.median(X_train[:, duration])
+    return X
+
+def measure_latency(booster, X, single_rows=300, batch_rows=1000, repeat=5):
+    """Median single-row latency (XGBoost and NumPy engine, in µs) and best batch time (ms)"""
+    rows = [X[i:i + 1] for i in range(min(single_rows, len(X)))]
+    batch = X[:batch_rows]
+    latency = {}
+    engines = [('xgboost_us', booster.inplace_predict)]
+    try:
+        engines.append(('numpy_us', ForestEvaluator.from_booster(booster).predict))
+    except ValueError as e:
+        print(f"NumPy engine unavailable: {str(e)}")
+    for name, predict in engines:
+        predict(rows[0])
+        times = []
+        for row in rows:
+            start = time.perf_counter()
+            predict(row)
+            times.append(time.perf_counter() - start)
+        latency[name] = float(np.median(times) * 1e6)
+    batch_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        booster.inplace_predict(batch)
+        batch_times.append(time.perf_counter() - start)
+    latency['batch_ms'] = float(min(batch_times) * 1000)
+    latency['batch_rows'] = len(batch)
+    return latency
+
+def mark_frontier(results):
+    """Flag candidates no other candidate beats on both RMSE and served single-row latency"""
+    for r in results:
+        r['single_us'] = min(r['latency'].get('numpy_us', np.inf), r['latency']['xgboost_us'])
+    for r in results:
+        r['frontier'] = not any(o['metrics']['rmse'] < r['metrics']['rmse'] and o['single_us'] < r['single_us']
+                                for o in results if o is not r)
+
+def compress_model(model_path=MODEL_SAVE_PATH, data_path=PROCESSED_DATA_PATH, out_dir=OUTPUT_DIR,
+                   truncate=(100, 250, 500, 750), refit=((200, 6, 0.05), (100, 8, 0.1)),
+                   distill=((200, 6, 0.05), (100, 8, 0.1)), samples_per_cell=4):
+    """Build, evaluate and export the compressed candidates; returns the report rows"""
+    teacher_model = load_model(model_path)
+    teacher = teacher_model.get_booster()
+    teacher_meta = getattr(teacher_model, 'meta', {})
+    if teacher_meta.get('categories'):
+        raise ValueError("Compression supports one-hot models; this one uses native categorical splits")
+
+    df = load_processed(data_path)
+    feature_names = teacher.feature_names or [c for c in df.columns if c != 'price']
+    X = df[feature_names].to_numpy(dtype=np.float32)
+    y = df['price'].to_numpy(dtype=np.float32)
+    # training.py's split, so the test rows were never seen by the teacher
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    print(f"Teacher {model_path}: {teacher.num_boosted_rounds()} trees; "
+          f"{len(X_train)} training rows, {len(X_test)} test rows")
+
+    candidates = [('baseline', {'method': 'baseline'}, lambda: teacher)]
+    for n in sorted(truncate):
+        if n < teacher.num_boosted_rounds():
+            candidates.append((f"truncate-{n}", {'method': 'truncate', 'trees': n}, lambda n=n: teacher[:n]))
+
+    def fit(shape, X_fit, y_fit):
+        n_estimators, max_depth, learning_rate = shape
+        model = make_regressor(n_estimators=n_estimators, max_depth=max_depth, learning_rate=learning_rate)
+        model.fit(X_fit, y_fit)
+        booster = model.get_booster()
+        booster.feature_names = feature_names
+        return booster
+
+    for shape in refit:
+        candidates.append((f"refit-{shape[0]}x{shape[1]}",
+                           {'method': 'refit', 'trees': shape[0], 'max_depth': shape[1], 'learning_rate': shape[2]},
+                           lambda shape=shape: fit(shape, X_train, y_train)))
+
+    if distill and feature_names != FEATURE_ORDER:
+        print("Skipping distillation: the teacher's features are not the serving FEATURE_ORDER")
+        distill = ()
+    if distill:
+        start = time.perf_counter()
+        X_grid = categorical_grid(X_train, samples_per_cell)
+        X_transfer = np.concatenate([X_train, X_grid])
+        y_transfer = teacher.inplace_predict(X_transfer)
+        print(f"Distillation set: {len(X_train)} training rows + {len(X_grid)} grid rows labelled by the teacher "
+              f"in {time.perf_counter() - start:.1f}s")
+        for shape in distill:
+            candidates.append((f"distill-{shape[0]}x{shape[1]}",
+                               {'method': 'distill', 'trees': shape[0], 'max_depth': shape[1],
+                                'learning_rate': shape[2], 'grid_rows': len(X_grid)},
+                               lambda shape=shape: fit(shape, X_transfer, y_transfer)))
+
+    os.makedirs(out_dir, exist_ok=True)
+    results = []
+    for name, info, build in candidates:
+        start = time.perf_counter()
+        booster = build()
+        build_seconds = time.perf_counter() - start
+        metrics = regression_metrics(y_test, booster.inplace_predict(X_test))
+        latency = measure_latency(booster, X_test)
+        candidate_path = os.path.join(out_dir, f"{name}.ubj")
+        export_native_model(booster, candidate_path, feature_names=feature_names, metrics={'test': metrics},
+                            extra={'compression': {**info, 'teacher': os.path.abspath(model_path),
+                                                   'teacher_sha256': teacher_meta.get('sha256')},
+                                   'latency': latency})
+        results.append({'name': name, **info, 'path': candidate_path, 'trees': booster.num_boosted_rounds(),
+                        'size_mb': os.path.getsize(candidate_path) / 1e6, 'build_s': build_seconds,
+                        'metrics': metrics, 'latency': latency})
+        print(f"{name}: RMSE {metrics['rmse']:.2f}, built in {build_seconds:.1f}s")
+
+    mark_frontier(results)
+    print_report(results)
+    report_path = os.path.join(out_dir, 'report.json')
+    with open(report_path, 'w') as f:
+        json.dump(results, f, indent=2, default=float)
+    print(f"\nCandidates and {report_path} written; * marks the latency/accuracy frontier")
+    return results
+
+def print_report(results):
+    batch_rows = results[0]['latency']['batch_rows']
+    print(f"\n{'Candidate':<16} {'Trees':>6} {'MB':>6} {'MAE':>9} {'RMSE':>9} {'R2':>7} {'XGB 1 row us':>13} "
+          f"{'NumPy 1 row us':>15} {f'{batch_rows} rows ms':>13} {'Frontier':>9}")
+    print('-' * 112)
+    for r in results:
+        m, t = r['metrics'], r['latency']
+        print(f"{r['name']:<16} {r['trees']:>6} {r['size_mb']:>6.2f} {m['mae']:>9.1f} {m['rmse']:>9.1f} "
+              f"{m['r2']:>7.4f} {t['xgboost_us']:>13.1f} {t.get('numpy_us', float('nan')):>15.1f} "
+              f"{t['batch_ms']:>13.2f} {'*' if r['frontier'] else '':>9}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compress a trained model and report latency vs accuracy')
+    parser.add_argument('--model', default=MODEL_SAVE_PATH, help='Teacher model (native format)')
+    parser.add_argument('--data', default=PROCESSED_DATA_PATH,
+                        help='Processed data the teacher was trained on (CSV, .parquet or npy directory)')
+    parser.add_argument('--out_dir', default=OUTPUT_DIR, help='Where candidates and report.json are written')
+    parser.add_argument('--truncate', nargs='*', type=int, default=[100, 250, 500, 750],
+                        help='Tree counts to keep from the teacher')
+    parser.add_argument('--refit', nargs='*', type=parse_shape, default=[(200, 6, 0.05), (100, 8, 0.1)],
+                        help='trees:depth:learning_rate shapes refitted on the labels')
+    parser.add_argument('--distill', nargs='*', type=parse_shape, default=[(200, 6, 0.05), (100, 8, 0.1)],
+                        help="trees:depth:learning_rate shapes fitted to the teacher's predictions")
+    parser.add_argument('--samples_per_cell', type=int, default=4,
+                        help='Distillation rows per categorical grid cell')
+    args = parser.parse_args()
+
+    compress_model(args.model, args.data, args.out_dir, args.truncate, args.refit, args.distill,
+                   args.samples_per_cell)
@@ -1,57 +1,340 @@
 # src/model_training/train.py
 import pandas as pd
+import argparse
+import hashlib
+import io
+import json
 import os
-import joblib
+import sys
+import time
 import numpy as np
+import xgboost as xgb
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from xgboost import XGBRegressor
 
-def train_model():
-    # Define paths
-    processed_data_path = os.path.join(os.path.dirname(__file__), '../../data/processed/flights_processed.csv')
-    model_save_path = os.path.join(os.path.dirname(__file__), '../../models/xgboost_model.pkl')
-    
+# Make the project root importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..'))
+from serving.model_io import export_native_model, load_model
+from src.data_processing.processing import load_processed
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROCESSED_DATA_PATH = os.path.join(BASE_DIR, '../../data/processed/flights_processed.csv')
+CATEGORICAL_DATA_PATH = os.path.join(BASE_DIR, '../../data/processed/flights_processed_categorical.csv')
+# Category lists written by processing.py; a category's code is its position in the list
+CATEGORIES_PATH = os.path.join(BASE_DIR, '../../models/categories.json')
+MODEL_SAVE_PATH = os.path.join(BASE_DIR, '../../models/xgboost_model.ubj')
+# Watermark of consumed rows and the rolling validation holdout for incremental runs
+STATE_DIR = os.path.join(BASE_DIR, '../../models/training_state')
+
+# Every HOLDOUT_EVERY-th row (by position in the processed file) is held out for validation
+HOLDOUT_EVERY = 10
+MAX_HOLDOUT_ROWS = 200000
+# Booster settings carried over when boosting continues from a saved model
+CONTINUED_PARAMS = ['eta', 'max_depth', 'subsample', 'colsample_bytree', 'min_child_weight',
+                    'lambda', 'alpha', 'gamma', 'max_bin']
+# Native names of the scikit-learn parameter names a sidecar may record
+PARAM_ALIASES = {'learning_rate': 'eta', 'reg_lambda': 'lambda', 'reg_alpha': 'alpha'}
+TAIL_BYTES = 4096
+
+MODEL_PARAMS = {
+    'n_estimators': 1000,
+    'learning_rate': 0.01,
+    'max_depth': 5,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'random_state': 42
+}
+
+def make_regressor(feature_types=None, **overrides):
+    """The serving model's estimator; 'c' in feature_types enables native categorical splits"""
+    params = dict(MODEL_PARAMS, **overrides)
+    if feature_types is not None and 'c' in feature_types:
+        params.update(enable_categorical=True, feature_types=list(feature_types))
+    return XGBRegressor(**params)
+
+def continued_params(meta):
+    """Booster params for continuing a saved model: the ones recorded in its sidecar, else make_regressor's
+
+    A reloaded Booster's own configuration has reset to XGBoost's defaults,
+    so it cannot be used here.
+    """
+    defaults = make_regressor().get_xgb_params()
+    recorded = (meta or {}).get('parameters') or {}
+    params = {}
+    for source in (defaults, recorded):
+        for name, value in source.items():
+            name = PARAM_ALIASES.get(name, name)
+            if name in CONTINUED_PARAMS and value is not None:
+                params[name] = value
+    params['objective'] = recorded.get('objective') or defaults['objective']
+    return params
+
+def categorical_features(columns, categories_path=CATEGORIES_PATH):
+    """Feature types and the category lists (for the model metadata) of a categorical-coded frame"""
+    with open(categories_path) as f:
+        categories = json.load(f)
+    feature_types = ['c' if col in categories else 'q' for col in columns]
+    return feature_types, {col: categories[col] for col in columns if col in categories}
+
+def regression_metrics(y_true, y_pred):
+    mse = mean_squared_error(y_true, y_pred)
+    return {
+        'mae': mean_absolute_error(y_true, y_pred),
+        'rmse': np.sqrt(mse),
+        'mse': mse,
+        'r2': r2_score(y_true, y_pred)
+    }
+
+def _tail_sha256(path, end):
+    """Hash of the bytes just before `end`, to detect a rewritten (not appended) file"""
+    with open(path, 'rb') as f:
+        f.seek(max(0, end - TAIL_BYTES))
+        return hashlib.sha256(f.read(end - max(0, end - TAIL_BYTES))).hexdigest()
+
+def read_watermark(state_dir=STATE_DIR):
+    path = os.path.join(state_dir, 'watermark.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def write_watermark(watermark, state_dir=STATE_DIR):
+    os.makedirs(state_dir, exist_ok=True)
+    path = os.path.join(state_dir, 'watermark.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(watermark, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+def read_new_rows(data_path, watermark):
+    """Read only the rows appended to the processed CSV since the watermark
+
+    Returns the new rows, the absolute row number of the first one, and the
+    watermark to record once they have been consumed.
+    """
+    with open(data_path, 'rb') as f:
+        header = f.readline()
+        start = f.tell()
+        rows_before = 0
+        if watermark:
+            if (os.path.getsize(data_path) < watermark['bytes']
+                    or _tail_sha256(data_path, watermark['bytes']) != watermark['tail_sha256']):
+                raise ValueError(f"{data_path} was rewritten since the last watermark; "
+                                 "run a full retrain instead of an incremental one")
+            start, rows_before = watermark['bytes'], watermark['rows']
+        f.seek(start)
+        data = f.read()
+
+    # Ignore a trailing partial line that is still being written
+    data = data[:data.rfind(b'\n') + 1]
+    new_rows = pd.read_csv(io.BytesIO(header + data)) if data else None
+    rows = rows_before + (len(new_rows) if new_rows is not None else 0)
+    return new_rows, rows_before, watermark_at(data_path, start + len(data), rows)
+
+def watermark_at(data_path, end, rows):
+    return {
+        'data_path': os.path.abspath(data_path),
+        'bytes': end,
+        'rows': rows,
+        'tail_sha256': _tail_sha256(data_path, end),
+        'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+def load_holdout(state_dir=STATE_DIR):
+    path = os.path.join(state_dir, 'holdout.npz')
+    if not os.path.exists(path):
+        return None, None
+    with np.load(path) as holdout:
+        return holdout['X'], holdout['y']
+
+def save_holdout(X, y, state_dir=STATE_DIR):
+    """Keep the most recent MAX_HOLDOUT_ROWS holdout rows so validation cost stays bounded"""
+    os.makedirs(state_dir, exist_ok=True)
+    path = os.path.join(state_dir, 'holdout.npz')
+    with open(path + '.tmp', 'wb') as f:
+        np.savez(f, X=X[-MAX_HOLDOUT_ROWS:], y=y[-MAX_HOLDOUT_ROWS:])
+    os.replace(path + '.tmp', path)
+
+def train_model(data_path=PROCESSED_DATA_PATH, model_save_path=MODEL_SAVE_PATH, state_dir=STATE_DIR,
+                categorical=False, categories_path=CATEGORIES_PATH):
+    """Full retrain; with categorical=True the data holds processing.py's
+    categorical codes and the model uses native categorical splits. The data
+    may be in any processing.py output format (--format csv|parquet|npy)"""
     # Load processed data
-    df = pd.read_csv(processed_data_path)
-    
+    is_csv = data_path.endswith('.csv')
+    data_size = os.path.getsize(data_path) if is_csv else None
+    df = load_processed(data_path)
+
     # Prepare features and target
     X = df.drop('price', axis=1)
     y = df['price']
-    
+    feature_names = list(X.columns)
+    feature_types, extra = None, {}
+    if categorical:
+        feature_types, categories = categorical_features(feature_names, categories_path)
+        extra['categories'] = categories
+        # Codes go in as plain numbers; feature_types marks them categorical
+        X = X.astype(np.float32)
+
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42
     )
-    
+
     # Initialize and train model
-    model = XGBRegressor(
-        n_estimators=1000,
-        learning_rate=0.01,
-        max_depth=5,
-        subsample=0.8,
-        colsample_bytree=0.8,
-        random_state=42
-    )
-    
-    model.fit(X_train, y_train)
-    
+    model = make_regressor(feature_types)
+    start = time.perf_counter()
+    model.fit(X_train.to_numpy() if categorical else X_train, y_train)
+    print(f"Trained in {time.perf_counter() - start:.1f}s")
+
     # Evaluate
-    y_pred = model.predict(X_test)
-    print(f"MAE: {mean_absolute_error(y_test, y_pred):.2f}")
-    
+    y_pred = model.predict(X_test.to_numpy() if categorical else X_test)
+    mae = mean_absolute_error(y_test, y_pred)
+    print(f"MAE: {mae:.2f}")
+
     # Calculate RMSE manually
     mse = mean_squared_error(y_test, y_pred)
     rmse = np.sqrt(mse)
     print(f"RMSE: {rmse:.2f}")
-    
-    print(f"R² Score: {r2_score(y_test, y_pred):.4f}")
-    
-    
-    # Save model
-    os.makedirs(os.path.dirname(model_save_path), exist_ok=True)
-    joblib.dump(model, model_save_path)
+
+    r2 = r2_score(y_test, y_pred)
+    print(f"R² Score: {r2:.4f}")
+
+
+    # Save model in native format with its metadata sidecar
+    export_native_model(
+        model.get_booster(),
+        model_save_path,
+        feature_names=feature_names,
+        metrics={'test': {'mse': mse, 'rmse': rmse, 'mae': mae, 'r2': r2}},
+        params={k: v for k, v in model.get_xgb_params().items() if v is not None},
+        extra=extra
+    )
     print(f"Model saved to: {model_save_path}")
 
+    # A full retrain consumed the whole file: later incremental runs start after it,
+    # validated on this run's test split. They read rows appended to a CSV, so
+    # other formats leave no watermark.
+    if not is_csv:
+        print("Not a CSV: no watermark written; incremental runs need a full CSV training first")
+        return
+    write_watermark(watermark_at(data_path, data_size, len(df)), state_dir)
+    save_holdout(X_test.to_numpy(dtype=np.float32), y_test.to_numpy(dtype=np.float32), state_dir)
+
+def train_incremental(data_path=PROCESSED_DATA_PATH, model_save_path=MODEL_SAVE_PATH, state_dir=STATE_DIR,
+                      rounds=100, tolerance=0.0, force=False):
+    """Continue boosting the published model on rows added since the last watermark
+
+    New rows are split into training rows and holdout rows (every
+    HOLDOUT_EVERY-th row). The candidate adds up to `rounds` trees and is
+    published only if its RMSE on the rolling holdout is no worse than the
+    current model's (within `tolerance`, relative). The watermark only moves
+    when a model is published, so rejected rows are retried next time.
+    Returns True if a new model was published.
+    """
+    start = time.perf_counter()
+    watermark = read_watermark(state_dir)
+    if watermark is None:
+        raise ValueError(f"No watermark in {state_dir}; run a full training first")
+
+    new_rows, first_row, new_watermark = read_new_rows(data_path, watermark)
+    if new_rows is None:
+        print("No new rows since the last watermark; nothing to do")
+        return False
+    print(f"Read {len(new_rows)} new rows (rows {first_row}-{new_watermark['rows'] - 1}) "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    current = load_model(model_save_path)
+    booster = current.get_booster()
+    feature_names = booster.feature_names or [c for c in new_rows.columns if c != 'price']
+    X_new = new_rows[feature_names].to_numpy(dtype=np.float32)
+    y_new = new_rows['price'].to_numpy(dtype=np.float32)
+
+    is_holdout = (np.arange(first_row, first_row + len(new_rows)) % HOLDOUT_EVERY) == 0
+    X_holdout, y_holdout = load_holdout(state_dir)
+    if X_holdout is None:
+        X_holdout, y_holdout = X_new[is_holdout], y_new[is_holdout]
+    else:
+        X_holdout = np.concatenate([X_holdout, X_new[is_holdout]])
+        y_holdout = np.concatenate([y_holdout, y_new[is_holdout]])
+    X_train, y_train = X_new[~is_holdout], y_new[~is_holdout]
+    if len(X_train) < 2 * HOLDOUT_EVERY:
+        print(f"Only {len(X_train)} new training rows; waiting for more data")
+        return False
+
+    # Early stopping uses a slice of the new training rows, not the holdout
+    es_mask = (np.arange(len(X_train)) % HOLDOUT_EVERY) == 1
+    # Native categorical models keep their feature types ('c') when boosting continues
+    feature_types = booster.feature_types
+    dtrain = xgb.DMatrix(X_train[~es_mask], label=y_train[~es_mask], feature_names=feature_names,
+                         feature_types=feature_types)
+    devals = xgb.DMatrix(X_train[es_mask], label=y_train[es_mask], feature_names=feature_names,
+                         feature_types=feature_types)
+
+    params = continued_params(getattr(current, 'meta', {}))
+    previous_rounds = booster.num_boosted_rounds()
+
+    train_start = time.perf_counter()
+    candidate = xgb.train(
+        params,
+        dtrain,
+        num_boost_round=rounds,
+        evals=[(devals, 'new_rows')],
+        early_stopping_rounds=20,
+        xgb_model=booster.copy(),
+        verbose_eval=False
+    )
+    candidate = candidate[:candidate.best_iteration + 1]
+    print(f"Added {candidate.num_boosted_rounds() - previous_rounds} trees to {previous_rounds} "
+          f"in {time.perf_counter() - train_start:.2f}s")
+
+    dholdout = xgb.DMatrix(X_holdout, feature_names=feature_names, feature_types=feature_types)
+    current_metrics = regression_metrics(y_holdout, booster.predict(dholdout))
+    candidate_metrics = regression_metrics(y_holdout, candidate.predict(dholdout))
+    print(f"Holdout ({len(y_holdout)} rows)  current RMSE {current_metrics['rmse']:.2f} MAE {current_metrics['mae']:.2f}"
+          f" | candidate RMSE {candidate_metrics['rmse']:.2f} MAE {candidate_metrics['mae']:.2f}")
+
+    if candidate_metrics['rmse'] > current_metrics['rmse'] * (1 + tolerance) and not force:
+        print("Candidate regressed on the holdout; keeping the current model and watermark")
+        return False
+
+    export_native_model(
+        candidate,
+        model_save_path,
+        feature_names=feature_names,
+        metrics={'holdout': candidate_metrics, 'previous_holdout': current_metrics},
+        params=params,
+        extra={
+            **({'categories': current.meta['categories']} if getattr(current, 'meta', {}).get('categories') else {}),
+            'parent_sha256': getattr(current, 'meta', {}).get('sha256'),
+            'trained_rows': new_watermark['rows'],
+            'incremental_rows': int(len(X_train))
+        }
+    )
+    write_watermark(new_watermark, state_dir)
+    save_holdout(X_holdout, y_holdout, state_dir)
+    print(f"Published {model_save_path} (watermark now {new_watermark['rows']} rows) "
+          f"in {time.perf_counter() - start:.2f}s total")
+    return True
+
 if __name__ == "__main__":
-    train_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Train the serving model')
+    parser.add_argument('--data', default=None,
+                        help='Processed data: CSV, .parquet or npy directory '
+                             '(default: flights_processed.csv, or _categorical.csv with --categorical)')
+    parser.add_argument('--model', default=MODEL_SAVE_PATH, help='Model to write (and continue from)')
+    parser.add_argument('--state_dir', default=STATE_DIR, help='Watermark and holdout directory')
+    parser.add_argument('--incremental', action='store_true', help='Continue from the current model on new rows only')
+    parser.add_argument('--rounds', type=int, default=100, help='Maximum trees added per incremental run')
+    parser.add_argument('--tolerance', type=float, default=0.0, help='Allowed relative RMSE increase on the holdout')
+    parser.add_argument('--force', action='store_true', help='Publish even if the holdout metrics regress')
+    parser.add_argument('--categorical', action='store_true',
+                        help='Train on categorical codes (processing.py --encoding categorical) with native splits')
+    parser.add_argument('--categories', default=CATEGORIES_PATH, help='Category lists written by processing.py')
+    args = parser.parse_args()
+    data_path = args.data or (CATEGORICAL_DATA_PATH if args.categorical else PROCESSED_DATA_PATH)
+
+    if args.incremental:
+        train_incremental(data_path, args.model, args.state_dir, args.rounds, args.tolerance, args.force)
+    else:
+        train_model(data_path, args.model, args.state_dir, args.categorical, args.categories)
@@ -0,0 +1,174 @@
+"""Pluggable scraper backends sharing one interface.
+
+``selenium`` drives headless Chrome through a pool of reusable drivers and
+sees the page exactly as a user would. ``http`` fetches the search result
+HTML/JSON with aiohttp over pooled keep-alive connections and parses prices
+directly, which is far cheaper when a site serves its results without
+client-side rendering::
+
+    from scraper.backends import create_backend
+
+    with create_backend('http', 'mmt') as backend:
+        prices = backend.search('DEL', 'BOM', '15/04/2023')
+        batches = backend.fetch_many([backend.search_url(...), ...])
+"""
+import asyncio
+import importlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from scraper.scheduler import ScrapeScheduler, SessionPool
+from scraper.sites import SITES
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36")
+
+
+class ScraperBackend:
+    """Fetch search pages for one site and return their prices.
+
+    Subclasses implement `fetch_prices(url)` (thread-safe, raises on
+    failure) and may override `fetch_many(urls)` with something more
+    concurrent than the default loop.
+    """
+
+    name = None
+
+    def __init__(self, site):
+        self.site = SITES[site] if isinstance(site, str) else site
+
+    def search_url(self, origin, destination, date) -> str:
+        return self.site.search_url(origin, destination, date)
+
+    def search(self, origin, destination, date) -> list:
+        return self.fetch_prices(self.search_url(origin, destination, date))
+
+    def fetch_prices(self, url) -> list:
+        raise NotImplementedError
+
+    def fetch_many(self, urls) -> list:
+        """Prices for each URL, or the exception raised for it."""
+        return [self._fetch_or_error(url) for url in urls]
+
+    def _fetch_or_error(self, url):
+        try:
+            return self.fetch_prices(url)
+        except Exception as e:
+            return e
+
+    def scheduler(self, **kwargs) -> ScrapeScheduler:
+        """A ScrapeScheduler whose workers all call into this backend."""
+        return ScrapeScheduler(
+            scrape=lambda backend, url: backend.fetch_prices(url),
+            url_for=lambda task: self.search_url(*task),
+            session_factory=lambda: self,
+            close_session=lambda backend: None,
+            **kwargs
+        )
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SeleniumBackend(ScraperBackend):
+    """Headless Chrome, one reusable driver per concurrent fetch."""
+
+    name = 'selenium'
+
+    def __init__(self, site, workers: int = 2, driver_factory=None):
+        super().__init__(site)
+        module_name, function_name = self.site.selenium_page.split(':')
+        self.scrape_page = getattr(importlib.import_module(module_name), function_name)
+        if driver_factory is None:
+            from scraper.mmt_scraper import create_driver as driver_factory
+        self.workers = workers
+        self.pool = SessionPool(driver_factory, workers)
+
+    def fetch_prices(self, url) -> list:
+        with self.pool.session() as driver:
+            return self.scrape_page(driver, url)
+
+    def fetch_many(self, urls) -> list:
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(self._fetch_or_error, urls))
+
+    def close(self):
+        self.pool.close()
+
+
+class AsyncHttpBackend(ScraperBackend):
+    """aiohttp client on a private event loop thread with a keep-alive connection pool.
+
+    Synchronous callers (including ScrapeScheduler worker threads) submit
+    coroutines to the loop, so every caller shares the same connections.
+    """
+
+    name = 'http'
+
+    def __init__(self, site, concurrency: int = 32, limit_per_host: int = 8, timeout: float = 15,
+                 headers: dict = None):
+        super().__init__(site)
+        import aiohttp
+        self._aiohttp = aiohttp
+        self.concurrency = concurrency
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.headers = {'User-Agent': USER_AGENT,
+                        'Accept': 'application/json;q=0.9, text/html;q=0.8',
+                        **(headers or {})}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._session = self._run(self._open())
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def _open(self):
+        connector = self._aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.limit_per_host,
+                                               keepalive_timeout=30)
+        return self._aiohttp.ClientSession(connector=connector, headers=self.headers,
+                                           timeout=self._aiohttp.ClientTimeout(total=self.timeout))
+
+    async def _fetch(self, url) -> list:
+        async with self._session.get(url) as response:
+            response.raise_for_status()
+            if response.content_type == 'application/json' and self.site.parse_json:
+                return self.site.parse_json(await response.json())
+            return self.site.parse_html(await response.text())
+
+    async def _fetch_many(self, urls) -> list:
+        return await asyncio.gather(*(self._fetch(url) for url in urls), return_exceptions=True)
+
+    def fetch_prices(self, url) -> list:
+        return self._run(self._fetch(url))
+
+    def fetch_many(self, urls) -> list:
+        # The connector's limits bound how many requests are in flight at once
+        return self._run(self._fetch_many(list(urls)))
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        self._run(self._session.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+BACKENDS = {
+    SeleniumBackend.name: SeleniumBackend,
+    AsyncHttpBackend.name: AsyncHttpBackend,
+}
+
+
+def create_backend(name: str, site: str = 'mmt', **kwargs) -> ScraperBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown scraper backend {name!r}; choose from {sorted(BACKENDS)}")
+    return BACKENDS[name](site, **kwargs)
@@ -0,0 +1,128 @@
+"""Local mock of the fare sites' results pages, for offline scraper runs.
+
+Serves deterministic prices per search, plus optional latency and a failure
+rate (HTTP 503) to exercise retries:
+
+- ``/flight/search?itinerary=DEL-BOM-15-04-2023`` renders
+  ``fixtures/mmt_results.html``, or JSON when the client prefers
+  ``application/json``
+- ``/travel/flights?q=...`` renders ``fixtures/google_results.html``
+
+::
+
+    python -m scraper.fixture_server --port 8765 --latency 0.2
+
+then point the scrapers at it with ``MMT_BASE_URL=http://127.0.0.1:8765``
+and ``GOOGLE_FLIGHTS_BASE_URL=http://127.0.0.1:8765``.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+MMT_CARD = '    <div class="priceSection"><p class="actual-price">₹ {price:,}</p></div>'
+GOOGLE_CARD = ('    <li><div class="YMlIz FpEdX"><span aria-label="{price} Indian rupees" '
+               'role="text">₹{price:,}</span></div></li>')
+POPUP = '<div class="modal"><span class="close">×</span></div>'
+
+
+def _template(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def itinerary_prices(itinerary: str, count: int = 8) -> list:
+    """Deterministic, ascending fake fares for an itinerary."""
+    seed = int.from_bytes(hashlib.blake2b(itinerary.encode(), digest_size=8).digest(), 'little')
+    rng = random.Random(seed)
+    return sorted(rng.randint(2500, 25000) for _ in range(count))
+
+
+def render_results(itinerary: str, popup: bool = False) -> str:
+    parts = itinerary.split('-', 2)
+    origin, destination, day = parts if len(parts) == 3 else (itinerary, '', '')
+    cards = '\n'.join(MMT_CARD.format(price=price) for price in itinerary_prices(itinerary))
+    return _template('mmt_results.html').format(origin=origin, destination=destination, date=day,
+                                                popup=POPUP if popup else '', cards=cards)
+
+
+def render_results_json(itinerary: str) -> str:
+    flights = [{'rank': i, 'price': price} for i, price in enumerate(itinerary_prices(itinerary))]
+    return json.dumps({'itinerary': itinerary, 'flights': flights})
+
+
+def render_google_results(query: str) -> str:
+    cards = '\n'.join(GOOGLE_CARD.format(price=price) for price in itinerary_prices(query))
+    return _template('google_results.html').format(query=query, cards=cards)
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real site
+
+    def do_GET(self):
+        server = self.server
+        parsed = urlparse(self.path)
+        with server.stats_lock:
+            server.requests += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if parsed.path not in ('/flight/search', '/travel/flights'):
+            return self._send(404, 'Not found')
+        if server.failure_rate and server.rng.random() < server.failure_rate:
+            return self._send(503, 'Service unavailable')
+        query = parse_qs(parsed.query)
+        if parsed.path == '/travel/flights':
+            return self._send(200, render_google_results(query.get('q', [''])[0]))
+        itinerary = query.get('itinerary', [''])[0]
+        if self.headers.get('Accept', '').startswith('application/json'):
+            return self._send(200, render_results_json(itinerary), 'application/json')
+        self._send(200, render_results(itinerary, popup=server.popup))
+
+    def _send(self, status, body, content_type='text/html'):
+        payload = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fixture_server(port: int = 0, latency: float = 0.0, failure_rate: float = 0.0,
+                         popup: bool = False, seed: int = 0):
+    """Start the mock in a background thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), FixtureHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.failure_rate = failure_rate
+    server.popup = popup
+    server.rng = random.Random(seed)
+    server.requests = 0
+    server.stats_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve the offline results page mock')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds of delay per request')
+    parser.add_argument('--failure_rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    parser.add_argument('--popup', action='store_true', help='Render a closable popup over the results')
+    args = parser.parse_args()
+
+    server, base_url = start_fixture_server(args.port, args.latency, args.failure_rate, args.popup)
+    print(f"Serving results mock at {base_url}/flight/search?itinerary=DEL-BOM-15-04-2023")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,49 @@
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from scraper.mmt_scraper import create_driver
+from scraper.sites import GOOGLE_PRICE_LABEL, google_search_url as search_url
+
+# Google Flights class names are generated, so prices are matched on their accessible label
+PRICE_SELECTOR = "[aria-label$='Indian rupees']"
+NO_RESULTS_SELECTOR = "[role='alert']"
+
+def scrape_google_page(driver, url, timeout=15, limit=5):
+    """Load a Google Flights search in an existing driver and return up to `limit` prices
+
+    Raises TimeoutException if neither prices nor a no-results alert appear.
+    """
+    driver.get(url)
+    WebDriverWait(driver, timeout).until(EC.any_of(
+        EC.presence_of_element_located((By.CSS_SELECTOR, PRICE_SELECTOR)),
+        EC.presence_of_element_located((By.CSS_SELECTOR, NO_RESULTS_SELECTOR))
+    ))
+
+    google_prices = []
+    for element in driver.find_elements(By.CSS_SELECTOR, PRICE_SELECTOR):
+        match = GOOGLE_PRICE_LABEL.match(element.get_attribute('aria-label') or '')
+        if match:
+            google_prices.append(int(match.group(1).replace(',', '')))
+        if len(google_prices) == limit:
+            break
+    return google_prices
+
+def scrape_google_flights(origin, destination, date, driver=None):
+    """Scrape one search; starts and quits its own browser unless a driver is given"""
+    owns_driver = driver is None
+    try:
+        if owns_driver:
+            driver = create_driver()
+        url = search_url(origin, destination, date)
+        print(f"Accessing URL: {url}")
+        return scrape_google_page(driver, url)
+    except TimeoutException:
+        print("Timeout waiting for price elements")
+        return []
+    except Exception as e:
+        print(f"Google Flights Scrape Error: {e}")
+        return []
+    finally:
+        if owns_driver and driver is not None:
+            driver.quit()
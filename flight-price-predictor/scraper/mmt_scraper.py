@@ -5,68 +5,79 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-import time
+import os
+from scraper.sites import mmt_search_url as search_url
 
-def scrape_mmt(origin, destination, date):
+CHROMEDRIVER_PATH = os.environ.get('CHROMEDRIVER_PATH', 'path/to/chromedriver')  # Update this path
+
+PRICE_SELECTOR = ".priceSection .actual-price"
+NO_RESULTS_SELECTOR = ".no-flights, .error-section"
+POPUP_SELECTOR = ".close"
+
+def create_driver():
+    """Start a headless Chrome session that can be reused across searches"""
+    # Setup Chrome options for less detection
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36")
+
+    service = Service(CHROMEDRIVER_PATH)
+    return webdriver.Chrome(service=service, options=chrome_options)
+
+def scrape_mmt_page(driver, url, timeout=15, limit=5):
+    """Load a search page in an existing driver and return up to `limit` prices
+
+    Waits only as long as it takes for prices (or a no-results marker) to
+    appear instead of sleeping for a fixed time. Raises TimeoutException if
+    neither shows up so callers can retry.
+    """
+    driver.get(url)
+
+    # Returns as soon as the results, an empty-results marker, or a popup is present
+    WebDriverWait(driver, timeout).until(EC.any_of(
+        EC.presence_of_element_located((By.CSS_SELECTOR, PRICE_SELECTOR)),
+        EC.presence_of_element_located((By.CSS_SELECTOR, NO_RESULTS_SELECTOR)),
+        EC.element_to_be_clickable((By.CSS_SELECTOR, POPUP_SELECTOR))
+    ))
+
+    popups = driver.find_elements(By.CSS_SELECTOR, POPUP_SELECTOR)
+    if popups and popups[0].is_displayed():
+        popups[0].click()
+        WebDriverWait(driver, timeout).until(EC.any_of(
+            EC.presence_of_element_located((By.CSS_SELECTOR, PRICE_SELECTOR)),
+            EC.presence_of_element_located((By.CSS_SELECTOR, NO_RESULTS_SELECTOR))
+        ))
+
+    # Process price text
+    mmt_prices = []
+    for price in driver.find_elements(By.CSS_SELECTOR, PRICE_SELECTOR)[:limit]:
+        try:
+            price_text = price.text.replace('₹', '').replace(',', '')
+            if price_text.strip():
+                mmt_prices.append(int(price_text))
+        except ValueError:
+            print(f"Could not parse price: {price.text}")
+    return mmt_prices
+
+def scrape_mmt(origin, destination, date, driver=None):
+    """Scrape one search; starts and quits its own browser unless a driver is given"""
+    owns_driver = driver is None
     try:
-        # Setup Chrome options for less detection
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36")
-        
-        # Initialize driver
-        service = Service("path/to/chromedriver")  # Update this path
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        
-        # Format date to DD-MM-YYYY if needed
-        # Example: Convert '15/10/2023' to '15-10-2023' if needed
-        formatted_date = date.replace('/', '-')
-        
-        # Build the correct MakeMyTrip URL format
-        url = f"https://www.makemytrip.com/flight/search?itinerary={origin}-{destination}-{formatted_date}"
+        if owns_driver:
+            driver = create_driver()
+        url = search_url(origin, destination, date)
         print(f"Accessing URL: {url}")
-        
-        driver.get(url)
-        
-        # Wait for the page to load and handle any popup
-        time.sleep(5)  # Initial wait for page load
-        
-        try:
-            # Handle common popup (adjust selector as needed)
-            popup = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, ".close"))
-            )
-            popup.click()
-        except:
-            print("No popup found or unable to close it")
-        
-        # Wait for prices to load (adjust selector to match the actual price elements)
-        try:
-            WebDriverWait(driver, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".priceSection .actual-price"))
-            )
-        except TimeoutException:
-            print("Timeout waiting for price elements")
-        
-        # Extract prices with more specific selector
-        prices = driver.find_elements(By.CSS_SELECTOR, ".priceSection .actual-price")
-        
-        # Process price text
-        mmt_prices = []
-        for price in prices[:5]:  # Limit to top 5
-            try:
-                price_text = price.text.replace('₹', '').replace(',', '')
-                if price_text.strip():
-                    mmt_prices.append(int(price_text))
-            except ValueError:
-                print(f"Could not parse price: {price.text}")
-        
-        driver.quit()
-        return mmt_prices
+        return scrape_mmt_page(driver, url)
+    except TimeoutException:
+        print("Timeout waiting for price elements")
+        return []
     except Exception as e:
         print(f"MMT Scrape Error: {e}")
-        return []
\ No newline at end of file
+        return []
+    finally:
+        if owns_driver and driver is not None:
+            driver.quit()
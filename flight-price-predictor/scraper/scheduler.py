@@ -0,0 +1,285 @@
+"""Concurrent scraping scheduler for grids of (origin, destination, date) searches.
+
+A fixed pool of browser sessions is shared by worker threads, requests are
+rate limited per host, failed searches are retried with exponential backoff,
+and every finished task is appended to a JSONL store. The store doubles as
+the checkpoint: rerunning the same command skips tasks that already have an
+``ok`` record, so an interrupted run resumes where it stopped.
+
+Scrape a route × date grid from MakeMyTrip with::
+
+    python -m scraper.scheduler --routes DEL-BOM BOM-DEL --start 2025-01-01 --days 30 \\
+        --store data/scraped/mmt.jsonl --workers 4 --rate 0.5 --backend selenium
+
+(``--backend`` and ``--site`` pick an implementation from ``scraper.backends``;
+``--history_db`` feeds the fares into serving/price_history.py's store.)
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import date, timedelta
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+def task_id(task) -> str:
+    origin, destination, day = task
+    return f"{origin}-{destination}-{day}"
+
+
+def build_tasks(routes, start: date, days: int, date_format: str = '%d/%m/%Y') -> list:
+    """Expand 'DEL-BOM' style routes over `days` consecutive dates."""
+    tasks = []
+    for route in routes:
+        origin, destination = route.split('-')
+        for offset in range(days):
+            tasks.append((origin, destination, (start + timedelta(days=offset)).strftime(date_format)))
+    return tasks
+
+
+class SessionPool:
+    """Bounded pool of reusable scraping sessions (e.g. browser drivers).
+
+    Sessions are created lazily up to `size`; a session that raised during a
+    task is closed and replaced on next use instead of being handed out again.
+    """
+
+    def __init__(self, factory, size: int, close=None):
+        self.factory = factory
+        self.close_session = close or (lambda session: session.quit())
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._all = []
+        self.created = 0
+
+    @contextmanager
+    def session(self):
+        self._slots.acquire()
+        try:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                session = self.factory()
+                with self._lock:
+                    self._all.append(session)
+                    self.created += 1
+            try:
+                yield session
+            except BaseException:
+                self._discard(session)
+                raise
+            self._idle.put(session)
+        finally:
+            self._slots.release()
+
+    def _discard(self, session):
+        with self._lock:
+            if session in self._all:
+                self._all.remove(session)
+        try:
+            self.close_session(session)
+        except Exception as e:
+            logger.warning("Failed to close session: %s", e)
+
+    def close(self):
+        with self._lock:
+            sessions, self._all = self._all, []
+        for session in sessions:
+            try:
+                self.close_session(session)
+            except Exception as e:
+                logger.warning("Failed to close session: %s", e)
+
+
+class HostRateLimiter:
+    """Token bucket per host: at most `rate` requests/sec with bursts of `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str) -> float:
+        """Block until a request to `host` is allowed; returns seconds waited."""
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            tokens, last = self._buckets.get(host, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            # Reserve a token now (possibly going negative) and sleep off the debt
+            # outside the lock, so waiting threads are served in arrival order
+            tokens -= 1
+            self._buckets[host] = (tokens, now)
+        delay = -tokens / self.rate if tokens < 0 else 0.0
+        if delay:
+            time.sleep(delay)
+        return delay
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter for the given (0-based) retry."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class ResultStore:
+    """Append-only JSONL file of task results; also the resume checkpoint."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def completed_ids(self) -> set:
+        done = set()
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A run killed mid-write can leave a truncated last line
+                    continue
+                if record.get('status') == 'ok':
+                    done.add(record['task_id'])
+        return done
+
+    def append(self, record: dict) -> None:
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ScrapeScheduler:
+    """Run scrape tasks concurrently over a session pool.
+
+    `scrape(session, url)` returns a list of prices and raises on failure;
+    `url_for(task)` builds the search URL whose host is rate limited.
+    """
+
+    def __init__(self, scrape, url_for, session_factory, close_session=None,
+                 workers: int = 4, rate: float = 1.0, burst: int = 1,
+                 retries: int = 3, backoff: float = 1.0):
+        self.scrape = scrape
+        self.url_for = url_for
+        self.workers = workers
+        self.pool = SessionPool(session_factory, workers, close_session)
+        self.limiter = HostRateLimiter(rate, burst)
+        self.retries = retries
+        self.backoff = backoff
+        self.stop_event = threading.Event()
+
+    def run_task(self, task) -> dict:
+        url = self.url_for(task)
+        host = urlparse(url).netloc
+        start = time.perf_counter()
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                # Interruptible sleep so an interrupted run does not wait out long backoffs
+                if self.stop_event.wait(backoff_delay(attempt - 1, self.backoff)):
+                    break
+            self.limiter.wait(host)
+            try:
+                with self.pool.session() as session:
+                    prices = self.scrape(session, url)
+                return self._record(task, 'ok', attempt + 1, start, prices=prices)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                logger.warning("Task %s attempt %d failed: %s", task_id(task), attempt + 1, error)
+        return self._record(task, 'failed', attempt + 1, start, error=error)
+
+    @staticmethod
+    def _record(task, status, attempts, start, prices=None, error=None) -> dict:
+        origin, destination, day = task
+        record = {
+            'task_id': task_id(task),
+            'origin': origin,
+            'destination': destination,
+            'date': day,
+            'status': status,
+            'prices': prices or [],
+            'attempts': attempts,
+            'elapsed': round(time.perf_counter() - start, 3),
+            'scraped_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        if error:
+            record['error'] = error
+        return record
+
+    def run(self, tasks, store: ResultStore) -> dict:
+        """Scrape every task without an 'ok' record in the store; returns a summary."""
+        done = store.completed_ids()
+        pending = [task for task in tasks if task_id(task) not in done]
+        logger.info("%d tasks, %d already done, %d to scrape", len(tasks), len(tasks) - len(pending), len(pending))
+
+        summary = {'total': len(tasks), 'skipped': len(tasks) - len(pending), 'ok': 0, 'failed': 0}
+        start = time.perf_counter()
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            futures = [executor.submit(self.run_task, task) for task in pending]
+            # Store results in completion order so a slow task never holds back finished ones
+            for future in as_completed(futures):
+                record = future.result()
+                store.append(record)
+                summary[record['status']] += 1
+        except KeyboardInterrupt:
+            # Finished tasks are already in the store; the next run resumes from there
+            self.stop_event.set()
+            raise
+        finally:
+            executor.shutdown(cancel_futures=True)
+            self.pool.close()
+        elapsed = time.perf_counter() - start
+        summary['seconds'] = round(elapsed, 2)
+        summary['tasks_per_minute'] = round((summary['ok'] + summary['failed']) / elapsed * 60, 1) if elapsed else 0.0
+        summary['sessions_created'] = self.pool.created
+        return summary
+
+
+if __name__ == "__main__":
+    from scraper.backends import BACKENDS, create_backend
+    from scraper.sites import SITES
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    parser = argparse.ArgumentParser(description='Scrape a grid of routes and dates')
+    parser.add_argument('--routes', nargs='+', required=True, help='Routes like DEL-BOM')
+    parser.add_argument('--start', default=date.today().isoformat(), help='First date (YYYY-MM-DD)')
+    parser.add_argument('--days', type=int, default=30, help='Consecutive dates per route')
+    parser.add_argument('--site', choices=sorted(SITES), default='mmt', help='Fare site to scrape')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='selenium', help='Scraper backend')
+    parser.add_argument('--store', default='data/scraped/mmt.jsonl', help='Append-only JSONL results')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent tasks (browser sessions for selenium)')
+    parser.add_argument('--rate', type=float, default=0.5, help='Requests per second per host')
+    parser.add_argument('--retries', type=int, default=3, help='Retries per task')
+    parser.add_argument('--history_db', help='Also ingest new fares into this price history database '
+                                             '(see serving/price_history.py)')
+    args = parser.parse_args()
+
+    tasks = build_tasks(args.routes, date.fromisoformat(args.start), args.days)
+    backend_options = {'workers': args.workers} if args.backend == 'selenium' else {}
+    store = ResultStore(args.store)
+    try:
+        with create_backend(args.backend, args.site, **backend_options) as backend:
+            scheduler = backend.scheduler(workers=args.workers, rate=args.rate, retries=args.retries)
+            print(json.dumps(scheduler.run(tasks, store), indent=2))
+    finally:
+        store.close()
+    if args.history_db:
+        from serving.price_history import PriceHistoryStore
+        PriceHistoryStore(args.history_db).ingest_jsonl(args.store)
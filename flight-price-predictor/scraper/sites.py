@@ -0,0 +1,152 @@
+"""Search URLs and price parsers for the supported fare sites.
+
+Nothing here depends on Selenium, so the same URL builders and parsers are
+shared by every scraper backend (see ``scraper.backends``).
+"""
+import os
+import re
+from datetime import datetime
+from html.parser import HTMLParser
+from urllib.parse import quote
+
+# Overridable so scrapers can be pointed at a local stand-in of the results pages
+MMT_BASE_URL = os.environ.get('MMT_BASE_URL', 'https://www.makemytrip.com')
+GOOGLE_FLIGHTS_BASE_URL = os.environ.get('GOOGLE_FLIGHTS_BASE_URL', 'https://www.google.com')
+
+GOOGLE_PRICE_LABEL = re.compile(r'^\s*([\d,]+)\s+Indian rupees', re.IGNORECASE)
+
+# HTML elements that never have an end tag, so must not open a nesting level
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param',
+                 'source', 'track', 'wbr'}
+
+
+def parse_price_text(text: str):
+    """'₹ 5,953' -> 5953; None if there is no number."""
+    digits = text.replace('₹', '').replace(',', '').strip()
+    try:
+        return int(digits) if digits else None
+    except ValueError:
+        return None
+
+
+def mmt_search_url(origin, destination, date, base_url=None):
+    """MakeMyTrip search URL; dates like '15/10/2023' become '15-10-2023'."""
+    formatted_date = date.replace('/', '-')
+    return f"{base_url or MMT_BASE_URL}/flight/search?itinerary={origin}-{destination}-{formatted_date}"
+
+
+def google_search_url(origin, destination, date, base_url=None):
+    """Google Flights search URL; accepts DD/MM/YYYY, DD-MM-YYYY or ISO dates."""
+    for fmt in ('%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d'):
+        try:
+            iso_date = datetime.strptime(date, fmt).strftime('%Y-%m-%d')
+            break
+        except ValueError:
+            continue
+    else:
+        raise ValueError(f"Unrecognized date: {date}")
+    query = quote(f"Flights to {destination} from {origin} on {iso_date} one way")
+    return f"{base_url or GOOGLE_FLIGHTS_BASE_URL}/travel/flights?q={query}&curr=INR&hl=en"
+
+
+class PriceParser(HTMLParser):
+    """Collect text of elements with `price_class` nested in a `section_class` element."""
+
+    def __init__(self, section_class: str, price_class: str):
+        super().__init__()
+        self.section_class = section_class
+        self.price_class = price_class
+        self.prices = []
+        self._section_depth = 0
+        self._price_depth = 0
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_ELEMENTS:
+            return
+        classes = (dict(attrs).get('class') or '').split()
+        if self._section_depth:
+            self._section_depth += 1
+        elif self.section_class in classes:
+            self._section_depth = 1
+        if self._price_depth:
+            self._price_depth += 1
+        elif self._section_depth and self.price_class in classes:
+            self._price_depth = 1
+            self._text = []
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS:
+            return
+        if self._price_depth:
+            self._price_depth -= 1
+            if not self._price_depth:
+                self.prices.append(''.join(self._text))
+        if self._section_depth:
+            self._section_depth -= 1
+
+    def handle_data(self, data):
+        if self._price_depth:
+            self._text.append(data)
+
+
+class AriaPriceParser(HTMLParser):
+    """Collect prices from `aria-label="5953 Indian rupees"` attributes."""
+
+    def __init__(self):
+        super().__init__()
+        self.prices = []
+
+    def handle_starttag(self, tag, attrs):
+        match = GOOGLE_PRICE_LABEL.match(dict(attrs).get('aria-label') or '')
+        if match:
+            self.prices.append(match.group(1))
+
+
+def _first_prices(texts, limit):
+    prices = []
+    for text in texts:
+        price = parse_price_text(text)
+        if price is not None:
+            prices.append(price)
+        if len(prices) == limit:
+            break
+    return prices
+
+
+def parse_mmt_html(html: str, limit: int = 5) -> list:
+    parser = PriceParser('priceSection', 'actual-price')
+    parser.feed(html)
+    return _first_prices(parser.prices, limit)
+
+
+def parse_mmt_json(data, limit: int = 5) -> list:
+    """Search-result JSON with a list of fares under 'flights' or 'results'."""
+    flights = data.get('flights') or data.get('results') or []
+    return _first_prices((str(f.get('price', '')) for f in flights), limit)
+
+
+def parse_google_html(html: str, limit: int = 5) -> list:
+    parser = AriaPriceParser()
+    parser.feed(html)
+    return _first_prices(parser.prices, limit)
+
+
+class Site:
+    """URL builder and parsers for one site, plus its Selenium page scraper."""
+
+    def __init__(self, name, search_url, parse_html, parse_json=None, selenium_page=None):
+        self.name = name
+        self.search_url = search_url
+        self.parse_html = parse_html
+        self.parse_json = parse_json
+        # 'module:function' taking (driver, url); imported lazily so Selenium stays optional
+        self.selenium_page = selenium_page
+
+
+SITES = {
+    'mmt': Site('mmt', mmt_search_url, parse_mmt_html, parse_mmt_json,
+                selenium_page='scraper.mmt_scraper:scrape_mmt_page'),
+    'google': Site('google', google_search_url, parse_google_html,
+                   selenium_page='scraper.googleFlights_scraper:scrape_google_page'),
+}
@@ -1,5 +1,10 @@
+import os
+import sys
 import requests
-from mmt_scraper import scrape_mmt  # Ensure this import is correct
+
+# Make the project root importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from scraper.mmt_scraper import scrape_mmt
 
 # Test 1: MMT Scraper
 def test_scraper():
@@ -15,11 +20,37 @@ def test_prediction_api():
     print("\nTesting prediction API...")
     url = "http://localhost:5000/predict"
     
-    # Align with your API's expected input (e.g., origin/destination/date)
+    # /predict takes the model's features: numeric fields plus one-hot
+    # categories in serving.features.FEATURE_ORDER (Delhi -> Mumbai, Vistara,
+    # Economy, non-stop, Morning -> Afternoon as time-of-day codes 0-5)
     sample_data = {
-        "origin": "DEL",
-        "destination": "BOM",
-        "date": "2023-04-15"  # Use ISO format
+        "duration": 2.17,  # hours
+        "days_left": 15,
+        "departure_time": 1,
+        "arrival_time": 2,
+        "airline_AirAsia": 0,
+        "airline_Air_India": 0,
+        "airline_GO_FIRST": 0,
+        "airline_Indigo": 0,
+        "airline_SpiceJet": 0,
+        "airline_Vistara": 1,
+        "source_city_Bangalore": 0,
+        "source_city_Chennai": 0,
+        "source_city_Delhi": 1,
+        "source_city_Hyderabad": 0,
+        "source_city_Kolkata": 0,
+        "source_city_Mumbai": 0,
+        "destination_city_Bangalore": 0,
+        "destination_city_Chennai": 0,
+        "destination_city_Delhi": 0,
+        "destination_city_Hyderabad": 0,
+        "destination_city_Kolkata": 0,
+        "destination_city_Mumbai": 1,
+        "class_Business": 0,
+        "class_Economy": 1,
+        "stops_one": 0,
+        "stops_two_or_more": 0,
+        "stops_zero": 1
     }
     
     try:
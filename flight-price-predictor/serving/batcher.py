@@ -0,0 +1,115 @@
+"""Coalesce concurrent scoring requests into micro-batches.
+
+Request handlers on an asyncio event loop ``await batcher.submit(rows)``.
+A collector task drains the queue into one batch until it holds
+`max_batch_size` rows or `max_wait_us` microseconds have passed since the
+first request in it arrived, then runs a single vectorized ``score`` call
+on a worker thread and hands each request its slice of the result. While
+a batch is being scored the next one keeps filling, so under load batches
+grow on their own. The wait only applies while traffic is concurrent (the
+previous batch held more than one request); an isolated request is scored
+immediately.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Dynamic micro-batcher around ``score(matrix) -> (values, context)``.
+
+    `context` (for example the model version that scored the batch) is
+    returned to every request in the batch alongside its own values.
+    """
+
+    def __init__(self, score, max_batch_size: int = 64, max_wait_us: int = 2000):
+        self.score = score
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_us / 1e6
+        self.batches = 0
+        self.rows = 0
+        self._last_batch_requests = 0
+        self._queue = None
+        self._task = None
+        self._executor = None
+
+    def start(self) -> None:
+        """Start the collector on the running event loop."""
+        if self._task is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='micro-batcher')
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._collect())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._executor.shutdown(wait=False)
+
+    async def submit(self, matrix: np.ndarray):
+        """Score `matrix` as part of the next batch; returns (values, context)."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((matrix, future))
+        return await future
+
+    async def _next_batch(self) -> list:
+        batch = [await self._queue.get()]
+        rows = len(batch[0][0])
+        # Only hold a batch open when the last one showed concurrent traffic,
+        # so a lone request at low load is scored straight away
+        deadline = time.monotonic() + (self.max_wait if self._last_batch_requests > 1 else 0.0)
+        while rows < self.max_batch_size:
+            # Take whatever is already queued before deciding whether to wait
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            self._last_batch_requests = len(batch)
+            matrices = [matrix for matrix, _ in batch]
+            try:
+                values, context = await loop.run_in_executor(self._executor, self.score, np.vstack(matrices))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.rows += len(values)
+            offset = 0
+            for matrix, future in batch:
+                if not future.done():  # the client may have gone away
+                    future.set_result((values[offset:offset + len(matrix)], context))
+                offset += len(matrix)
+
+    def stats(self) -> dict:
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_batch_rows': round(self.rows / self.batches, 2) if self.batches else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_us': int(self.max_wait * 1e6),
+        }
@@ -0,0 +1,341 @@
+"""Offline bulk scoring of large itinerary files with the serving model.
+
+Reads a CSV or Parquet file in chunks. Rows follow either request schema:
+the one-hot columns of FEATURE_ORDER (v1) or plain category values (v2,
+e.g. the raw Clean_Dataset.csv columns). Each chunk is validated and encoded
+as /predict would handle it row by row, priced by a pool of worker processes
+that each load the model once, and appended to an output CSV of
+``row, [kept columns], price, status, error``. Prices are rounded as the HTTP
+endpoint rounds them, so every row matches what /predict returns for it.
+
+::
+
+    python -m serving.bulk_score data/raw/Clean_Dataset.csv output/prices.csv --workers 4
+
+Progress is checkpointed after every chunk in ``<output>.progress.json``; if
+the run dies, the same command resumes after the last checkpointed chunk.
+The model is resolved as the server resolves it: the registry's CURRENT
+version, else MODEL_PATH.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from serving.features import (CATEGORY_BLOCKS, CATEGORY_COLUMNS, FEATURE_ORDER, NUMERIC_FIELDS, TIME_SLOT_CODES,
+                              TIME_SLOTS, days_until)
+from serving.registry import ModelBundle, ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(BASE_DIR, 'models')
+DEFAULT_MODEL_PATH = os.path.join(MODEL_DIR, 'xgboost_model.ubj')
+DEFAULT_FARE_TABLE_PATH = os.path.join(MODEL_DIR, 'fare_table.npy')
+
+CHUNK_ROWS = 100000
+# Input columns either schema can use; everything else is skipped while parsing
+INPUT_COLUMNS = set(FEATURE_ORDER) | set(CATEGORY_COLUMNS) | {'departure_date'}
+
+_worker_bundle = None
+
+
+def progress_path_for(output_path: str) -> str:
+    return output_path + '.progress.json'
+
+
+def resolve_model(model_path: str = None, registry_dir: str = None):
+    """(model path, version) the server would load: an explicit path, the registry's CURRENT or MODEL_PATH."""
+    if model_path:
+        return model_path, None
+    registry = ModelRegistry(registry_dir or os.environ.get('MODEL_REGISTRY_DIR', os.path.join(MODEL_DIR, 'registry')))
+    version = registry.current_version()
+    if version:
+        return registry.model_path(version), version
+    return os.environ.get('MODEL_PATH', DEFAULT_MODEL_PATH), None
+
+
+def _missing(column: pd.Series) -> np.ndarray:
+    """Empty cells, which stand for keys absent from a JSON request."""
+    return column.isna().to_numpy()
+
+
+def _numbers(column: pd.Series):
+    """(float values, mask of cells that are present but not numbers)."""
+    values = pd.to_numeric(column, errors='coerce').to_numpy(dtype=np.float64)
+    return values, np.isnan(values) & ~_missing(column)
+
+
+def _time_codes(column: pd.Series):
+    """Time slot names or numeric codes as floats, and a mask of unknown names."""
+    if pd.api.types.is_numeric_dtype(column):
+        return column.to_numpy(dtype=np.float64), np.zeros(len(column), dtype=bool)
+    named = column.map(lambda value: TIME_SLOT_CODES.get(value) if isinstance(value, str) else value)
+    values = pd.to_numeric(named, errors='coerce').to_numpy(dtype=np.float64)
+    return values, np.isnan(values) & ~_missing(column)
+
+
+def encode_frame(frame: pd.DataFrame):
+    """Validate and encode a chunk as /predict does each request.
+
+    Returns a float32 matrix in FEATURE_ORDER and one error message per row
+    (None where valid). Like the endpoint, the checks run in order and a row
+    reports the first one it fails.
+    """
+    n = len(frame)
+    matrix = np.zeros((n, len(FEATURE_ORDER)), dtype=np.float32)
+    errors = np.full(n, None, dtype=object)
+    failed = np.zeros(n, dtype=bool)
+
+    def flag(mask, message):
+        new = mask & ~failed
+        errors[new] = message
+        failed[new] = True
+
+    def column(name):
+        return frame[name] if name in frame else pd.Series([np.nan] * n, index=frame.index)
+
+    if any(category in frame for category in CATEGORY_COLUMNS):
+        # v2: plain category values, as in validate_compact_input
+        for category, columns in CATEGORY_COLUMNS.items():
+            values = column(category)
+            flag(_missing(values), f"Missing required field: {category}")
+            index = values.map(columns).to_numpy(dtype=np.float64)
+            for value in values[np.isnan(index) & ~_missing(values)].unique():
+                flag((values == value).to_numpy(), f"Unknown {category}: {value!r}. Expected one of {list(columns)}")
+            valid = ~np.isnan(index)
+            matrix[np.flatnonzero(valid), index[valid].astype(np.intp)] = 1
+        for field in ('duration', 'departure_time', 'arrival_time'):
+            values = column(field)
+            flag(_missing(values), f"Missing required field: {field}")
+            if field == 'duration':
+                numbers, bad = _numbers(values)
+                flag(bad, f"{field} must be numeric")
+            else:
+                numbers, bad = _time_codes(values)
+                for value in values[bad].unique():
+                    flag((values == value).to_numpy(), f"Unknown {field}: {value!r}. Expected one of {TIME_SLOTS}")
+            matrix[:, FEATURE_ORDER.index(field)] = numbers
+
+        days_left, bad = _numbers(column('days_left'))
+        flag(bad, "days_left must be numeric")
+        dates = column('departure_date')
+        from_date = np.isnan(days_left) & ~bad
+        flag(from_date & _missing(dates), "Missing required field: departure_date (or days_left)")
+        for departure in dates[from_date & ~_missing(dates)].unique():
+            rows = from_date & (dates == departure).to_numpy()
+            try:
+                days_left[rows] = days_until(departure)
+            except ValueError as e:
+                flag(rows, str(e))
+        matrix[:, FEATURE_ORDER.index('days_left')] = days_left
+    else:
+        # v1: one-hot columns, as in validate_input
+        for field in NUMERIC_FIELDS:
+            numbers, bad = _numbers(column(field))
+            flag(_missing(column(field)), f"Missing required field: {field}")
+            flag(bad, f"{field} must be numeric")
+            matrix[:, FEATURE_ORDER.index(field)] = numbers
+        for category, start, stop in CATEGORY_BLOCKS:
+            block = np.column_stack([pd.to_numeric(column(feature), errors='coerce').to_numpy(dtype=np.float64)
+                                     for feature in FEATURE_ORDER[start:stop]])
+            flag(np.isnan(block).all(axis=1),
+                 f"No {category} features found. At least one {category} feature must be set.")
+            flag(~(block == 1).any(axis=1), f"Exactly one {category} must be selected (set to 1)")
+            # Same int() truncation the encoder applies to one-hot values
+            matrix[:, start:stop] = np.trunc(np.nan_to_num(block))
+
+    matrix[failed] = 0
+    return matrix, errors
+
+
+def _init_worker(model_path: str, version, fare_table_path, fare_table_tolerance, threads: int) -> None:
+    global _worker_bundle
+    _worker_bundle = ModelBundle.load(model_path, version, use_forest=False, fare_table_path=fare_table_path,
+                                      fare_table_tolerance=fare_table_tolerance, nthread=threads)
+
+
+def score_matrix(bundle: ModelBundle, matrix: np.ndarray) -> np.ndarray:
+    """Price encoded rows the way the server does: fare table first, live model for the rest.
+
+    The NumPy engine the server uses for small batches adds leaves in the
+    same float32 order as XGBoost, so scoring everything with XGBoost here
+    gives identical prices.
+    """
+    if bundle.fare_table is None:
+        return bundle.predict(matrix)
+    prices = bundle.fare_table.lookup_many(matrix)
+    missing = np.isnan(prices)
+    if missing.any():
+        prices[missing] = bundle.predict(matrix[missing])
+    return prices
+
+
+def score_chunk(first_row: int, frame: pd.DataFrame, keep: list):
+    """Encode, price and render one chunk as CSV text; runs in a worker process."""
+    matrix, errors = encode_frame(frame)
+    valid = np.array([error is None for error in errors], dtype=bool)
+    prices = np.full(len(frame), np.nan)
+    if valid.any():
+        # Python's round(), as the endpoint applies it, not np.round's half-even on binary floats
+        prices[valid] = [round(float(price), 2) for price in score_matrix(_worker_bundle, matrix[valid])]
+    output = pd.DataFrame({'row': np.arange(first_row, first_row + len(frame))})
+    for name in keep:
+        output[name] = frame[name].to_numpy()
+    output['price'] = prices
+    output['status'] = np.where(valid, 'success', 'error')
+    output['error'] = errors
+    text = output.to_csv(index=False, header=False)
+    return text.encode(), len(frame), int((~valid).sum())
+
+
+def read_chunks(input_path: str, chunk_rows: int, skip_rows: int, keep: list):
+    """Yield (first row number, DataFrame) chunks starting after `skip_rows` data rows."""
+    wanted = INPUT_COLUMNS | set(keep)
+    if input_path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Reading Parquet needs pyarrow (pip install pyarrow)")
+        parquet = pq.ParquetFile(input_path)
+        columns = [name for name in parquet.schema_arrow.names if name in wanted]
+        row = 0
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns):
+            if row + batch.num_rows > skip_rows:
+                frame = batch.to_pandas().iloc[max(skip_rows - row, 0):]
+                yield max(row, skip_rows), frame.reset_index(drop=True)
+            row += batch.num_rows
+        return
+
+    # round_trip parses numbers exactly as float() does on the JSON request values.
+    # A callable skiprows keeps resuming in constant memory (a range becomes a set of every skipped row).
+    reader = pd.read_csv(input_path, chunksize=chunk_rows, usecols=lambda name: name in wanted,
+                         skiprows=lambda i: 0 < i <= skip_rows, float_precision='round_trip')
+    row = skip_rows
+    for frame in reader:
+        yield row, frame.reset_index(drop=True)
+        row += len(frame)
+
+
+def _input_signature(input_path: str) -> dict:
+    stat = os.stat(input_path)
+    return {'input': os.path.abspath(input_path), 'input_bytes': stat.st_size, 'input_mtime': stat.st_mtime}
+
+
+def _write_progress(path: str, progress: dict) -> None:
+    with open(path + '.tmp', 'w') as f:
+        json.dump(progress, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def load_progress(output_path: str, expected: dict):
+    """The checkpoint of an interrupted run of the same job, or None to start over."""
+    path = progress_path_for(output_path)
+    if not os.path.exists(path) or not os.path.exists(output_path):
+        return None
+    with open(path) as f:
+        progress = json.load(f)
+    for key, value in expected.items():
+        if progress.get(key) != value:
+            raise ValueError(f"{output_path} was written with a different {key} ({progress.get(key)!r}); "
+                             "pass --restart to score from the beginning")
+    return progress
+
+
+def bulk_score(input_path: str, output_path: str, model_path: str = None, workers: int = None,
+               chunk_rows: int = CHUNK_ROWS, keep: list = (), restart: bool = False,
+               fare_table_path: str = None, fare_table_tolerance: float = None, registry_dir: str = None) -> dict:
+    """Score every row of `input_path` into `output_path`; returns the final progress record."""
+    model_path, version = resolve_model(model_path, registry_dir)
+    workers = workers or os.cpu_count() or 1
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    keep = list(keep)
+
+    # Loaded here too, for the version label and to fail before any worker starts
+    bundle = ModelBundle.load(model_path, version, use_forest=False, fare_table_path=fare_table_path,
+                              fare_table_tolerance=fare_table_tolerance)
+    job = {**_input_signature(input_path), 'chunk_rows': chunk_rows, 'keep': keep, 'model_version': bundle.version}
+    progress_path = progress_path_for(output_path)
+    progress = None if restart else load_progress(output_path, job)
+    if progress and progress.get('complete'):
+        logger.info("%s is already complete (%d rows)", output_path, progress['rows'])
+        return progress
+    if progress is None:
+        progress = {**job, 'rows': 0, 'errors': 0, 'output_bytes': 0, 'complete': False}
+    else:
+        logger.info("Resuming %s after row %d", output_path, progress['rows'])
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'r+b' if progress['rows'] else 'wb') as out:
+        # Drop anything written after the last checkpoint by a run that died mid-chunk
+        out.truncate(progress['output_bytes'])
+        out.seek(progress['output_bytes'])
+        if not progress['rows']:
+            out.write((','.join(['row', *keep, 'price', 'status', 'error']) + '\n').encode())
+
+        start, resumed_rows = time.perf_counter(), progress['rows']
+
+        def commit(result):
+            text, rows, errors = result
+            out.write(text)
+            out.flush()
+            os.fsync(out.fileno())
+            progress.update(rows=progress['rows'] + rows, errors=progress['errors'] + errors,
+                            output_bytes=out.tell())
+            _write_progress(progress_path, progress)
+            rate = (progress['rows'] - resumed_rows) / (time.perf_counter() - start)
+            print(f"{progress['rows']:,} rows scored ({progress['errors']:,} errors), {rate:,.0f} rows/s")
+
+        chunks = read_chunks(input_path, chunk_rows, progress['rows'], keep)
+        if workers == 1:
+            _init_worker(model_path, version, fare_table_path, fare_table_tolerance, threads)
+            for first_row, frame in chunks:
+                commit(score_chunk(first_row, frame, keep))
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                     initargs=(model_path, version, fare_table_path, fare_table_tolerance,
+                                               threads)) as pool:
+                # A bounded window of chunks in flight keeps memory flat; results are written in order
+                pending = deque()
+                for first_row, frame in chunks:
+                    pending.append(pool.submit(score_chunk, first_row, frame, keep))
+                    if len(pending) >= 2 * workers:
+                        commit(pending.popleft().result())
+                while pending:
+                    commit(pending.popleft().result())
+
+    progress['complete'] = True
+    _write_progress(progress_path, progress)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {progress['rows'] - resumed_rows:,} rows in {elapsed:.1f}s "
+          f"({(progress['rows'] - resumed_rows) / max(elapsed, 1e-9):,.0f} rows/s) with model {bundle.version} "
+          f"-> {output_path}")
+    return progress
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Score a CSV or Parquet file of itineraries')
+    parser.add_argument('input', help='CSV or .parquet file (v1 one-hot or v2 category columns)')
+    parser.add_argument('output', help='Output CSV')
+    parser.add_argument('--model', default=None, help='Model file (default: registry CURRENT, else MODEL_PATH)')
+    parser.add_argument('--registry', default=None, help='Model registry directory (default: MODEL_REGISTRY_DIR)')
+    parser.add_argument('--workers', type=int, default=None, help='Scoring processes (default: one per CPU)')
+    parser.add_argument('--chunk_rows', type=int, default=CHUNK_ROWS, help='Rows per chunk and checkpoint')
+    parser.add_argument('--keep', nargs='*', default=[], help='Input columns copied into the output')
+    parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint and start over')
+    parser.add_argument('--fare_table', default=os.environ.get('FARE_TABLE_PATH', DEFAULT_FARE_TABLE_PATH),
+                        help='Fare table the server would use (pass "" to always use the live model)')
+    parser.add_argument('--fare_table_tolerance', type=float,
+                        default=float(os.environ.get('FARE_TABLE_TOLERANCE', 500)),
+                        help='Largest validated table error vs. the model, in rupees')
+    args = parser.parse_args()
+
+    bulk_score(args.input, args.output, args.model, args.workers, args.chunk_rows, args.keep, args.restart,
+               args.fare_table or None, args.fare_table_tolerance, args.registry)
@@ -0,0 +1,263 @@
+"""In-process LRU/TTL cache of predicted prices keyed on the encoded feature vector.
+
+Each gunicorn worker gets its own ``LocalLRUBackend`` by default. To let
+workers share one warm cache, start a cache server on a local socket::
+
+    PREDICTION_CACHE_AUTHKEY=<secret> python -m serving.cache serve --socket /tmp/flight-fare-cache.sock
+
+and point the workers at it with ``PREDICTION_CACHE_SOCKET`` (and the same
+``PREDICTION_CACHE_AUTHKEY``). If the server goes away, lookups count as
+misses and the workers keep scoring with the model until it is back.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing.managers import BaseManager
+
+logger = logging.getLogger(__name__)
+
+# Errors a proxy raises when the cache server has gone away
+CONNECTION_ERRORS = (EOFError, OSError)
+# Seconds between reconnection attempts while the cache server is unreachable
+RECONNECT_INTERVAL = 1.0
+
+
+def cache_authkey() -> bytes:
+    """The shared secret clients and the server authenticate with; there is no default."""
+    authkey = os.environ.get('PREDICTION_CACHE_AUTHKEY')
+    if not authkey:
+        raise ValueError("PREDICTION_CACHE_AUTHKEY must be set to use the shared prediction cache")
+    return authkey.encode()
+
+
+class LocalLRUBackend:
+    """Thread-safe bounded LRU map with an optional per-entry TTL."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_many(self, keys: list) -> list:
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    values.append(None)
+                elif entry[1] is not None and entry[1] <= now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    values.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    values.append(entry[0])
+        return values
+
+    def put_many(self, items: list) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            for key, value in items:
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+class CacheManager(BaseManager):
+    pass
+
+
+class SharedCacheBackend:
+    """Client for a LocalLRUBackend hosted by ``python -m serving.cache serve``.
+
+    The connection is opened lazily per process, so a backend created before
+    gunicorn forks its workers is safe to use in each of them. When the
+    server is unreachable, calls degrade (lookups miss, writes are dropped)
+    and the connection is retried every RECONNECT_INTERVAL seconds.
+    """
+
+    def __init__(self, address: str, authkey: bytes = None):
+        CacheManager.register('cache')
+        self.address = address
+        self.authkey = authkey or cache_authkey()
+        self._pid = None
+        self._cache = None
+        self._retry_at = 0.0
+        self._proxy()
+
+    def _proxy(self):
+        if self._pid != os.getpid():
+            manager = CacheManager(address=self.address, authkey=self.authkey)
+            manager.connect()
+            self._cache = manager.cache()
+            self._pid = os.getpid()
+        return self._cache
+
+    def _call(self, method: str, *args, default=None):
+        """Call the server, or return `default` while it is unreachable."""
+        if self._cache is None and time.monotonic() < self._retry_at:
+            return default
+        try:
+            return getattr(self._proxy(), method)(*args)
+        except CONNECTION_ERRORS as e:
+            if self._cache is not None:
+                logger.warning(f"Shared prediction cache lost ({e!r}); scoring without it until it is back")
+            # Drop the proxy so a later call reconnects
+            self._cache = None
+            self._pid = None
+            self._retry_at = time.monotonic() + RECONNECT_INTERVAL
+            return default
+
+    def get_many(self, keys: list) -> list:
+        return self._call('get_many', keys, default=[None] * len(keys))
+
+    def put_many(self, items: list) -> None:
+        self._call('put_many', items)
+
+    def clear(self) -> None:
+        self._call('clear')
+
+    def stats(self) -> dict:
+        stats = self._call('stats', default={})
+        return dict(stats, backend=f'shared:{self.address}', connected=self._cache is not None)
+
+
+class PredictionCache:
+    """Price cache shared by /predict and /predict_trend.
+
+    Rows are keyed on a digest of their float32 bytes, so any two requests
+    that encode to the same FEATURE_ORDER vector share an entry. The digest
+    is keyed by the model version, so entries from a swapped-out registry
+    version are never served and simply age out. The whole cache is dropped
+    when the model file's mtime or size changes.
+    """
+
+    def __init__(self, backend, model_path: str = None, check_interval: float = 1.0):
+        self.backend = backend
+        self.model_path = model_path
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._model_stamp = self._stat_model()
+        self._next_check = time.monotonic() + check_interval
+
+    @staticmethod
+    def key(row, namespace: str = '') -> bytes:
+        return hashlib.blake2b(row.tobytes(), digest_size=16, key=namespace.encode()[:64]).digest()
+
+    def _stat_model(self):
+        if self.model_path is None or not os.path.exists(self.model_path):
+            return None
+        stat = os.stat(self.model_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _check_model(self) -> None:
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        stamp = self._stat_model()
+        if stamp != self._model_stamp:
+            logger.info("Model file changed; invalidating prediction cache")
+            with self._lock:
+                self._model_stamp = stamp
+                self.invalidations += 1
+            self.backend.clear()
+
+    def get_many(self, keys: list) -> list:
+        self._check_model()
+        values = self.backend.get_many(keys)
+        hits = sum(value is not None for value in values)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(values) - hits
+        return values
+
+    def put_many(self, keys: list, values) -> None:
+        self.backend.put_many([(key, float(value)) for key, value in zip(keys, values)])
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        stats = {'backend': 'local'}
+        stats.update(self.backend.stats())
+        stats.update({
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'invalidations': self.invalidations,
+        })
+        return stats
+
+
+def create_prediction_cache(maxsize: int, ttl: float = None, socket_path: str = None, model_path: str = None):
+    """Build the configured cache, or None when caching is disabled (maxsize 0).
+
+    Falls back to a per-process cache if the shared cache server is unreachable.
+    """
+    if maxsize <= 0:
+        return None
+    backend = None
+    if socket_path:
+        try:
+            backend = SharedCacheBackend(socket_path)
+            logger.info("Using shared prediction cache at %s", socket_path)
+        except Exception as e:
+            logger.warning(f"Shared prediction cache unavailable ({str(e)}); using a local cache")
+    if backend is None:
+        backend = LocalLRUBackend(maxsize, ttl)
+    return PredictionCache(backend, model_path)
+
+
+def serve(socket_path: str, maxsize: int, ttl: float = None, authkey: bytes = None) -> None:
+    """Host one LocalLRUBackend on a Unix socket for all workers on this machine."""
+    authkey = authkey or cache_authkey()
+    backend = LocalLRUBackend(maxsize, ttl)
+    CacheManager.register('cache', callable=lambda: backend)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    manager = CacheManager(address=socket_path, authkey=authkey)
+    print(f"Serving shared prediction cache on {socket_path} (maxsize={maxsize}, ttl={ttl})")
+    manager.get_server().serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Shared prediction cache server')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve_parser = subparsers.add_parser('serve', help='Serve a shared cache on a Unix socket')
+    serve_parser.add_argument('--socket', default='/tmp/flight-fare-cache.sock', help='Unix socket path')
+    serve_parser.add_argument('--size', type=int, default=100000, help='Maximum number of entries')
+    serve_parser.add_argument('--ttl', type=float, default=None, help='Entry time-to-live in seconds')
+    args = parser.parse_args()
+    if not os.environ.get('PREDICTION_CACHE_AUTHKEY'):
+        parser.error("set PREDICTION_CACHE_AUTHKEY to the secret the workers will use")
+
+    serve(args.socket, args.size, args.ttl)
@@ -0,0 +1,362 @@
+"""Precomputed fare lookup table over the model's finite categorical space.
+
+The table is a float32 ``.npy`` array indexed by
+(airline, source_city, destination_city, class, stops, departure_time,
+arrival_time, days_left, duration anchor). The model is a step function
+of duration, constant between consecutive duration split thresholds, so each
+anchor stands for one such interval and is exact for every duration inside
+it. There are far more intervals than a table can hold, so anchors go to the
+intervals most training rows fall in (or the widest ones without data);
+durations in other intervals come back as NaN and are scored by the model.
+The error against the live model and the share of rows the table answers
+are measured at materialize time and stored in the JSON sidecar. Servers
+only use a table whose largest measured error is within their tolerance
+(FARE_TABLE_TOLERANCE).
+
+Build it offline with::
+
+    python -m serving.fare_table materialize --model models/xgboost_model.ubj
+"""
+import argparse
+import bisect
+import json
+import logging
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+from serving.features import FEATURE_ORDER, CATEGORY_BLOCKS
+from serving.model_io import file_sha256, load_model
+
+logger = logging.getLogger(__name__)
+
+DAYS_LEFT_RANGE = (1, 49)
+TIME_CODE_RANGE = (0, 5)
+
+# Ordinal axes of the table as (feature, first grid value, last grid value)
+ORDINAL_AXES = [
+    ('departure_time',) + TIME_CODE_RANGE,
+    ('arrival_time',) + TIME_CODE_RANGE,
+    ('days_left',) + DAYS_LEFT_RANGE,
+]
+
+
+def meta_path_for(table_path: str) -> str:
+    return os.path.splitext(table_path)[0] + '.json'
+
+
+def _split_thresholds(booster) -> dict:
+    """Collect the sorted split thresholds the booster uses for each feature."""
+    trees = booster.trees_to_dataframe()
+    splits = trees[trees['Feature'] != 'Leaf']
+    return {
+        feature: np.sort(group['Split'].unique())
+        for feature, group in splits.groupby('Feature')
+    }
+
+
+def _clamp_is_exact(thresholds, lo, hi, integral=True) -> bool:
+    """True when clamping (and flooring) a value onto [lo, hi] cannot change a split decision."""
+    if len(thresholds) == 0:
+        return True
+    inside = bool(np.all((thresholds > lo) & (thresholds <= hi)))
+    if integral:
+        inside = inside and bool(np.all(thresholds == np.floor(thresholds)))
+    return inside
+
+
+def duration_interval(thresholds: np.ndarray, durations) -> np.ndarray:
+    """Index of the split interval each duration falls in (XGBoost sends x < split left)."""
+    return np.searchsorted(thresholds, np.asarray(durations, dtype=np.float32), side='right')
+
+
+def choose_duration_anchors(thresholds: np.ndarray, n_anchors: int, durations=None) -> tuple:
+    """(interval indices, anchor durations) for the `n_anchors` intervals the table stores.
+
+    With observed `durations` the intervals holding the most of them are
+    kept; otherwise the widest ones. Each anchor is a duration inside its
+    interval, so the model's price there holds for the whole interval.
+    """
+    n_intervals = len(thresholds) + 1
+    if durations is not None and len(durations):
+        weight = np.bincount(duration_interval(thresholds, durations), minlength=n_intervals).astype(np.float64)
+    else:
+        weight = np.diff(np.concatenate([[0.0], thresholds, [thresholds[-1] + 1.0 if len(thresholds) else 1.0]]))
+    intervals = np.sort(np.argsort(-weight, kind='stable')[:n_anchors])
+    lower = np.concatenate([[thresholds[0] - 1.0 if len(thresholds) else 0.0], thresholds])
+    upper = np.concatenate([thresholds, [lower[-1] + 2.0]])
+    anchors = ((lower + upper) / 2)[intervals]
+    return intervals, anchors
+
+
+def table_shape(n_anchors: int) -> tuple:
+    onehot_axes = tuple(stop - start for _, start, stop in CATEGORY_BLOCKS)
+    ordinal_axes = tuple(hi - lo + 1 for _, lo, hi in ORDINAL_AXES)
+    return onehot_axes + ordinal_axes + (n_anchors,)
+
+
+def _grid_rows(prefix: tuple, shape: tuple, anchors: np.ndarray) -> np.ndarray:
+    """Encode every grid cell sharing the leading category codes in ``prefix``."""
+    codes = np.indices(shape[len(prefix):]).reshape(len(shape) - len(prefix), -1)
+    codes = np.vstack([np.repeat(np.array(prefix).reshape(-1, 1), codes.shape[1], axis=1), codes])
+    X = np.zeros((codes.shape[1], len(FEATURE_ORDER)), dtype=np.float32)
+    rows = np.arange(codes.shape[1])
+    for axis, (_, start, _) in enumerate(CATEGORY_BLOCKS):
+        X[rows, start + codes[axis]] = 1
+    offset = len(CATEGORY_BLOCKS)
+    for axis, (feature, lo, _) in enumerate(ORDINAL_AXES):
+        X[:, FEATURE_ORDER.index(feature)] = lo + codes[offset + axis]
+    X[:, FEATURE_ORDER.index('duration')] = anchors[codes[-1]]
+    return X
+
+
+def _random_grid_inputs(n: int, anchors: np.ndarray, seed: int) -> np.ndarray:
+    """Sample encoded rows from the table's domain with arbitrary durations in the anchors' range."""
+    rng = np.random.default_rng(seed)
+    X = np.zeros((n, len(FEATURE_ORDER)), dtype=np.float32)
+    rows = np.arange(n)
+    for _, start, stop in CATEGORY_BLOCKS:
+        X[rows, start + rng.integers(0, stop - start, n)] = 1
+    for feature, lo, hi in ORDINAL_AXES:
+        X[:, FEATURE_ORDER.index(feature)] = rng.integers(lo, hi + 1, n)
+    X[:, FEATURE_ORDER.index('duration')] = rng.uniform(anchors[0], anchors[-1], n)
+    return X
+
+
+class FareTable:
+    """O(1) fare lookups from a materialized table, with NaN for out-of-grid rows."""
+
+    def __init__(self, table: np.ndarray, meta: dict):
+        self.table = table
+        self.meta = meta
+        self.anchors = np.asarray(meta['duration_anchors'], dtype=np.float64)
+        self.thresholds = np.asarray(meta['duration_thresholds'], dtype=np.float32)
+        self.thresholds_list = self.thresholds.tolist()
+        # Split interval -> anchor index, -1 for intervals the table does not hold
+        self.interval_anchor = np.full(len(self.thresholds) + 1, -1, dtype=np.intp)
+        self.interval_anchor[meta['duration_intervals']] = np.arange(len(meta['duration_intervals']))
+        self.interval_anchor_list = self.interval_anchor.tolist()
+        self.clamp_exact = meta['clamp_exact']
+
+    @classmethod
+    def load(cls, path: str) -> 'FareTable':
+        with open(meta_path_for(path)) as f:
+            meta = json.load(f)
+        return cls(np.load(path, mmap_mode='r'), meta)
+
+    def lookup_row(self, values: list) -> float:
+        """Scalar lookup of one encoded row given as a list; NaN when out of grid."""
+        cell = []
+        for _, start, stop in CATEGORY_BLOCKS:
+            block = values[start:stop]
+            if block.count(1.0) != 1 or block.count(0.0) != len(block) - 1:
+                return float('nan')
+            cell.append(block.index(1.0))
+
+        for feature, lo, hi in ORDINAL_AXES:
+            value = values[FEATURE_ORDER.index(feature)]
+            if not math.isfinite(value):
+                return float('nan')
+            if self.clamp_exact[feature]:
+                value = min(max(math.floor(value), lo), hi)
+            elif value != math.floor(value) or not lo <= value <= hi:
+                return float('nan')
+            cell.append(int(value) - lo)
+
+        duration = values[FEATURE_ORDER.index('duration')]
+        if not math.isfinite(duration):
+            return float('nan')
+        # Compare at the model's float32 precision
+        k = self.interval_anchor_list[bisect.bisect_right(self.thresholds_list, float(np.float32(duration)))]
+        if k < 0:
+            return float('nan')
+        return float(self.table[tuple(cell) + (k,)])
+
+    def lookup_many(self, matrix: np.ndarray) -> np.ndarray:
+        """Look up encoded rows; rows outside the grid come back as NaN."""
+        matrix = np.asarray(matrix, dtype=np.float64).reshape(-1, len(FEATURE_ORDER))
+        n = matrix.shape[0]
+        if n == 1:
+            # Plain Python beats a dozen tiny NumPy calls for a single request
+            return np.array([self.lookup_row(matrix[0].tolist())])
+        valid = np.isfinite(matrix).all(axis=1)
+        index = []
+
+        # One-hot blocks must be exactly one 1 and zeros elsewhere
+        for _, start, stop in CATEGORY_BLOCKS:
+            block = matrix[:, start:stop]
+            valid &= ((block == 0) | (block == 1)).all(axis=1) & (block.sum(axis=1) == 1)
+            index.append(block.argmax(axis=1))
+
+        for feature, lo, hi in ORDINAL_AXES:
+            values = matrix[:, FEATURE_ORDER.index(feature)]
+            if self.clamp_exact[feature]:
+                values = np.clip(np.floor(np.nan_to_num(values)), lo, hi)
+            else:
+                valid &= (values == np.floor(values)) & (values >= lo) & (values <= hi)
+                values = np.clip(np.nan_to_num(values), lo, hi)
+            index.append(values.astype(np.intp) - lo)
+
+        duration = np.nan_to_num(matrix[:, FEATURE_ORDER.index('duration')])
+        k = self.interval_anchor[duration_interval(self.thresholds, duration)]
+        valid &= k >= 0
+
+        prices = np.full(n, np.nan)
+        if valid.any():
+            cell = tuple(i[valid] for i in index)
+            prices[valid] = self.table[cell + (k[valid],)]
+        return prices
+
+
+def load_fare_table(path: str, model_path: str, tolerance: float):
+    """Load the table if it exists, matches the model file and is within tolerance.
+
+    ``tolerance`` bounds the largest absolute difference (in rupees) between a
+    table price and the live model's price, as measured on the random in-grid
+    inputs checked at materialize time. It is an empirical bound over that
+    sample, not a proof for every input.
+
+    Returns None (and logs why) whenever the live model should be used instead.
+    """
+    if not os.path.exists(path):
+        logger.info("No fare table at %s; serving from the live model", path)
+        return None
+    try:
+        fare_table = FareTable.load(path)
+    except Exception as e:
+        logger.warning(f"Fare table could not be loaded: {str(e)}")
+        return None
+
+    meta = fare_table.meta
+    if meta.get('model_sha256') != file_sha256(model_path):
+        logger.warning("Fare table %s was built from a different model; ignoring it", path)
+        return None
+    if meta['validation']['max_abs'] > tolerance:
+        logger.warning("Fare table max abs error %.2f exceeds tolerance %.2f; ignoring it "
+                       "and serving from the live model", meta['validation']['max_abs'], tolerance)
+        return None
+
+    logger.info("Fare table loaded from %s (validated max abs error %.2f, MAE %.2f)",
+                path, meta['validation']['max_abs'], meta['validation']['mae'])
+    return fare_table
+
+
+def _observed_durations(data_path: str):
+    """Durations of the processed training data, or None when it is not available."""
+    if not data_path or not os.path.exists(data_path):
+        return None
+    from src.data_processing.processing import load_processed
+
+    return load_processed(data_path)['duration'].to_numpy(dtype=np.float32)
+
+
+def materialize_fare_table(model_path: str, output_path: str, n_anchors: int = 16,
+                           sample_size: int = 20000, seed: int = 42, data_path: str = None) -> dict:
+    """Score the full categorical grid with the trained model and write the table.
+
+    Anchors go to the duration intervals most rows of `data_path` (processed
+    training data) fall in, or the widest intervals without it.
+    """
+    model = load_model(model_path)
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    thresholds = _split_thresholds(booster)
+    empty = np.array([])
+
+    duration_thresholds = thresholds.get('duration', empty).astype(np.float32)
+    durations = _observed_durations(data_path)
+    intervals, anchors = choose_duration_anchors(duration_thresholds, n_anchors, durations)
+    n_anchors = len(anchors)
+    shape = table_shape(n_anchors)
+    print(f"Materializing fare table with shape {shape} ({np.prod(shape):,} cells)...")
+
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    table = np.lib.format.open_memmap(output_path, mode='w+', dtype=np.float32, shape=shape)
+    # Score one (airline, source, destination) slab at a time to bound memory
+    for prefix in np.ndindex(*shape[:3]):
+        X = _grid_rows(prefix, shape, anchors)
+        table[prefix] = booster.inplace_predict(X).reshape(shape[3:])
+    table.flush()
+    print(f"Scored grid in {time.perf_counter() - start:.1f}s")
+
+    clamp_exact = {
+        feature: _clamp_is_exact(thresholds.get(feature, empty), lo, hi)
+        for feature, lo, hi in ORDINAL_AXES
+    }
+    if durations is not None:
+        coverage = {'source': os.path.abspath(data_path),
+                    'rows': float(np.isin(duration_interval(duration_thresholds, durations), intervals).mean())}
+    else:
+        coverage = {'source': 'widest intervals', 'rows': None}
+    meta = {
+        'model_path': os.path.abspath(model_path),
+        'model_sha256': file_sha256(model_path),
+        'axes': [name for name, _, _ in CATEGORY_BLOCKS] + [name for name, _, _ in ORDINAL_AXES] + ['duration'],
+        'shape': list(shape),
+        'duration_anchors': anchors.tolist(),
+        'duration_thresholds': duration_thresholds.tolist(),
+        'duration_intervals': intervals.tolist(),
+        'duration_coverage': coverage,
+        'clamp_exact': clamp_exact,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+    # Measure the error against the live model on random in-grid inputs, half
+    # of them at durations inside the table's intervals
+    fare_table = FareTable(np.load(output_path, mmap_mode='r'), meta)
+    X = _random_grid_inputs(sample_size, anchors, seed)
+    X[::2, FEATURE_ORDER.index('duration')] = anchors[np.random.default_rng(seed).integers(0, n_anchors,
+                                                                                            len(X[::2]))]
+    expected = booster.inplace_predict(X)
+    looked_up = fare_table.lookup_many(X)
+    answered = ~np.isnan(looked_up)
+    abs_error = np.abs(looked_up[answered] - expected[answered])
+    rel_error = abs_error / np.maximum(np.abs(expected[answered]), 1.0)
+    if not answered.any():
+        abs_error = rel_error = np.zeros(1)
+    meta['validation'] = {
+        'samples': sample_size,
+        'answered': int(answered.sum()),
+        'mae': float(abs_error.mean()),
+        'p99_abs': float(np.percentile(abs_error, 99)),
+        'max_abs': float(abs_error.max()),
+        'mean_rel': float(rel_error.mean()),
+        'p99_rel': float(np.percentile(rel_error, 99)),
+    }
+
+    with open(meta_path_for(output_path), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    v = meta['validation']
+    print(f"Validation on {v['answered']} of {sample_size} random in-grid inputs answered by the table: "
+          f"MAE {v['mae']:.4f}, p99 abs {v['p99_abs']:.4f}, max abs {v['max_abs']:.4f}")
+    if coverage['rows'] is not None:
+        print(f"The table answers {coverage['rows']:.1%} of the rows in {data_path}; the model scores the rest")
+    return meta
+
+
+if __name__ == "__main__":
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description='Fare lookup table tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    materialize = subparsers.add_parser('materialize', help='Score the categorical grid into a lookup table')
+    materialize.add_argument('--model', default=os.path.join(base_dir, 'models', 'xgboost_model.ubj'), help='Trained model')
+    materialize.add_argument('--output', default=os.path.join(base_dir, 'models', 'fare_table.npy'), help='Table path (.npy)')
+    materialize.add_argument('--duration-anchors', type=int, default=16,
+                             help='Duration intervals stored (table size and coverage grow with it)')
+    materialize.add_argument('--data', default=os.path.join(base_dir, 'data', 'processed', 'flights_processed.csv'),
+                             help='Processed training data used to pick the most common duration intervals')
+    materialize.add_argument('--samples', type=int, default=20000, help='Random inputs used to measure error')
+    materialize.add_argument('--tolerance', type=float, default=float(os.environ.get('FARE_TABLE_TOLERANCE', 500)),
+                             help='Largest acceptable error vs. the model, in rupees (as the server checks it)')
+    args = parser.parse_args()
+
+    meta = materialize_fare_table(args.model, args.output, args.duration_anchors, args.samples, data_path=args.data)
+    if meta['validation']['max_abs'] > args.tolerance:
+        print(f"Max abs error {meta['validation']['max_abs']:.2f} exceeds the tolerance {args.tolerance:.2f}; "
+              f"servers will not use {args.output}")
+        sys.exit(1)
+    print(f"Fare table saved to {args.output}")
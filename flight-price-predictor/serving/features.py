@@ -0,0 +1,186 @@
+import logging
+import threading
+from datetime import date, datetime
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FEATURE_ORDER = [
+    'duration', 'days_left', 'departure_time', 'arrival_time',
+    'airline_AirAsia', 'airline_Air_India', 'airline_GO_FIRST',
+    'airline_Indigo', 'airline_SpiceJet', 'airline_Vistara',
+    'source_city_Bangalore', 'source_city_Chennai', 'source_city_Delhi',
+    'source_city_Hyderabad', 'source_city_Kolkata', 'source_city_Mumbai',
+    'destination_city_Bangalore', 'destination_city_Chennai',
+    'destination_city_Delhi', 'destination_city_Hyderabad',
+    'destination_city_Kolkata', 'destination_city_Mumbai',
+    'class_Business', 'class_Economy',
+    'stops_one', 'stops_two_or_more', 'stops_zero'
+]
+
+NUMERIC_FIELDS = ['duration', 'days_left', 'departure_time', 'arrival_time']
+
+# One-hot blocks as (category, first column, last column + 1) in FEATURE_ORDER
+CATEGORY_BLOCKS = [
+    ('airline', 4, 10),
+    ('source_city', 10, 16),
+    ('destination_city', 16, 22),
+    ('class', 22, 24),
+    ('stops', 24, 27)
+]
+
+# Slot order of the departure_time / arrival_time codes the model was trained on
+# (TIME_CATEGORIES in src/data_processing/processing.py)
+TIME_SLOTS = ['Early_Morning', 'Morning', 'Afternoon', 'Evening', 'Night', 'Late_Night']
+TIME_SLOT_CODES = {slot: code for code, slot in enumerate(TIME_SLOTS)}
+
+# v2 ("compact") requests name each category, e.g. {'airline': 'Indigo', ...};
+# this maps every category value straight to its one-hot column
+CATEGORY_COLUMNS = {
+    category: {feature[len(category) + 1:]: i for i, feature in enumerate(FEATURE_ORDER[start:stop], start)}
+    for category, start, stop in CATEGORY_BLOCKS
+}
+
+
+# Columns of a native-categorical model (training.py --categorical): the numeric
+# fields, then one integer code per category
+CATEGORICAL_FEATURE_ORDER = NUMERIC_FIELDS + [category for category, _, _ in CATEGORY_BLOCKS]
+
+
+def is_compact(data: dict) -> bool:
+    """True for v2 requests, which carry plain category values instead of one-hot keys."""
+    return not CATEGORY_COLUMNS.keys().isdisjoint(data)
+
+
+def days_until(departure_date) -> int:
+    """Days from today to a YYYY-MM-DD departure date.
+
+    A date one day in the past counts as today, since the client's calendar
+    can run behind the server's.
+    """
+    try:
+        departure = datetime.strptime(departure_date, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError("departure_date must be a YYYY-MM-DD string")
+    days = (departure - date.today()).days
+    if days < -1:
+        raise ValueError("departure_date is in the past")
+    return max(days, 0)
+
+
+def compact_numeric(data: dict, field: str) -> float:
+    """A numeric field of a validated v2 request (time slots may be named)."""
+    if field == 'days_left' and field not in data:
+        return days_until(data['departure_date'])
+    value = data[field]
+    return TIME_SLOT_CODES[value] if isinstance(value, str) else float(value)
+
+
+class FeatureEncoder:
+    """Encode request dicts straight into float32 rows in FEATURE_ORDER.
+
+    Column indexes are resolved once at construction. Each thread gets its own
+    preallocated row buffer, so encoding a request allocates no arrays and
+    never touches pandas.
+    """
+
+    def __init__(self, feature_order=FEATURE_ORDER):
+        self.feature_order = list(feature_order)
+        self.n_features = len(self.feature_order)
+        self.numeric_index = [(field, self.feature_order.index(field)) for field in NUMERIC_FIELDS]
+        self.onehot_index = {
+            feature: i for i, feature in enumerate(self.feature_order) if feature not in NUMERIC_FIELDS
+        }
+        self.category_columns = {
+            category: {feature[len(category) + 1:]: i for feature, i in self.onehot_index.items()
+                       if feature.startswith(category + '_')}
+            for category in CATEGORY_COLUMNS
+        }
+        self._local = threading.local()
+
+    def _row_buffer(self) -> np.ndarray:
+        row = getattr(self._local, 'row', None)
+        if row is None:
+            row = self._local.row = np.zeros((1, self.n_features), dtype=np.float32)
+        return row
+
+    def encode(self, data: dict, out: np.ndarray = None) -> np.ndarray:
+        """Encode one validated request (one-hot or v2) into a (1 x n_features) float32 row.
+
+        Without ``out`` the thread's reusable buffer is returned; it is only
+        valid until the next encode() call on the same thread, so copy it if
+        it has to outlive the request.
+        """
+        row = self._row_buffer() if out is None else out
+        row.fill(0)
+        flat = row.reshape(-1)
+        if is_compact(data):
+            self._encode_compact(data, flat)
+            return row
+        for field, i in self.numeric_index:
+            flat[i] = float(data[field])
+        # Walk the request keys once instead of probing every one-hot column
+        onehot_index = self.onehot_index
+        for key, value in data.items():
+            i = onehot_index.get(key)
+            if i is not None:
+                flat[i] = int(value)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Final feature vector: %s", dict(zip(self.feature_order, flat.tolist())))
+        return row
+
+    def _encode_compact(self, data: dict, flat: np.ndarray) -> None:
+        """Encode a validated v2 request: one table lookup per category."""
+        for field, i in self.numeric_index:
+            flat[i] = compact_numeric(data, field)
+        for category, columns in self.category_columns.items():
+            flat[columns[data[category]]] = 1
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Final feature vector: %s", dict(zip(self.feature_order, flat.tolist())))
+
+
+class CategoricalEncoder:
+    """Encode requests, or one-hot rows, for a model with native categorical splits.
+
+    Rows follow CATEGORICAL_FEATURE_ORDER: 9 columns instead of 27, each
+    category stored as its position in the model's category lists (the
+    ``categories`` entry of its metadata sidecar, written by training.py).
+    """
+
+    def __init__(self, categories: dict):
+        self.n_features = len(CATEGORICAL_FEATURE_ORDER)
+        self.codes = {category: {value: code for code, value in enumerate(categories[category])}
+                      for category, _, _ in CATEGORY_BLOCKS}
+        self.numeric_columns = [FEATURE_ORDER.index(field) for field in NUMERIC_FIELDS]
+        # Code of each one-hot column in every block; values the model never saw become NaN (missing)
+        self.blocks = [
+            (start, stop, CATEGORICAL_FEATURE_ORDER.index(category),
+             np.array([self.codes[category].get(feature[len(category) + 1:], np.nan)
+                       for feature in FEATURE_ORDER[start:stop]], dtype=np.float32))
+            for category, start, stop in CATEGORY_BLOCKS
+        ]
+        self._onehot = FeatureEncoder()
+
+    def encode(self, data: dict, out: np.ndarray = None) -> np.ndarray:
+        """Encode one validated request into a (1 x 9) float32 row; v2 requests skip the one-hot step."""
+        if not is_compact(data):
+            return self.transform(self._onehot.encode(data), out)
+        row = np.empty((1, self.n_features), dtype=np.float32) if out is None else out
+        flat = row.reshape(-1)
+        for i, field in enumerate(NUMERIC_FIELDS):
+            flat[i] = compact_numeric(data, field)
+        for i, (category, codes) in enumerate(self.codes.items(), len(NUMERIC_FIELDS)):
+            flat[i] = codes.get(data[category], np.nan)
+        return row
+
+    def transform(self, matrix: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """Convert validated (n x 27) FEATURE_ORDER rows into (n x 9) categorical rows."""
+        matrix = np.asarray(matrix, dtype=np.float32).reshape(-1, len(FEATURE_ORDER))
+        out = np.empty((len(matrix), self.n_features), dtype=np.float32) if out is None else out
+        out[:, :len(NUMERIC_FIELDS)] = matrix[:, self.numeric_columns]
+        for start, stop, column, codes in self.blocks:
+            out[:, column] = codes[matrix[:, start:stop].argmax(axis=1)]
+        return out
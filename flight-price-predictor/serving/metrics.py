@@ -0,0 +1,173 @@
+"""Low-overhead request metrics rendered in the Prometheus text format.
+
+Latencies go into histograms with a fixed set of 1-2.5-5 buckets per decade
+from 50 µs to 10 s, so recording is a bisect plus an increment and every
+endpoint x stage series stays small enough to scrape from every worker.
+Quantiles are known to within a bucket. Handlers mark stage boundaries with
+a RequestTimer::
+
+    timer = metrics.timer('predict')
+    data = request.json;            timer.mark('parse')
+    validate_input(data);           timer.mark('validate')
+    ...
+    timer.finish()
+
+Metrics are per process; under gunicorn each worker reports its own.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+# Bucket upper bounds in seconds (plus the implicit +Inf)
+LATENCY_BOUNDS = [0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                  0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+
+def _format_value(value) -> str:
+    """A sample value at full precision (ints exactly, floats round-trip)."""
+    return str(int(value)) if isinstance(value, int) else repr(float(value))
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + '}'
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (seconds)."""
+
+    def __init__(self, bounds=LATENCY_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        i = bisect_left(self.bounds, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.total += seconds
+            self.count += 1
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (0-100)."""
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return 0.0
+        rank = q / 100 * count
+        seen = 0
+        for i, n in enumerate(counts):
+            seen += n
+            if seen >= rank and n:
+                return self.bounds[i] if i < len(self.bounds) else float('inf')
+        return float('inf')
+
+    def render(self, name: str, labels: dict) -> list:
+        with self._lock:
+            counts, total, count = list(self.counts), self.total, self.count
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.bounds, counts):
+            cumulative += n
+            lines.append(f"{name}_bucket{_format_labels(dict(labels, le=f'{bound:.9g}'))} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(dict(labels, le='+Inf'))} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class RequestTimer:
+    """Records the time since the previous mark into a per-stage histogram."""
+
+    __slots__ = ('metrics', 'endpoint', 'start', 'last')
+
+    def __init__(self, metrics: 'Metrics', endpoint: str):
+        self.metrics = metrics
+        self.endpoint = endpoint
+        self.start = self.last = time.perf_counter()
+
+    def mark(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.metrics.stage_histogram(self.endpoint, stage).record(now - self.last)
+        self.last = now
+
+    def finish(self, status: int = 200) -> None:
+        self.metrics.observe_request(self.endpoint, status, time.perf_counter() - self.start)
+
+
+class Metrics:
+    """Per-endpoint stage histograms plus request and error counters."""
+
+    def __init__(self, namespace: str = 'flight'):
+        self.namespace = namespace
+        self.stages = {}
+        self.requests = {}
+        self.latency = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def timer(self, endpoint: str) -> RequestTimer:
+        return RequestTimer(self, endpoint)
+
+    def _histogram(self, table: dict, key) -> Histogram:
+        histogram = table.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = table.setdefault(key, Histogram())
+        return histogram
+
+    def stage_histogram(self, endpoint: str, stage: str) -> Histogram:
+        return self._histogram(self.stages, (endpoint, stage))
+
+    def observe_request(self, endpoint: str, status: int, seconds: float) -> None:
+        self._histogram(self.latency, endpoint).record(seconds)
+        with self._lock:
+            self.requests[endpoint, status] = self.requests.get((endpoint, status), 0) + 1
+
+    def count_error(self, endpoint: str, error: Exception) -> None:
+        key = (endpoint, type(error).__name__)
+        with self._lock:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def render(self, counters: dict = None, gauges: dict = None, info: dict = None) -> str:
+        """Prometheus text exposition.
+
+        `counters` and `gauges` map extra metric names to values; `info`
+        becomes the labels of a constant `<namespace>_model_info` gauge.
+        """
+        ns = self.namespace
+        lines = [f"# HELP {ns}_requests_total Requests handled, by endpoint and HTTP status.",
+                 f"# TYPE {ns}_requests_total counter"]
+        with self._lock:
+            requests, errors = dict(self.requests), dict(self.errors)
+            stages, latency = dict(self.stages), dict(self.latency)
+        for (endpoint, status), n in sorted(requests.items()):
+            lines.append(f"{ns}_requests_total{_format_labels({'endpoint': endpoint, 'status': status})} {n}")
+
+        lines += [f"# HELP {ns}_errors_total Failed requests, by endpoint and exception type.",
+                  f"# TYPE {ns}_errors_total counter"]
+        for (endpoint, error_type), n in sorted(errors.items()):
+            lines.append(f"{ns}_errors_total{_format_labels({'endpoint': endpoint, 'type': error_type})} {n}")
+
+        lines += [f"# HELP {ns}_request_duration_seconds End-to-end handler time.",
+                  f"# TYPE {ns}_request_duration_seconds histogram"]
+        for endpoint, histogram in sorted(latency.items()):
+            lines += histogram.render(f"{ns}_request_duration_seconds", {'endpoint': endpoint})
+
+        lines += [f"# HELP {ns}_stage_duration_seconds Time spent in each request stage.",
+                  f"# TYPE {ns}_stage_duration_seconds histogram"]
+        for (endpoint, stage), histogram in sorted(stages.items()):
+            lines += histogram.render(f"{ns}_stage_duration_seconds", {'endpoint': endpoint, 'stage': stage})
+
+        for name, value in (counters or {}).items():
+            lines += [f"# TYPE {ns}_{name} counter", f"{ns}_{name} {_format_value(value)}"]
+        for name, value in (gauges or {}).items():
+            lines += [f"# TYPE {ns}_{name} gauge", f"{ns}_{name} {_format_value(value)}"]
+        if info:
+            lines += [f"# TYPE {ns}_model_info gauge", f"{ns}_model_info{_format_labels(info)} 1"]
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,177 @@
+"""Native XGBoost model artifacts with a JSON metadata sidecar.
+
+Trainers export ``<name>.ubj`` (XGBoost's native UBJSON format; ``.json``
+works too) next to ``<name>.meta.json`` holding feature names, metrics,
+parameters and a SHA-256 of the model file. Unlike the pickles, the native
+file does not depend on the Python, scikit-learn or XGBoost version that
+wrote it.
+
+Existing pickles can be converted with::
+
+    python -m serving.model_io convert models/xgboost_model.pkl
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def meta_path_for(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + '.meta.json'
+
+
+class NativeModel:
+    """A loaded Booster exposing the ``predict(ndarray)`` call the server uses."""
+
+    def __init__(self, booster, meta: dict):
+        self.booster = booster
+        self.meta = meta
+        self.feature_names = meta.get('feature_names') or booster.feature_names
+
+    def predict(self, X):
+        return self.booster.inplace_predict(X)
+
+    def get_booster(self):
+        return self.booster
+
+
+def set_model_threads(model, nthread: int) -> None:
+    """Cap the threads a loaded model (native or pickled) predicts with."""
+    model.get_booster().set_param({'nthread': nthread})
+    if not isinstance(model, NativeModel) and hasattr(model, 'set_params'):
+        # The scikit-learn wrapper passes its own n_jobs on every predict()
+        model.set_params(n_jobs=nthread)
+
+
+def sklearn_params(model) -> dict:
+    """Training parameters of a scikit-learn XGBoost wrapper, as get_xgb_params() reports them.
+
+    get_xgb_params() breaks on pickles from other XGBoost versions (their
+    wrappers lack newer attributes), so those are read from the wrapper's
+    attributes instead. The Booster's own configuration is no substitute:
+    it resets to defaults whenever the model is saved and reloaded.
+    """
+    try:
+        params = model.get_xgb_params()
+    except AttributeError:
+        wrapper_only = model._wrapper_params()
+        params = {k: v for k, v in vars(model).items()
+                  if not k.startswith('_') and k not in wrapper_only and not callable(v)}
+    return {k: v for k, v in params.items() if v is not None}
+
+
+def export_native_model(booster, model_path: str, feature_names=None, metrics=None, params=None,
+                        extra=None) -> str:
+    """Save a Booster in native format plus its metadata sidecar; returns the sidecar path.
+
+    Both files are written under temporary names and renamed into place, so
+    a reader never sees a partially written model. `extra` is merged into
+    the sidecar.
+    """
+    import xgboost as xgb
+
+    os.makedirs(os.path.dirname(os.path.abspath(model_path)), exist_ok=True)
+    base, ext = os.path.splitext(model_path)
+    tmp_model_path = f"{base}.tmp{os.getpid()}{ext}"
+    booster.save_model(tmp_model_path)
+    meta = {
+        'format': ext.lstrip('.'),
+        'model_file': os.path.basename(model_path),
+        'sha256': file_sha256(tmp_model_path),
+        'xgboost_version': xgb.__version__,
+        'num_boosted_rounds': booster.num_boosted_rounds(),
+        'feature_names': list(feature_names) if feature_names is not None else booster.feature_names,
+        'metrics': metrics or {},
+        'parameters': params or {},
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        **(extra or {}),
+    }
+    meta_path = meta_path_for(model_path)
+    tmp_meta_path = f"{meta_path}.tmp{os.getpid()}"
+    with open(tmp_meta_path, 'w') as f:
+        # Metrics usually hold NumPy floats
+        json.dump(meta, f, indent=2, default=float)
+    os.replace(tmp_model_path, model_path)
+    os.replace(tmp_meta_path, meta_path)
+    return meta_path
+
+
+def read_meta(model_path: str) -> dict:
+    """The metadata sidecar of a model file, or {} (logged) when there is none."""
+    meta_path = meta_path_for(model_path)
+    if not os.path.exists(meta_path):
+        logger.warning("No metadata sidecar found for %s", model_path)
+        return {}
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def load_native_model(model_path: str, verify: bool = True) -> NativeModel:
+    """Load a native model file, checking it against the sidecar checksum."""
+    import xgboost as xgb
+
+    meta = read_meta(model_path)
+    if verify and meta.get('sha256') and meta['sha256'] != file_sha256(model_path):
+        raise ValueError(f"Checksum mismatch for {model_path}; the metadata sidecar is stale")
+
+    booster = xgb.Booster()
+    booster.load_model(model_path)
+    if meta.get('feature_names'):
+        booster.feature_names = meta['feature_names']
+    return NativeModel(booster, meta)
+
+
+def load_model(model_path: str):
+    """Load either a native model or a legacy pickle, by file extension."""
+    if model_path.endswith('.pkl'):
+        import joblib
+        model = joblib.load(model_path)
+        # xg_boost_training.py pickles a dict with the Booster inside
+        if isinstance(model, dict):
+            model = NativeModel(model['model'], {'feature_names': model.get('feature_names')})
+        return model
+    return load_native_model(model_path)
+
+
+def convert_pickle(pkl_path: str, model_path: str = None) -> str:
+    """Convert a pickled XGBRegressor or training-dict artifact to native format."""
+    import joblib
+
+    artifact = joblib.load(pkl_path)
+    metrics, params, feature_names = {}, {}, None
+    if isinstance(artifact, dict):
+        booster = artifact['model']
+        metrics = artifact.get('metrics', {})
+        params = artifact.get('parameters', {})
+        feature_names = artifact.get('feature_names')
+    else:
+        booster = artifact.get_booster()
+        params = sklearn_params(artifact)
+
+    model_path = model_path or os.path.splitext(pkl_path)[0] + '.ubj'
+    export_native_model(booster, model_path, feature_names, metrics, params)
+    print(f"Converted {pkl_path} -> {model_path}")
+    return model_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Native model artifact tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert = subparsers.add_parser('convert', help='Convert a pickled model to native format')
+    convert.add_argument('pickle', help='Path to the .pkl model')
+    convert.add_argument('--output', default=None, help='Output model path (.ubj or .json)')
+    args = parser.parse_args()
+
+    convert_pickle(args.pickle, args.output)
@@ -0,0 +1,257 @@
+"""Observed fare history in SQLite, with daily min/median/max rollups.
+
+The scraper's JSONL results (scraper/scheduler.py) are ingested into
+``observations``, one row per fare seen, keyed by route (IATA codes),
+airline, class and the day it was observed. ``daily_prices`` holds one
+pre-aggregated row per (route, airline, class, day), plus route-wide rows
+with airline and class ``'*'``, so a 30-day history is a single primary-key
+range scan. Airline and class are ``''`` when the source does not report
+them.
+
+::
+
+    python -m serving.price_history ingest data/scraped/mmt.jsonl
+    python -m serving.price_history history DEL BOM --days 30
+
+Ingestion remembers how far into each JSONL file it has read, so it can be
+rerun after every scrape and only new records are added.
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB_PATH = os.path.join(BASE_DIR, 'data', 'price_history.sqlite')
+
+# Request city names (serving.features one-hot suffixes) to the IATA codes the scrapers use
+CITY_CODES = {
+    'Bangalore': 'BLR',
+    'Chennai': 'MAA',
+    'Delhi': 'DEL',
+    'Hyderabad': 'HYD',
+    'Kolkata': 'CCU',
+    'Mumbai': 'BOM',
+}
+ALL = '*'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    airline TEXT NOT NULL,
+    travel_class TEXT NOT NULL,
+    observed_date TEXT NOT NULL,
+    departure_date TEXT,
+    price REAL NOT NULL,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS observations_key
+    ON observations (origin, destination, airline, travel_class, observed_date);
+CREATE INDEX IF NOT EXISTS observations_route
+    ON observations (origin, destination, observed_date);
+CREATE TABLE IF NOT EXISTS daily_prices (
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    airline TEXT NOT NULL,
+    travel_class TEXT NOT NULL,
+    day TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    min_price REAL NOT NULL,
+    median_price REAL NOT NULL,
+    max_price REAL NOT NULL,
+    PRIMARY KEY (origin, destination, airline, travel_class, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ingest_offsets (
+    path TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL
+);
+"""
+
+
+def _iso_date(value: str) -> str:
+    """Normalize the scrapers' DD/MM/YYYY, DD-MM-YYYY or ISO dates to ISO."""
+    for fmt in ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y'):
+        try:
+            return datetime.strptime(value, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date: {value}")
+
+
+class PriceHistoryStore:
+    """SQLite-backed fare observations and daily rollups.
+
+    Each thread gets its own connection; the database runs in WAL mode so
+    ingestion does not block readers in the serving processes.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, readonly: bool = False):
+        self.path = path
+        self.readonly = readonly
+        self._local = threading.local()
+        if not readonly:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with self._connection() as conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.readonly:
+                conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            else:
+                conn = sqlite3.connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def add_observations(self, rows) -> int:
+        """Insert (origin, destination, airline, class, observed_date, departure_date, price, source)
+        tuples and refresh the rollups they touch; returns the number inserted."""
+        rows = list(rows)
+        if not rows:
+            return 0
+        conn = self._connection()
+        with conn:
+            self._insert(conn, rows)
+        return len(rows)
+
+    def _insert(self, conn, rows) -> None:
+        conn.executemany('INSERT INTO observations VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        self._refresh_rollups(conn, {row[:5] for row in rows})
+
+    def _refresh_rollups(self, conn, keys) -> None:
+        routes = set()
+        for origin, destination, airline, travel_class, day in keys:
+            prices = [price for (price,) in conn.execute(
+                'SELECT price FROM observations WHERE origin = ? AND destination = ? AND airline = ? '
+                'AND travel_class = ? AND observed_date = ?', (origin, destination, airline, travel_class, day))]
+            self._write_rollup(conn, (origin, destination, airline, travel_class, day), prices)
+            routes.add((origin, destination, day))
+        for origin, destination, day in routes:
+            prices = [price for (price,) in conn.execute(
+                'SELECT price FROM observations WHERE origin = ? AND destination = ? AND observed_date = ?',
+                (origin, destination, day))]
+            self._write_rollup(conn, (origin, destination, ALL, ALL, day), prices)
+
+    @staticmethod
+    def _write_rollup(conn, key, prices) -> None:
+        values = np.asarray(prices, dtype=np.float64)
+        conn.execute('INSERT OR REPLACE INTO daily_prices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                     (*key, len(values), float(values.min()), float(np.median(values)), float(values.max())))
+
+    def ingest_jsonl(self, path: str, source: str = None) -> int:
+        """Add the 'ok' records appended to a scheduler JSONL file since the last ingest."""
+        conn = self._connection()
+        key = os.path.abspath(path)
+        row = conn.execute('SELECT offset FROM ingest_offsets WHERE path = ?', (key,)).fetchone()
+        offset = row[0] if row else 0
+        if offset > os.path.getsize(path):
+            logger.warning("%s shrank since the last ingest; reading it from the start", path)
+            offset = 0
+
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        # Leave a trailing partial line for the next run
+        data = data[:data.rfind(b'\n') + 1]
+
+        source = source or os.path.splitext(os.path.basename(path))[0]
+        rows = []
+        skipped = 0
+        for number, line in enumerate(data.splitlines(), 1):
+            # A malformed record is skipped (and the offset still moves past it),
+            # so one bad line cannot block every later ingest of the file
+            try:
+                record = json.loads(line)
+                if record.get('status') != 'ok' or not record.get('prices'):
+                    continue
+                observed = (record.get('scraped_at') or datetime.now().isoformat())[:10]
+                departure = _iso_date(record['date'])
+                airline = record.get('airline', '')
+                travel_class = record.get('class', '')
+                rows += [(record['origin'], record['destination'], airline, travel_class, observed, departure,
+                          float(price), source) for price in record['prices']]
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                skipped += 1
+                logger.warning("Skipping malformed record %d after offset %d of %s: %r", number, offset, path, e)
+
+        # Fares and the new offset commit together, so a crash never ingests a record twice
+        with conn:
+            if rows:
+                self._insert(conn, rows)
+            conn.execute('INSERT OR REPLACE INTO ingest_offsets VALUES (?, ?)', (key, offset + len(data)))
+        logger.info("Ingested %d fares from %s (%d malformed records skipped)", len(rows), path, skipped)
+        return len(rows)
+
+    def daily_history(self, origin: str, destination: str, start: date, end: date,
+                      airline: str = ALL, travel_class: str = ALL) -> list:
+        """Daily rollups for a route between `start` and `end` (inclusive), oldest first."""
+        rows = self._connection().execute(
+            'SELECT day, n, min_price, median_price, max_price FROM daily_prices '
+            'WHERE origin = ? AND destination = ? AND airline = ? AND travel_class = ? AND day BETWEEN ? AND ? '
+            'ORDER BY day', (origin, destination, airline, travel_class, start.isoformat(), end.isoformat()))
+        return [{'date': day, 'price': round(median, 2), 'min': round(low, 2), 'max': round(high, 2), 'count': n}
+                for day, n, low, median, high in rows]
+
+    def route_history(self, origin: str, destination: str, start: date, end: date,
+                      airline: str = None, travel_class: str = None) -> list:
+        """History for the most specific level that has data: the airline/class, else the whole route."""
+        if airline or travel_class:
+            history = self.daily_history(origin, destination, start, end, airline or '', travel_class or '')
+            if history:
+                return history
+        return self.daily_history(origin, destination, start, end)
+
+    def observations(self, origin: str, destination: str, start: date, end: date) -> list:
+        """Raw fares for a route observed between `start` and `end` (inclusive)."""
+        return self._connection().execute(
+            'SELECT airline, travel_class, observed_date, departure_date, price, source FROM observations '
+            'WHERE origin = ? AND destination = ? AND observed_date BETWEEN ? AND ? ORDER BY observed_date',
+            (origin, destination, start.isoformat(), end.isoformat())).fetchall()
+
+
+def open_price_history(path: str):
+    """Read-only store for the server, or None (logged) when there is no database yet."""
+    if not os.path.exists(path):
+        logger.info("No price history database at %s; /predict_trend returns no history", path)
+        return None
+    try:
+        return PriceHistoryStore(path, readonly=True)
+    except sqlite3.Error as e:
+        logger.warning(f"Price history unavailable: {str(e)}")
+        return None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Fare history store')
+    parser.add_argument('--db', default=os.environ.get('PRICE_HISTORY_DB', DEFAULT_DB_PATH), help='SQLite database')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    ingest = subparsers.add_parser('ingest', help='Add new records from scheduler JSONL files')
+    ingest.add_argument('paths', nargs='+')
+    history = subparsers.add_parser('history', help='Print daily rollups for a route')
+    history.add_argument('origin')
+    history.add_argument('destination')
+    history.add_argument('--days', type=int, default=30, help='Days back from today')
+    history.add_argument('--airline', default=None)
+    history.add_argument('--class', dest='travel_class', default=None)
+    args = parser.parse_args()
+
+    store = PriceHistoryStore(args.db)
+    if args.command == 'ingest':
+        for path in args.paths:
+            store.ingest_jsonl(path)
+    else:
+        today = date.today()
+        for row in store.route_history(args.origin, args.destination, today - timedelta(days=args.days),
+                                       today, args.airline, args.travel_class):
+            print(f"{row['date']}  n={row['count']:<5} min={row['min']:<10} median={row['price']:<10} max={row['max']}")
@@ -0,0 +1,409 @@
+"""Versioned model registry with hot swapping for the prediction service.
+
+Layout::
+
+    models/registry/
+        v0001/model.ubj            native model (see serving/model_io.py)
+        v0001/model.meta.json      metadata sidecar
+        v0001/forest.npz           pre-flattened NumPy engine arrays (optional)
+        v0002/...
+        CURRENT                    name of the version being served
+        SHADOW                     optional version scored alongside CURRENT
+
+Every process keeps one ``ModelBundle`` reference. A ``RegistryWatcher``
+thread notices when CURRENT changes, loads and warms the new version off the
+request path and then replaces the reference in one assignment; requests
+that already hold the old bundle finish on it.
+
+Manage versions with::
+
+    python -m serving.registry publish models/xgboost_model.ubj
+    python -m serving.registry list
+    python -m serving.registry activate v0002
+    python -m serving.registry shadow v0003
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from serving.fare_table import load_fare_table
+from serving.features import FEATURE_ORDER, CategoricalEncoder
+from serving.model_io import file_sha256, load_model, meta_path_for, read_meta, set_model_threads
+from serving.route_search import LeafBoxes
+from serving.tree_engine import ForestEvaluator
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE = 'model.ubj'
+FOREST_FILE = 'forest.npz'
+FARE_TABLE_FILE = 'fare_table.npy'
+
+
+def _write_pointer(path: str, version) -> None:
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        f.write(f"{version}\n" if version else '')
+    os.replace(tmp_path, path)
+
+
+def _read_pointer(path: str):
+    try:
+        with open(path) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class ModelRegistry:
+    """Directory of immutable model versions plus CURRENT/SHADOW pointer files."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def versions(self) -> list:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if name.startswith('v') and os.path.exists(os.path.join(self.root, name, MODEL_FILE)))
+
+    def model_path(self, version: str) -> str:
+        return os.path.join(self.root, version, MODEL_FILE)
+
+    def current_version(self):
+        return _read_pointer(os.path.join(self.root, 'CURRENT'))
+
+    def shadow_version(self):
+        return _read_pointer(os.path.join(self.root, 'SHADOW'))
+
+    def _next_version(self) -> str:
+        existing = [int(name[1:]) for name in self.versions() if name[1:].isdigit()]
+        return f"v{max(existing, default=0) + 1:04d}"
+
+    def publish(self, model_path: str, activate: bool = False) -> str:
+        """Copy a native model (and its sidecar/fare table) in as a new version."""
+        version = self._next_version()
+        staging = os.path.join(self.root, f".{version}.staging{os.getpid()}")
+        os.makedirs(staging)
+        try:
+            shutil.copyfile(model_path, os.path.join(staging, MODEL_FILE))
+            if os.path.exists(meta_path_for(model_path)):
+                with open(meta_path_for(model_path)) as f:
+                    meta = json.load(f)
+                meta['model_file'] = MODEL_FILE
+            else:
+                meta = {'format': 'ubj', 'model_file': MODEL_FILE}
+            meta.update(version=version, source=os.path.abspath(model_path),
+                        sha256=file_sha256(os.path.join(staging, MODEL_FILE)),
+                        published_at=time.strftime('%Y-%m-%dT%H:%M:%S'))
+            with open(meta_path_for(os.path.join(staging, MODEL_FILE)), 'w') as f:
+                json.dump(meta, f, indent=2)
+            # Flatten once here so serving processes only np.load() the forest on swap
+            model = load_model(os.path.join(staging, MODEL_FILE))
+            try:
+                ForestEvaluator.from_booster(model.get_booster()).save(os.path.join(staging, FOREST_FILE))
+            except ValueError as e:
+                logger.warning(f"NumPy engine arrays not exported: {str(e)}")
+            os.rename(staging, os.path.join(self.root, version))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        logger.info("Published %s as %s", model_path, version)
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version: str) -> None:
+        if version not in self.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        _write_pointer(os.path.join(self.root, 'CURRENT'), version)
+
+    def set_shadow(self, version) -> None:
+        if version is not None and version not in self.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        _write_pointer(os.path.join(self.root, 'SHADOW'), version)
+
+
+class ModelBundle:
+    """Everything needed to score with one model version; never mutated after a swap.
+
+    A bundle loaded with lazy_model=True from a version that has a
+    pre-flattened forest starts without the XGBoost model: importing xgboost
+    (which pulls in scikit-learn, SciPy and pandas) is most of a cold start,
+    and the NumPy engine can answer requests on its own. The model is loaded
+    the first time something needs it.
+    """
+
+    def __init__(self, version: str, model, model_path: str, forest=None, fare_table=None, meta: dict = None,
+                 nthread: int = None):
+        self.version = version
+        self._model = model
+        self._model_lock = threading.Lock()
+        self._nthread = nthread
+        self.model_path = model_path
+        self.forest = forest
+        self.fare_table = fare_table
+        self.meta = meta if meta is not None else getattr(model, 'meta', {})
+        self.loaded_at = time.time()
+        self._leaf_boxes = None
+        # Models trained with native categorical splits take 9-column rows; see predict()
+        categories = self.meta.get('categories')
+        self.categorical = CategoricalEncoder(categories) if categories else None
+
+    @classmethod
+    def load(cls, model_path: str, version: str = None, use_forest: bool = True,
+             fare_table_path: str = None, fare_table_tolerance: float = None, nthread: int = None,
+             lazy_model: bool = False) -> 'ModelBundle':
+        forest_path = os.path.join(os.path.dirname(model_path), FOREST_FILE)
+        has_forest = use_forest and os.path.basename(model_path) == MODEL_FILE and os.path.exists(forest_path)
+        if lazy_model and has_forest:
+            model, meta = None, read_meta(model_path)
+        else:
+            if lazy_model:
+                logger.info("No pre-flattened forest next to %s; loading the XGBoost model now", model_path)
+            model = load_model(model_path)
+            if nthread:
+                set_model_threads(model, nthread)
+            meta = getattr(model, 'meta', {})
+        version = version or meta.get('version') or (meta.get('sha256') or '')[:12] or 'unversioned'
+
+        forest = None
+        if use_forest:
+            try:
+                forest = (ForestEvaluator.load(forest_path) if has_forest
+                          else ForestEvaluator.from_booster(model.get_booster()))
+            except ValueError as e:
+                logger.warning(f"NumPy engine unavailable, using XGBoost only: {str(e)}")
+
+        # A per-version table next to the model wins over the shared one
+        local_table = os.path.join(os.path.dirname(model_path), FARE_TABLE_FILE)
+        table_path = local_table if os.path.exists(local_table) else fare_table_path
+        fare_table = (load_fare_table(table_path, model_path, fare_table_tolerance)
+                      if table_path and fare_table_tolerance is not None else None)
+
+        bundle = cls(version, model, model_path, forest, fare_table, meta, nthread)
+        bundle.warm_up()
+        return bundle
+
+    @property
+    def model(self):
+        """The XGBoost model, loaded here on first use when the bundle was loaded lazily."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    model = load_model(self.model_path)
+                    if self._nthread:
+                        set_model_threads(model, self._nthread)
+                    self._model = model
+                    logger.info("Loaded the XGBoost model for %s on first use", self.version)
+        return self._model
+
+    def predict(self, matrix: np.ndarray) -> np.ndarray:
+        """Score FEATURE_ORDER rows with the XGBoost model, converting them for categorical models."""
+        if self.categorical is not None:
+            matrix = self.categorical.transform(matrix)
+        return self.model.predict(matrix)
+
+    def warm_up(self) -> None:
+        """Score a dummy row so the first real request pays no lazy-initialization cost."""
+        if self.categorical is not None:
+            num_feature = len(FEATURE_ORDER)
+        elif self.forest is not None:
+            num_feature = self.forest.num_feature
+        else:
+            num_feature = len(self.meta.get('feature_names') or []) or self.model.get_booster().num_features()
+        row = np.zeros((1, num_feature), dtype=np.float32)
+        # A lazy bundle's model is warmed when it is loaded, not here
+        if self._model is not None:
+            self.predict(row)
+        if self.forest is not None:
+            self.forest.predict(row)
+
+    def leaf_boxes(self) -> LeafBoxes:
+        """Leaf intervals for route-grid searches, built on first use (a racing build is harmless)."""
+        if self._leaf_boxes is None:
+            forest = self.forest or ForestEvaluator.from_booster(self.model.get_booster())
+            self._leaf_boxes = LeafBoxes.from_forest(forest)
+        return self._leaf_boxes
+
+
+class ShadowRecorder:
+    """Scores sampled requests with both the served and the shadow bundle off the request path.
+
+    Work goes through a bounded queue to one background thread; when the
+    queue is full the sample is dropped rather than slowing requests down.
+    """
+
+    def __init__(self, max_pending: int = 64):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._pid = None
+        self.reset(None)
+
+    def reset(self, shadow_version) -> None:
+        with self._lock:
+            self.shadow_version = shadow_version
+            self.rows = 0
+            self.dropped = 0
+            self.sum_abs = 0.0
+            self.sum_rel = 0.0
+            self.max_abs = 0.0
+
+    def submit(self, primary: ModelBundle, shadow: ModelBundle, matrix: np.ndarray) -> None:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    threading.Thread(target=self._run, daemon=True, name='shadow-scorer').start()
+                    self._pid = os.getpid()
+        try:
+            self._queue.put_nowait((primary, shadow, matrix.copy()))
+        except queue.Full:
+            with self._lock:
+                self.dropped += len(matrix)
+
+    def _run(self) -> None:
+        while True:
+            primary, shadow, matrix = self._queue.get()
+            try:
+                prices = np.asarray(primary.predict(matrix), dtype=np.float64)
+                shadow_prices = np.asarray(shadow.predict(matrix), dtype=np.float64)
+            except Exception as e:
+                logger.warning(f"Shadow scoring failed: {str(e)}")
+                continue
+            diff = np.abs(shadow_prices - prices)
+            with self._lock:
+                if shadow.version != self.shadow_version:
+                    continue
+                self.rows += len(diff)
+                self.sum_abs += float(diff.sum())
+                self.sum_rel += float((diff / np.maximum(np.abs(prices), 1.0)).sum())
+                self.max_abs = max(self.max_abs, float(diff.max(initial=0.0)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'shadow_version': self.shadow_version,
+                'rows': self.rows,
+                'dropped': self.dropped,
+                'mean_abs_diff': round(self.sum_abs / self.rows, 4) if self.rows else None,
+                'mean_rel_diff': round(self.sum_rel / self.rows, 6) if self.rows else None,
+                'max_abs_diff': round(self.max_abs, 4) if self.rows else None,
+            }
+
+
+class RegistryWatcher:
+    """Polls the registry pointers and hot-swaps bundles in the background.
+
+    `on_swap(bundle)` / `on_shadow(bundle_or_None)` receive freshly loaded,
+    warmed-up bundles; they are expected to do a single reference assignment.
+    """
+
+    def __init__(self, registry: ModelRegistry, load_bundle, on_swap, on_shadow=None,
+                 interval: float = 2.0):
+        self.registry = registry
+        self.load_bundle = load_bundle
+        self.on_swap = on_swap
+        self.on_shadow = on_shadow
+        self.interval = interval
+        self.current_version = None
+        self.shadow_version = None
+        self.swaps = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+
+    def ensure_running(self) -> None:
+        """Start the polling thread in this process (threads do not survive a fork)."""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                threading.Thread(target=self._run, daemon=True, name='model-registry-watcher').start()
+                self._pid = os.getpid()
+
+    def _run(self) -> None:
+        # Loading competes with request threads for CPU; on Linux a thread can be reniced on its own
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.check()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Model reload failed: {str(e)}")
+
+    def check(self) -> bool:
+        """Load and swap in new CURRENT/SHADOW versions; returns True if anything changed."""
+        with self._lock:
+            changed = False
+            current = self.registry.current_version()
+            if current and current != self.current_version:
+                start = time.perf_counter()
+                bundle = self.load_bundle(self.registry.model_path(current), current)
+                self.on_swap(bundle)
+                self.current_version = current
+                self.swaps += 1
+                changed = True
+                logger.info("Swapped in model %s (loaded in %.2fs)", current, time.perf_counter() - start)
+
+            shadow = self.registry.shadow_version()
+            if shadow != self.shadow_version and self.on_shadow is not None:
+                bundle = self.load_bundle(self.registry.model_path(shadow), shadow) if shadow else None
+                self.on_shadow(bundle)
+                self.shadow_version = shadow
+                changed = True
+                logger.info("Shadow model set to %s", shadow)
+            self.last_error = None
+            return changed
+
+    def trigger(self) -> None:
+        """Ask the background thread to check now instead of at the next interval."""
+        self._wake.set()
+
+
+if __name__ == "__main__":
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description='Model registry tools')
+    parser.add_argument('--root', default=os.environ.get('MODEL_REGISTRY_DIR', os.path.join(base_dir, 'models', 'registry')),
+                        help='Registry directory')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    publish = subparsers.add_parser('publish', help='Add a native model as a new version')
+    publish.add_argument('model', help='Path to a .ubj/.json model with its sidecar')
+    publish.add_argument('--activate', action='store_true', help='Make it the served version')
+    subparsers.add_parser('list', help='List versions')
+    activate = subparsers.add_parser('activate', help='Serve a version')
+    activate.add_argument('version')
+    shadow = subparsers.add_parser('shadow', help='Score a version alongside CURRENT ("none" to stop)')
+    shadow.add_argument('version')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    if args.command == 'publish':
+        os.makedirs(args.root, exist_ok=True)
+        print(registry.publish(args.model, activate=args.activate))
+    elif args.command == 'list':
+        current, shadow_version = registry.current_version(), registry.shadow_version()
+        for version in registry.versions():
+            with open(meta_path_for(registry.model_path(version))) as f:
+                meta = json.load(f)
+            marker = '*' if version == current else ('s' if version == shadow_version else ' ')
+            print(f"{marker} {version}  {meta.get('published_at', '')}  rounds={meta.get('num_boosted_rounds')}  "
+                  f"sha256={meta.get('sha256', '')[:12]}")
+    elif args.command == 'activate':
+        registry.activate(args.version)
+        print(f"CURRENT -> {args.version}")
+    else:
+        registry.set_shadow(None if args.version == 'none' else args.version)
+        print(f"SHADOW -> {args.version}")
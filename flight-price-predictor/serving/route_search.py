@@ -0,0 +1,208 @@
+"""Cheapest-day search: price a whole route grid without walking the trees per row.
+
+A search covers every combination of airline, class, stops, departure and
+arrival slot and departure date for one route, up to ~78k itineraries for a
+60-day window. Scoring those rows one by one would cost about a second, so
+the grid is priced from the forest's leaves instead:
+
+* every leaf is a box of feature intervals (the splits on its path), built
+  once per model by LeafBoxes;
+* leaves whose box cannot contain any cell of the grid (another route, an
+  airline or class that was filtered out, a duration that does not match)
+  are pruned before any arithmetic;
+* each surviving leaf adds its value to a rectangular block of the
+  (departure slot, arrival slot, date) axes for the airline/class/stops
+  cells it admits, so all leaves go into a difference array and three
+  cumulative sums give the forest's margin for every cell at once.
+
+The grid prices are float64 sums of the same leaf values XGBoost adds in
+float32, so only the few cheapest cells are rescored with the live model
+(serving the exact prices /predict would return).
+"""
+from itertools import product
+
+import numpy as np
+
+from serving.features import FEATURE_ORDER, TIME_SLOTS
+
+# Flight hours assumed for each stops value when the request gives no duration
+TYPICAL_DURATIONS = {'zero': 2.25, 'one': 11.0, 'two_or_more': 15.0}
+
+DURATION_COLUMN = FEATURE_ORDER.index('duration')
+DAYS_LEFT_COLUMN = FEATURE_ORDER.index('days_left')
+DEPARTURE_COLUMN = FEATURE_ORDER.index('departure_time')
+ARRIVAL_COLUMN = FEATURE_ORDER.index('arrival_time')
+
+
+class LeafBoxes:
+    """Every leaf of a flattened forest as [lower, upper) intervals per feature."""
+
+    def __init__(self, lower: np.ndarray, upper: np.ndarray, value: np.ndarray, base_score: float):
+        self.lower = lower
+        self.upper = upper
+        self.value = value
+        self.base_score = base_score
+
+    @classmethod
+    def from_forest(cls, forest) -> 'LeafBoxes':
+        """Walk a serving.tree_engine.ForestEvaluator's node arrays one level at a time."""
+        n_nodes = len(forest.feature)
+        is_leaf = forest.left == np.arange(n_nodes)
+        lower = np.full((n_nodes, forest.num_feature), -np.inf, dtype=np.float32)
+        upper = np.full((n_nodes, forest.num_feature), np.inf, dtype=np.float32)
+        frontier = forest.roots.astype(np.intp)
+        while len(frontier):
+            parents = frontier[~is_leaf[frontier]]
+            feature, threshold = forest.feature[parents], forest.threshold[parents]
+            left, right = forest.left[parents], forest.right[parents]
+            # Rows go left when x < threshold
+            for children in (left, right):
+                lower[children] = lower[parents]
+                upper[children] = upper[parents]
+            upper[left, feature] = np.minimum(upper[left, feature], threshold)
+            lower[right, feature] = np.maximum(lower[right, feature], threshold)
+            frontier = np.concatenate([left, right])
+
+        leaves = np.flatnonzero(is_leaf)
+        return cls(lower[leaves], upper[leaves], forest.value[leaves].astype(np.float64), forest.base_score)
+
+
+def _onehot_admits(lower: np.ndarray, upper: np.ndarray, prefix: str, names: list) -> np.ndarray:
+    """(leaves x len(names)) mask of leaves reachable when the block's `name` column is 1 and the rest 0."""
+    block = [i for i, feature in enumerate(FEATURE_ORDER) if feature.startswith(prefix)]
+    columns = np.array([FEATURE_ORDER.index(prefix + name) - block[0] for name in names])
+    lo, hi = lower[:, block], upper[:, block]
+    zero_blocked = ~((lo <= 0) & (0 < hi))
+    one_ok = (lo[:, columns] <= 1) & (1 < hi[:, columns])
+    others_blocked = zero_blocked.sum(axis=1, keepdims=True) - zero_blocked[:, columns]
+    return one_ok & (others_blocked == 0)
+
+
+def _index_range(lower: np.ndarray, upper: np.ndarray, values: np.ndarray):
+    """First and one-past-last index of the sorted `values` inside each [lower, upper)."""
+    return np.searchsorted(values, lower, 'left'), np.searchsorted(values, upper, 'left')
+
+
+class RouteGrid:
+    """Every itinerary searched for one route, as the axes of a 6-d grid.
+
+    The axes are (airline, class, stops, departure slot, arrival slot, date);
+    `days_left` holds each date's days until departure, in ascending order.
+    """
+
+    def __init__(self, source: str, destination: str, airlines: list, classes: list, stops: list,
+                 departure_slots: list, arrival_slots: list, days_left, durations: list = None):
+        self.source = source
+        self.destination = destination
+        self.airlines = list(airlines)
+        self.classes = list(classes)
+        self.stops = list(stops)
+        self.departure_slots = np.array(sorted(departure_slots), dtype=np.float32)
+        self.arrival_slots = np.array(sorted(arrival_slots), dtype=np.float32)
+        self.days_left = np.asarray(days_left, dtype=np.float32)
+        self.durations = np.array(durations if durations is not None else
+                                  [TYPICAL_DURATIONS[stop] for stop in self.stops], dtype=np.float32)
+
+    @property
+    def shape(self) -> tuple:
+        return (len(self.airlines), len(self.classes), len(self.stops),
+                len(self.departure_slots), len(self.arrival_slots), len(self.days_left))
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    def price(self, boxes: LeafBoxes) -> np.ndarray:
+        """Model margin for every cell, shaped like `shape` (float64)."""
+        lower, upper = boxes.lower, boxes.upper
+        # Prune leaves that are off this route first; everything below runs on the survivors
+        on_route = (_onehot_admits(lower, upper, 'source_city_', [self.source])[:, 0]
+                    & _onehot_admits(lower, upper, 'destination_city_', [self.destination])[:, 0])
+        lower, upper, value = lower[on_route], upper[on_route], boxes.value[on_route]
+
+        # Airline x class x stops cells each leaf admits; duration follows stops
+        duration_ok = ((lower[:, [DURATION_COLUMN]] <= self.durations)
+                       & (self.durations < upper[:, [DURATION_COLUMN]]))
+        admits = (_onehot_admits(lower, upper, 'airline_', self.airlines)[:, :, None, None]
+                  & _onehot_admits(lower, upper, 'class_', self.classes)[:, None, :, None]
+                  & (_onehot_admits(lower, upper, 'stops_', self.stops) & duration_ok)[:, None, None, :])
+        admits = admits.reshape(len(value), -1)
+
+        # Ordinal axes become index ranges [start, stop) on the sorted axis values
+        ranges = [_index_range(lower[:, column], upper[:, column], values) for column, values in (
+            (DEPARTURE_COLUMN, self.departure_slots), (ARRIVAL_COLUMN, self.arrival_slots),
+            (DAYS_LEFT_COLUMN, self.days_left))]
+        reachable = admits.any(axis=1)
+        for start, stop in ranges:
+            reachable &= stop > start
+        admits, value = admits[reachable], value[reachable]
+        ranges = [(start[reachable], stop[reachable]) for start, stop in ranges]
+
+        # Leaves covering the same block are summed before scattering
+        n_cat = admits.shape[1]
+        dims = [len(self.departure_slots) + 1, len(self.arrival_slots) + 1, len(self.days_left) + 1]
+        block_key = np.ravel_multi_index([bound for pair in ranges for bound in pair],
+                                         [dim for dim in dims for _ in range(2)])
+        order = np.argsort(block_key, kind='stable')
+        block_key = block_key[order]
+        first = np.flatnonzero(np.r_[True, block_key[1:] != block_key[:-1]])
+        weights = np.add.reduceat(admits[order] * value[order, None], first, axis=0)
+        ranges = [(start[order][first], stop[order][first]) for start, stop in ranges]
+
+        # Inclusion-exclusion on the 8 corners of each block, then prefix sums restore the values
+        diff = np.zeros(int(np.prod(dims)) * n_cat)
+        cat_index = np.arange(n_cat)
+        for corner in product((0, 1), repeat=3):
+            cells = np.ravel_multi_index([pair[side] for pair, side in zip(ranges, corner)], dims)
+            sign = -1.0 if sum(corner) % 2 else 1.0
+            diff += np.bincount((cells[:, None] * n_cat + cat_index).ravel(),
+                                weights=(sign * weights).ravel(), minlength=len(diff))
+        grid = diff.reshape(*dims, n_cat)
+        for axis in range(3):
+            np.cumsum(grid, axis=axis, out=grid)
+        grid = grid[:-1, :-1, :-1] + boxes.base_score
+        n_airlines, n_classes, n_stops = self.shape[:3]
+        return grid.reshape(*grid.shape[:3], n_airlines, n_classes, n_stops).transpose(3, 4, 5, 0, 1, 2)
+
+    def candidates(self, prices: np.ndarray, top_k: int, margin: int = 32) -> tuple:
+        """Flat indices of the cheapest cells (over-fetched by `margin` so rescoring can reorder
+        near-ties) and of the cheapest cell on each date."""
+        flat = prices.reshape(-1)
+        n = min(flat.size, top_k + margin)
+        cheapest = np.argpartition(flat, n - 1)[:n] if n < flat.size else np.arange(flat.size)
+        cheapest = cheapest[np.argsort(flat[cheapest], kind='stable')]
+        per_date = prices.reshape(-1, len(self.days_left)).argmin(axis=0)
+        by_date = np.ravel_multi_index((per_date, np.arange(len(self.days_left))),
+                                       (flat.size // len(self.days_left), len(self.days_left)))
+        return cheapest, by_date
+
+    def rows(self, indices) -> np.ndarray:
+        """Encode grid cells as float32 rows in FEATURE_ORDER, as FeatureEncoder would."""
+        a, c, s, d, r, t = np.unravel_index(np.asarray(indices), self.shape)
+        rows = np.zeros((len(a), len(FEATURE_ORDER)), dtype=np.float32)
+        rows[:, DURATION_COLUMN] = self.durations[s]
+        rows[:, DAYS_LEFT_COLUMN] = self.days_left[t]
+        rows[:, DEPARTURE_COLUMN] = self.departure_slots[d]
+        rows[:, ARRIVAL_COLUMN] = self.arrival_slots[r]
+        n = np.arange(len(a))
+        rows[:, FEATURE_ORDER.index('source_city_' + self.source)] = 1
+        rows[:, FEATURE_ORDER.index('destination_city_' + self.destination)] = 1
+        for prefix, names, picked in (('airline_', self.airlines, a), ('class_', self.classes, c),
+                                      ('stops_', self.stops, s)):
+            columns = np.array([FEATURE_ORDER.index(prefix + name) for name in names])
+            rows[n, columns[picked]] = 1
+        return rows
+
+    def describe(self, index: int) -> dict:
+        """The itinerary behind one flat grid index."""
+        a, c, s, d, r, t = np.unravel_index(index, self.shape)
+        return {
+            'airline': self.airlines[a],
+            'class': self.classes[c],
+            'stops': self.stops[s],
+            'departure_time': TIME_SLOTS[int(self.departure_slots[d])],
+            'arrival_time': TIME_SLOTS[int(self.arrival_slots[r])],
+            'duration': float(self.durations[s]),
+            'days_left': int(self.days_left[t]),
+            'date_index': int(t),
+        }
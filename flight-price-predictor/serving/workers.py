@@ -0,0 +1,138 @@
+"""Worker and thread budgets for multi-process serving.
+
+XGBoost predicts with one OpenMP thread per core by default, so N gunicorn
+workers scoring at the same time start N x cores threads, and p99 latency
+collapses under load. A plan splits the usable cores between workers:
+``workers x threads <= cores``. Each worker's model is told to use its
+``threads`` (MODEL_THREADS, applied by app.py whenever a model is loaded,
+including hot swaps). Workers can optionally be pinned to their own cores.
+
+gunicorn.conf.py applies the plan. The launcher fills in the environment
+and execs gunicorn::
+
+    python -m serving.workers                       # one single-threaded worker per core
+    python -m serving.workers --threads 2 --pin     # cores/2 workers with 2 pinned cores each
+    python -m serving.workers --asgi --dry_run      # print the plan and command for asgi:app
+
+Environment used by gunicorn.conf.py: WEB_CONCURRENCY (workers),
+MODEL_THREADS (threads per worker; 0 leaves XGBoost's default of every
+core) and PIN_WORKERS=1.
+"""
+import argparse
+import math
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Thread pools that honour these variables when the libraries load
+THREAD_ENV_VARS = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS']
+
+
+def available_cores() -> list:
+    """Cores this process may run on (its affinity mask, else all of them)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def cgroup_cpu_limit():
+    """CPUs allowed by a container's cgroup quota (v2 cpu.max or v1 CFS), or None when unlimited."""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            return float(quota) / float(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def usable_cores() -> int:
+    cores = len(available_cores())
+    limit = cgroup_cpu_limit()
+    return max(1, min(cores, math.ceil(limit))) if limit else cores
+
+
+def plan_workers(cores: int = None, workers: int = None, threads: int = None) -> tuple:
+    """(workers, threads per worker) for `cores`; either count may be fixed.
+
+    Single-row requests gain nothing from extra threads, so by default every
+    core gets its own single-threaded worker. threads=0 means no budget
+    (XGBoost uses every core in every worker).
+    """
+    cores = cores or usable_cores()
+    if threads is None:
+        threads = max(1, cores // workers) if workers else 1
+    if workers is None:
+        workers = max(1, cores // max(threads, 1))
+    return workers, threads
+
+
+def thread_env(threads: int) -> dict:
+    """Environment capping native thread pools at `threads` (empty for no budget)."""
+    return {name: str(threads) for name in THREAD_ENV_VARS} if threads else {}
+
+
+def core_slot_cores(slot: int, threads: int, cores: list = None) -> list:
+    """Cores for the worker in `slot`: consecutive blocks of `threads`, wrapping when oversubscribed."""
+    cores = cores or available_cores()
+    return [cores[(slot * threads + i) % len(cores)] for i in range(threads)]
+
+
+def assign_slot(server, worker) -> None:
+    """gunicorn pre_fork hook (runs in the master): give the new worker the lowest free core slot.
+
+    Slots, unlike worker ages, are reused when a worker is replaced, so a
+    restarted worker takes over the cores of the one it replaces.
+    """
+    taken = {getattr(w, 'core_slot', None) for w in server.WORKERS.values()}
+    worker.core_slot = next(slot for slot in range(len(taken) + 1) if slot not in taken)
+
+
+def pin_worker(worker, threads: int) -> None:
+    """gunicorn post_fork hook (runs in the worker): restrict it to its slot's cores."""
+    if not hasattr(os, 'sched_setaffinity') or not threads:
+        return
+    cores = core_slot_cores(worker.core_slot, threads)
+    os.sched_setaffinity(0, cores)
+    worker.log.info("Worker %s pinned to cores %s", worker.pid, cores)
+
+
+def gunicorn_command(asgi: bool = False, extra_args=()) -> list:
+    command = ['gunicorn', '-c', os.path.join(BASE_DIR, 'gunicorn.conf.py')]
+    if asgi:
+        command += ['-k', 'uvicorn.workers.UvicornWorker']
+    return command + list(extra_args) + ['asgi:app' if asgi else 'app:app']
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Start gunicorn with a worker/thread plan for this machine',
+                                     epilog='Unrecognized arguments are passed on to gunicorn.')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: cores / threads)')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='Model threads per worker (default: cores / workers, else 1; 0 = no budget)')
+    parser.add_argument('--cores', type=int, default=None, help='Cores to plan for (default: usable cores)')
+    parser.add_argument('--pin', action='store_true', help='Pin each worker to its own cores')
+    parser.add_argument('--asgi', action='store_true', help='Serve asgi:app with uvicorn workers')
+    parser.add_argument('--dry_run', action='store_true', help='Print the plan and command without starting')
+    args, gunicorn_args = parser.parse_known_args()
+
+    workers, threads = plan_workers(args.cores, args.workers, args.threads)
+    env = {'WEB_CONCURRENCY': str(workers), 'MODEL_THREADS': str(threads), 'PIN_WORKERS': '1' if args.pin else '0'}
+    command = gunicorn_command(args.asgi, gunicorn_args)
+    print(f"{usable_cores()} usable cores: {workers} workers x {threads or 'all'} model threads"
+          f"{', pinned' if args.pin else ''}", file=sys.stderr)
+    if args.dry_run:
+        print(' '.join(f"{k}={v}" for k, v in env.items()), ' '.join(command))
+    else:
+        os.chdir(BASE_DIR)
+        os.execvpe(command[0], command, dict(os.environ, **env))
@@ -1,44 +1,218 @@
 import pandas as pd
+import numpy as np
+import argparse
+import json
 import os
+import sys
+import time
 from sklearn.preprocessing import OneHotEncoder
 import joblib
 
-def preprocess_data():
-    raw_data_path = 'D:\\PyAttendence\\flight-price-predictor\\data\\raw\\Clean_Dataset.csv'
-    processed_dir = 'D:\\PyAttendence\\flight-price-predictor\\data\\processed'
-    model_dir = 'D:\\PyAttendence\\flight-price-predictor\\models'
-    processed_data_path = os.path.join(processed_dir, 'flights_processed.csv')
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TIME_CATEGORIES = ['Early_Morning', 'Morning', 'Afternoon', 'Evening', 'Night', 'Late_Night']
+NUMERICAL_COLS = ['duration', 'days_left', 'departure_time', 'arrival_time']
+CATEGORICAL_COLS = ['airline', 'source_city', 'destination_city', 'class', 'stops']
+# 'onehot' expands CATEGORICAL_COLS into 0/1 columns (the layout of serving.features.FEATURE_ORDER);
+# 'categorical' keeps one int8 code per column for XGBoost's native categorical splits
+ENCODINGS = ['onehot', 'categorical']
+
+# Compact output dtypes; one-hot columns are uint8
+COLUMN_DTYPES = {
+    'duration': np.float32,
+    'days_left': np.int16,
+    'departure_time': np.int16,
+    'arrival_time': np.int16,
+    'price': np.int32,
+}
+
+def peak_memory_mb():
+    """Peak resident set size of this process in MB, or None where unsupported"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+def read_chunks(raw_data_path, columns, chunksize=None):
+    """Yield the given columns of the raw CSV, whole or in chunks"""
+    dtypes = {col: 'category' for col in CATEGORICAL_COLS + ['departure_time', 'arrival_time']}
+    dtypes = {col: dtype for col, dtype in dtypes.items() if col in columns}
+    if chunksize is None:
+        yield pd.read_csv(raw_data_path, usecols=columns, dtype=dtypes)
+        return
+    yield from pd.read_csv(raw_data_path, usecols=columns, dtype=dtypes, chunksize=chunksize)
+
+def fit_encoder(raw_data_path, chunksize=None):
+    """Fit the one-hot encoder in a single pass over the categorical columns only"""
+    seen = {col: set() for col in CATEGORICAL_COLS}
+    for chunk in read_chunks(raw_data_path, CATEGORICAL_COLS, chunksize):
+        for col in CATEGORICAL_COLS:
+            seen[col].update(chunk[col].dropna().unique())
+
+    categories = [sorted(seen[col]) for col in CATEGORICAL_COLS]
+    encoder = OneHotEncoder(categories=categories, sparse_output=False,
+                            handle_unknown='ignore', dtype=np.uint8)
+    encoder.fit(pd.DataFrame({col: [cats[0]] for col, cats in zip(CATEGORICAL_COLS, categories)}))
+    return encoder
+
+def transform_chunk(chunk, encoder, encoding='onehot'):
+    """Encode one chunk of raw rows into compact numeric columns"""
+    columns = {}
+    for col in NUMERICAL_COLS + ['price']:
+        values = chunk[col]
+        if col in ('departure_time', 'arrival_time'):
+            values = pd.Categorical(values, categories=TIME_CATEGORIES, ordered=True).codes
+        columns[col] = np.asarray(values, dtype=COLUMN_DTYPES[col])
+
+    if encoding == 'categorical':
+        # Codes are positions in the encoder's sorted category lists; unseen values become -1
+        for col, categories in zip(CATEGORICAL_COLS, encoder.categories_):
+            columns[col] = pd.Categorical(chunk[col], categories=categories).codes.astype(np.int8)
+    else:
+        encoded = encoder.transform(chunk[CATEGORICAL_COLS])
+        for i, name in enumerate(encoder.get_feature_names_out(CATEGORICAL_COLS)):
+            columns[name] = encoded[:, i]
+
+    # Keep the historical column order: features first, price last
+    price = columns.pop('price')
+    columns['price'] = price
+    return columns
+
+class CsvWriter:
+    def __init__(self, path):
+        self.path = path + '.csv'
+        self.header = True
+
+    def write(self, columns):
+        pd.DataFrame(columns).to_csv(self.path, mode='w' if self.header else 'a',
+                                     header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        pass
+
+class NpyShardWriter:
+    """One directory per shard holding one .npy file per column"""
+    def __init__(self, path):
+        self.path = path
+        self.shards = 0
+        self.rows = 0
+        self.schema = None
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, columns):
+        shard_dir = os.path.join(self.path, f"part-{self.shards:05d}")
+        os.makedirs(shard_dir, exist_ok=True)
+        for name, values in columns.items():
+            np.save(os.path.join(shard_dir, f"{name}.npy"), values)
+        if self.schema is None:
+            self.schema = [[name, values.dtype.str] for name, values in columns.items()]
+        self.shards += 1
+        self.rows += len(next(iter(columns.values())))
+
+    def close(self):
+        with open(os.path.join(self.path, 'schema.json'), 'w') as f:
+            json.dump({'columns': self.schema, 'shards': self.shards, 'rows': self.rows}, f, indent=2)
+
+class ParquetWriter:
+    """Single Parquet file with one row group per chunk"""
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+        self.pa, self.pq = pa, pq
+        self.path = path + '.parquet'
+        self.writer = None
+
+    def write(self, columns):
+        table = self.pa.table(columns)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+WRITERS = {'csv': CsvWriter, 'npy': NpyShardWriter, 'parquet': ParquetWriter}
+
+def load_processed(path):
+    """Load processed data written in any output format as a DataFrame"""
+    if path.endswith('.csv'):
+        return pd.read_csv(path)
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    with open(os.path.join(path, 'schema.json')) as f:
+        schema = json.load(f)
+    shards = [os.path.join(path, f"part-{i:05d}") for i in range(schema['shards'])]
+    return pd.DataFrame({
+        name: np.concatenate([np.load(os.path.join(shard, f"{name}.npy"), mmap_mode='r') for shard in shards])
+        for name, _ in schema['columns']
+    })
+
+def save_categories(encoder, path):
+    """Write the category lists (whose positions are the categorical codes) as JSON"""
+    with open(path, 'w') as f:
+        json.dump({col: [str(value) for value in categories]
+                   for col, categories in zip(CATEGORICAL_COLS, encoder.categories_)}, f, indent=2)
+
+def preprocess_data(raw_data_path, processed_dir, model_dir, chunksize=None, output_format='csv',
+                    encoding='onehot'):
+    """Encode the raw dataset and save the processed data and fitted encoder
+
+    With a chunksize the file is streamed twice: once to collect the category
+    values, once to transform and write fixed-size chunks, so memory stays
+    bounded by the chunk size instead of the dataset size. The categorical
+    encoding is written as flights_processed_categorical next to the one-hot
+    output, and both record their category lists in <model_dir>/categories.json.
+    """
+    start = time.perf_counter()
     encoder_path = os.path.join(model_dir, 'encoder.pkl')
-    
-    df = pd.read_csv(raw_data_path)
-    
-    # Time conversion
-    time_categories = ['Early_Morning', 'Morning', 'Afternoon', 'Evening', 'Night', 'Late_Night']
-    df['departure_time'] = pd.Categorical(df['departure_time'], categories=time_categories, ordered=True).codes
-    df['arrival_time'] = pd.Categorical(df['arrival_time'], categories=time_categories, ordered=True).codes
-
-    # Feature selection
-    numerical_cols = ['duration', 'days_left', 'departure_time', 'arrival_time']  
-    categorical_cols = ['airline', 'source_city', 'destination_city', 'class', 'stops']
-    
+    categories_path = os.path.join(model_dir, 'categories.json')
+    name = 'flights_processed' if encoding == 'onehot' else f'flights_processed_{encoding}'
+    processed_data_path = os.path.join(processed_dir, name)
+
     # Create and save encoder
-    encoder = OneHotEncoder(sparse_output=False, handle_unknown='ignore')
-    encoded_data = encoder.fit_transform(df[categorical_cols])
-    encoded_df = pd.DataFrame(encoded_data, columns=encoder.get_feature_names_out(categorical_cols))
-    
-    # Save encoder after fitting
+    encoder = fit_encoder(raw_data_path, chunksize)
     os.makedirs(model_dir, exist_ok=True)
     joblib.dump(encoder, encoder_path)
-    print(f"Encoder saved to: {encoder_path}")
-    
-    # Create final dataset
-    processed_df = pd.concat([df[numerical_cols], encoded_df], axis=1)
-    processed_df['price'] = df['price']
-    
-    # Save processed data
+    save_categories(encoder, categories_path)
+    print(f"Encoder saved to: {encoder_path} (categories: {categories_path})")
+
     os.makedirs(processed_dir, exist_ok=True)
-    processed_df.to_csv(processed_data_path, index=False)
-    print(f"Data saved to: {processed_data_path}")
+    writer = WRITERS[output_format](processed_data_path)
+    rows = 0
+    try:
+        for chunk in read_chunks(raw_data_path, NUMERICAL_COLS + CATEGORICAL_COLS + ['price'], chunksize):
+            writer.write(transform_chunk(chunk, encoder, encoding))
+            rows += len(chunk)
+            if chunksize:
+                print(f"Processed {rows} rows")
+    finally:
+        writer.close()
+
+    print(f"Data saved to: {writer.path}")
+    peak = peak_memory_mb()
+    peak_text = f"{peak:.1f} MB" if peak is not None else "n/a"
+    print(f"Rows: {rows}, elapsed: {time.perf_counter() - start:.1f}s, peak memory: {peak_text}")
+    return writer.path
 
 if __name__ == "__main__":
-    preprocess_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Preprocess the raw flight dataset')
+    parser.add_argument('--raw', default=os.path.join(BASE_DIR, 'data', 'raw', 'Clean_Dataset.csv'), help='Raw CSV')
+    parser.add_argument('--processed_dir', default=os.path.join(BASE_DIR, 'data', 'processed'), help='Output directory')
+    parser.add_argument('--model_dir', default=os.path.join(BASE_DIR, 'models'), help='Encoder directory')
+    parser.add_argument('--chunksize', type=int, default=None, help='Rows per chunk (streams the file when set)')
+    parser.add_argument('--format', choices=sorted(WRITERS), default='csv', help='Output format')
+    parser.add_argument('--encoding', choices=ENCODINGS, default='onehot',
+                        help='One-hot columns, or integer codes for native categorical training')
+    args = parser.parse_args()
+    preprocess_data(args.raw, args.processed_dir, args.model_dir, args.chunksize, args.format, args.encoding)
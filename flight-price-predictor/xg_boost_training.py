@@ -1,22 +1,43 @@
 import pandas as pd
 import numpy as np
 import xgboost as xgb
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pickle
 import os
+import hashlib
+import itertools
+import json
+import math
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from serving.model_io import export_native_model, file_sha256
+from src.data_processing.processing import load_processed
 
 # Set random seed for reproducibility
 np.random.seed(42)
 
+# Bump when preprocess_data changes so stale caches are not reused
+PREPROCESS_VERSION = 1
+
+# Wall-clock seconds per workflow stage, printed at the end of main()
+STAGE_TIMES = {}
+
+@contextmanager
+def stage(name):
+    """Time a workflow stage and record it in STAGE_TIMES"""
+    start = time.perf_counter()
+    yield
+    STAGE_TIMES[name] = STAGE_TIMES.get(name, 0.0) + time.perf_counter() - start
+    print(f"[{name}] {STAGE_TIMES[name]:.2f}s")
+
 # Function to load and prepare data
 def load_data(file_path):
-    """Load data from a CSV file"""
+    """Load data from a CSV, or processing.py's Parquet or npy output"""
     print(f"Loading data from {file_path}...")
-    df = pd.read_csv(file_path)
+    df = load_processed(file_path)
     print(f"Data shape: {df.shape}")
     print("\nColumns in dataset:")
     for col in df.columns:
@@ -43,17 +64,98 @@ def preprocess_data(df, target_column, drop_columns=None):
                 df_processed[col] = df_processed[col].fillna(df_processed[col].mode()[0])
                 print(f"Filled missing values in '{col}' with mode")
     
-    # Encode categorical variables
-    for col in df_processed.columns:
-        if pd.api.types.is_object_dtype(df_processed[col]) and col != target_column:
-            df_processed = pd.get_dummies(df_processed, columns=[col], drop_first=True)
-            print(f"One-hot encoded column: {col}")
+    # Encode categorical variables in a single pass
+    categorical_cols = [
+        col for col in df_processed.columns
+        if not pd.api.types.is_numeric_dtype(df_processed[col]) and col != target_column
+    ]
+    if categorical_cols:
+        df_processed = pd.get_dummies(df_processed, columns=categorical_cols, drop_first=True)
+        print(f"One-hot encoded columns: {categorical_cols}")
     
     X = df_processed.drop(columns=[target_column])
     y = df_processed[target_column]
     print(f"Final feature count: {X.shape[1]}")
     return X, y
 
+def data_sha256(path):
+    """SHA-256 of a data file, or of every file in an npy shard directory"""
+    if not os.path.isdir(path):
+        return file_sha256(path)
+    digest = hashlib.sha256()
+    for root, dirs, files in sorted(os.walk(path)):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode())
+            digest.update(file_sha256(file_path).encode())
+    return digest.hexdigest()
+
+# Function to load preprocessed data through the on-disk cache
+def load_preprocessed(file_path, target_column, drop_columns=None, cache_dir=None):
+    """Load X/y from a content-hashed cache, preprocessing the CSV on a miss
+
+    The cache key covers the data's SHA-256 and the preprocessing options, so
+    editing the data or changing --target/--drop produces a new entry. X is
+    stored as a float32 .npy file and memory-mapped on load.
+    """
+    if cache_dir is None:
+        with stage('load'):
+            df = load_data(file_path)
+        with stage('preprocess'):
+            return preprocess_data(df, target_column, drop_columns)
+    
+    with stage('hash'):
+        options = {
+            'sha256': data_sha256(file_path),
+            'target': target_column,
+            'drop': sorted(drop_columns or []),
+            'version': PREPROCESS_VERSION
+        }
+        key = hashlib.sha256(json.dumps(options, sort_keys=True).encode()).hexdigest()[:16]
+    entry = os.path.join(cache_dir, key)
+    
+    if os.path.exists(os.path.join(entry, 'meta.json')):
+        with stage('load_cache'):
+            with open(os.path.join(entry, 'meta.json')) as f:
+                meta = json.load(f)
+            X = pd.DataFrame(np.load(os.path.join(entry, 'X.npy'), mmap_mode='r'),
+                             columns=meta['feature_names'], copy=False)
+            y = pd.Series(np.load(os.path.join(entry, 'y.npy')), name=target_column)
+        print(f"\nLoaded preprocessed data from cache {entry} ({X.shape[0]} rows, {X.shape[1]} features)")
+        return X, y
+    
+    with stage('load'):
+        df = load_data(file_path)
+    with stage('preprocess'):
+        X, y = preprocess_data(df, target_column, drop_columns)
+    
+    with stage('write_cache'):
+        # Write into a temporary directory and rename it so readers never see a partial entry
+        tmp_entry = f"{entry}.tmp{os.getpid()}"
+        os.makedirs(tmp_entry, exist_ok=True)
+        np.save(os.path.join(tmp_entry, 'X.npy'), X.to_numpy(dtype=np.float32))
+        np.save(os.path.join(tmp_entry, 'y.npy'), y.to_numpy())
+        with open(os.path.join(tmp_entry, 'meta.json'), 'w') as f:
+            json.dump({**options, 'source': os.path.abspath(file_path),
+                       'feature_names': list(X.columns)}, f, indent=2)
+        try:
+            os.replace(tmp_entry, entry)
+        except OSError:
+            # Another run populated the entry first
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+    print(f"Cached preprocessed data in {entry}")
+    return X, y
+
+# Function to build one DMatrix per split
+def build_dmatrices(X_train, X_val, X_test, y_train, y_val, y_test):
+    """Build the train/val/test DMatrix objects once for training, evaluation and plots"""
+    return {
+        'train': xgb.DMatrix(X_train, label=y_train),
+        'val': xgb.DMatrix(X_val, label=y_val),
+        'test': xgb.DMatrix(X_test, label=y_test)
+    }
+
 # Function to split data
 def split_data(X, y, test_size=0.2, val_size=0.1):
     """Split data into train/val/test sets"""
@@ -73,9 +175,56 @@ def split_data(X, y, test_size=0.2, val_size=0.1):
     print(f"Test set size: {X_test.shape[0]}")
     return X_train, X_val, X_test, y_train, y_val, y_test
 
+# Per-process cache of quantized matrices, keyed by a per-call tuning token
+_WORKER_DMATRICES = {}
+
+def _tuning_dmatrices(token, X_train, y_train, X_val, y_val, feature_names=None):
+    """Build the quantized train/val matrices once per process and reuse them"""
+    if token not in _WORKER_DMATRICES:
+        _WORKER_DMATRICES.clear()
+        dtrain = xgb.QuantileDMatrix(X_train, label=y_train, feature_names=feature_names)
+        dval = xgb.QuantileDMatrix(X_val, label=y_val, ref=dtrain, feature_names=feature_names)
+        _WORKER_DMATRICES[token] = (dtrain, dval)
+    return _WORKER_DMATRICES[token]
+
+def _run_trial(params, dtrain, dval, y_val, rounds, booster=None, early_stopping_rounds=None):
+    """Train (or continue training) one configuration up to `rounds` total rounds"""
+    start = time.perf_counter()
+    done = booster.num_boosted_rounds() if booster is not None else 0
+    booster = xgb.train(
+        params,
+        dtrain,
+        num_boost_round=max(rounds - done, 0),
+        evals=[(dval, 'validation')],
+        early_stopping_rounds=early_stopping_rounds,
+        xgb_model=booster,
+        verbose_eval=False
+    )
+    best_rounds = booster.best_iteration + 1 if early_stopping_rounds else booster.num_boosted_rounds()
+    val_pred = booster.predict(dval, iteration_range=(0, best_rounds))
+    score = mean_squared_error(y_val, val_pred)
+    return booster, score, best_rounds, time.perf_counter() - start
+
+def _run_trial_in_worker(token, data, params, y_val, rounds, booster, early_stopping_rounds):
+    dtrain, dval = _tuning_dmatrices(token, *data)
+    return _run_trial(params, dtrain, dval, y_val, rounds, booster, early_stopping_rounds)
+
 # Function to perform hyperparameter tuning
-def tune_hyperparameters(X_train, y_train, X_val, y_val, nfolds=5):
-    """Perform hyperparameter tuning"""
+def tune_hyperparameters(X_train, y_train, X_val, y_val, nfolds=5, n_jobs=None, backend='thread',
+                         halving=True, eta=2, min_rounds=50, max_rounds=1000, results_path=None):
+    """Perform parallel hyperparameter tuning with successive halving
+
+    Every configuration is trained for `min_rounds` rounds; only the best
+    1/eta of them continue to the next, `eta` times larger, budget until
+    `max_rounds` (with early stopping) is reached. With halving=False every
+    configuration gets the full budget.
+
+    backend='thread' shares one QuantileDMatrix between concurrent trials
+    (XGBoost releases the GIL while training); backend='process' runs trials
+    in joblib worker processes that each build the QuantileDMatrix once.
+    Each trial gets cpu_count // n_jobs XGBoost threads so cores are not
+    oversubscribed.
+    """
     print("\nPerforming hyperparameter tuning...")
     
     param_grid = {
@@ -84,50 +233,105 @@ def tune_hyperparameters(X_train, y_train, X_val, y_val, nfolds=5):
         'subsample': [0.8, 1.0],
         'colsample_bytree': [0.8, 1.0]
     }
-    
-    # Convert data to DMatrix
-    dtrain = xgb.DMatrix(X_train, label=y_train)
-    dval = xgb.DMatrix(X_val, label=y_val)
-    
-    best_params = {}
-    best_score = float('inf')
-    
-    # Manual grid search implementation
-    for max_depth in param_grid['max_depth']:
-        for learning_rate in param_grid['learning_rate']:
-            for subsample in param_grid['subsample']:
-                for colsample_bytree in param_grid['colsample_bytree']:
-                    params = {
-                        'max_depth': max_depth,
-                        'learning_rate': learning_rate,
-                        'subsample': subsample,
-                        'colsample_bytree': colsample_bytree,
-                        'objective': 'reg:squarederror'
-                    }
-                    
-                    model = xgb.train(
-                        params,
-                        dtrain,
-                        num_boost_round=1000,
-                        evals=[(dval, 'validation')],
-                        early_stopping_rounds=50,
-                        verbose_eval=False
-                    )
-                    
-                    val_pred = model.predict(dval)
-                    score = mean_squared_error(y_val, val_pred)
-                    
-                    if score < best_score:
-                        best_score = score
-                        best_params = params
-                        best_params['n_estimators'] = model.best_iteration
+    configs = [
+        dict(zip(param_grid, values), objective='reg:squarederror')
+        for values in itertools.product(*param_grid.values())
+    ]
+    
+    n_jobs = n_jobs or min(len(configs), os.cpu_count() or 1)
+    nthread = max(1, (os.cpu_count() or 1) // n_jobs)
+    
+    feature_names = list(X_train.columns) if hasattr(X_train, 'columns') else None
+    X_train = np.ascontiguousarray(X_train, dtype=np.float32)
+    X_val = np.ascontiguousarray(X_val, dtype=np.float32)
+    y_train = np.asarray(y_train, dtype=np.float32)
+    y_val = np.asarray(y_val, dtype=np.float32)
+    # Identifies this call's matrices, so a later call never reuses them
+    token = f"{id(X_train)}-{time.time()}"
+    
+    if backend == 'thread':
+        dtrain, dval = _tuning_dmatrices(token, X_train, y_train, X_val, y_val, feature_names)
+        executor = ThreadPoolExecutor(max_workers=n_jobs)
+        
+        def run_rung(jobs):
+            futures = [
+                executor.submit(_run_trial, params, dtrain, dval, y_val, rounds, booster, stopping)
+                for params, rounds, booster, stopping in jobs
+            ]
+            return [future.result() for future in futures]
+    elif backend == 'process':
+        from joblib import Parallel, delayed
+        data = (X_train, y_train, X_val, y_val, feature_names)
+        
+        def run_rung(jobs):
+            return Parallel(n_jobs=n_jobs)(
+                delayed(_run_trial_in_worker)(token, data, params, y_val, rounds, booster, stopping)
+                for params, rounds, booster, stopping in jobs
+            )
+    else:
+        raise ValueError(f"Unknown tuning backend: {backend}")
+    
+    # Rung budgets, e.g. 50, 100, 200, 400, 800, 1000 rounds for eta=2
+    budgets = [max_rounds]
+    if halving:
+        budgets = []
+        rounds = min_rounds
+        while rounds < max_rounds:
+            budgets.append(rounds)
+            rounds *= eta
+        budgets.append(max_rounds)
+    
+    results = []
+    alive = {i: None for i in range(len(configs))}  # config index -> booster so far
+    scores = {}
+    try:
+        for rung, rounds in enumerate(budgets):
+            last = rung == len(budgets) - 1
+            ids = list(alive)
+            jobs = [
+                (dict(configs[i], nthread=nthread), rounds, alive[i], 50 if last else None)
+                for i in ids
+            ]
+            for i, (booster, score, best_rounds, elapsed) in zip(ids, run_rung(jobs)):
+                alive[i] = booster
+                scores[i] = (score, best_rounds)
+                results.append({
+                    'trial': i, 'rung': rung, 'rounds': best_rounds,
+                    'val_mse': score, 'seconds': elapsed, **configs[i]
+                })
+            if not last:
+                keep = max(1, math.ceil(len(ids) / eta))
+                survivors = sorted(ids, key=lambda i: scores[i][0])[:keep]
+                alive = {i: alive[i] for i in survivors}
+    finally:
+        if backend == 'thread':
+            executor.shutdown()
+        _WORKER_DMATRICES.pop(token, None)
+    
+    best_index = min(alive, key=lambda i: scores[i][0])
+    best_score, best_rounds = scores[best_index]
+    # Drop the rounds trained past the early-stopping optimum
+    model = alive[best_index][:best_rounds]
+    best_params = dict(configs[best_index])
+    best_params['n_estimators'] = best_rounds
+    
+    print(f"\n{'Trial':<6} {'Rung':<5} {'Rounds':<7} {'Val MSE':<16} {'Seconds':<8} Params")
+    print(f"{'-'*80}")
+    for row in results:
+        params = {k: row[k] for k in param_grid}
+        print(f"{row['trial']:<6} {row['rung']:<5} {row['rounds']:<7} {row['val_mse']:<16.2f} "
+              f"{row['seconds']:<8.2f} {params}")
+    if results_path:
+        os.makedirs(os.path.dirname(os.path.abspath(results_path)), exist_ok=True)
+        pd.DataFrame(results).to_csv(results_path, index=False)
+        print(f"Tuning results saved to {results_path}")
     
     print(f"\nBest parameters: {best_params}")
     print(f"Best validation MSE: {best_score:.4f}")
     return model, best_params
 
 # Function to train XGBoost model
-def train_xgboost_model(X_train, y_train, X_val, y_val, params=None):
+def train_xgboost_model(X_train, y_train, X_val, y_val, params=None, dmatrices=None):
     """Train XGBoost model with given parameters"""
     print("\nTraining XGBoost model...")
     
@@ -140,9 +344,12 @@ def train_xgboost_model(X_train, y_train, X_val, y_val, params=None):
             'objective': 'reg:squarederror'
         }
     
-    # Convert data to DMatrix
-    dtrain = xgb.DMatrix(X_train, label=y_train)
-    dval = xgb.DMatrix(X_val, label=y_val)
+    # Convert data to DMatrix unless the caller already built them
+    if dmatrices is not None:
+        dtrain, dval = dmatrices['train'], dmatrices['val']
+    else:
+        dtrain = xgb.DMatrix(X_train, label=y_train)
+        dval = xgb.DMatrix(X_val, label=y_val)
     
     model = xgb.train(
         params,
@@ -156,14 +363,17 @@ def train_xgboost_model(X_train, y_train, X_val, y_val, params=None):
     return model
 
 # Function to evaluate model
-def evaluate_model(model, X_train, X_val, X_test, y_train, y_val, y_test):
+def evaluate_model(model, X_train, X_val, X_test, y_train, y_val, y_test, dmatrices=None):
     """Evaluate model performance"""
     print("\nEvaluating model performance...")
     
-    # Convert data to DMatrix
-    dtrain = xgb.DMatrix(X_train)
-    dval = xgb.DMatrix(X_val)
-    dtest = xgb.DMatrix(X_test)
+    # Convert data to DMatrix unless the caller already built them
+    if dmatrices is not None:
+        dtrain, dval, dtest = dmatrices['train'], dmatrices['val'], dmatrices['test']
+    else:
+        dtrain = xgb.DMatrix(X_train)
+        dval = xgb.DMatrix(X_val)
+        dtest = xgb.DMatrix(X_test)
     
     # Make predictions
     y_train_pred = model.predict(dtrain)
@@ -205,6 +415,10 @@ def evaluate_model(model, X_train, X_val, X_test, y_train, y_val, y_test):
 # Function to visualize feature importance
 def plot_feature_importance(model, X, output_dir='plots'):
     """Visualize feature importance"""
+    # Plotting libraries are imported only when a plot is drawn; they dominate start-up time
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     print("\nPlotting feature importance...")
     
     # Get feature importance scores
@@ -237,6 +451,8 @@ def plot_feature_importance(model, X, output_dir='plots'):
 # Function to visualize predictions
 def plot_predictions(y_true, y_pred, title, filename):
     """Create prediction vs actual plot"""
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(10, 6))
     plt.scatter(y_true, y_pred, alpha=0.5)
     plt.plot([y_true.min(), y_true.max()], [y_true.min(), y_true.max()], 'r--')
@@ -252,7 +468,7 @@ def plot_predictions(y_true, y_pred, title, filename):
 
 # Function to save model
 def save_model(model, metrics, params, X, output_dir='models', filename=None):
-    """Save model and metadata"""
+    """Save model in native format with a metadata sidecar"""
     print("\nSaving model...")
     os.makedirs(output_dir, exist_ok=True)
     
@@ -260,50 +476,63 @@ def save_model(model, metrics, params, X, output_dir='models', filename=None):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"xgboost_model_{timestamp}"
     
-    model_path = os.path.join(output_dir, f"{filename}.pkl")
-    with open(model_path, 'wb') as f:
-        pickle.dump({
-            'model': model,
-            'metrics': metrics,
-            'parameters': params,
-            'feature_names': list(X.columns)
-        }, f)
+    model_path = os.path.join(output_dir, f"{filename}.ubj")
+    meta_path = export_native_model(model, model_path, list(X.columns), metrics, params)
     
-    print(f"Model saved to {model_path}")
+    print(f"Model saved to {model_path} (metadata: {meta_path})")
     return model_path
 
 # Main workflow function
-def main(file_path, target_column, drop_columns=None, tune_params=False, output_dir='output'):
+def main(file_path, target_column, drop_columns=None, tune_params=False, output_dir='output',
+         tune_jobs=None, tune_backend='thread', tune_halving=True, cache_dir=None, plots=True):
     """Run entire training workflow"""
     os.makedirs(output_dir, exist_ok=True)
     print("=" * 80)
     print("XGBoost Training Workflow")
     print("=" * 80)
     
-    df = load_data(file_path)
-    X, y = preprocess_data(df, target_column, drop_columns)
-    X_train, X_val, X_test, y_train, y_val, y_test = split_data(X, y)
-    
-    if tune_params:
-        model, best_params = tune_hyperparameters(X_train, y_train, X_val, y_val)
-    else:
-        best_params = {
-            'max_depth': 6,
-            'learning_rate': 0.1,
-            'subsample': 0.8,
-            'colsample_bytree': 0.8,
-            'objective': 'reg:squarederror'
-        }
-        model = train_xgboost_model(X_train, y_train, X_val, y_val, best_params)
-    
-    metrics = evaluate_model(model, X_train, X_val, X_test, y_train, y_val, y_test)
-    feature_importance = plot_feature_importance(model, X, os.path.join(output_dir, 'plots'))
-    plot_predictions(y_test, model.predict(xgb.DMatrix(X_test)), 
-                    'Test Set Predictions', 
-                    os.path.join(output_dir, 'plots', 'predictions.png'))
-    
-    model_path = save_model(model, metrics, best_params, X, 
-                          os.path.join(output_dir, 'models'))
+    STAGE_TIMES.clear()
+    X, y = load_preprocessed(file_path, target_column, drop_columns, cache_dir)
+    with stage('split'):
+        X_train, X_val, X_test, y_train, y_val, y_test = split_data(X, y)
+    with stage('dmatrix'):
+        dmatrices = build_dmatrices(X_train, X_val, X_test, y_train, y_val, y_test)
+    
+    with stage('train'):
+        if tune_params:
+            model, best_params = tune_hyperparameters(
+                X_train, y_train, X_val, y_val,
+                n_jobs=tune_jobs, backend=tune_backend, halving=tune_halving,
+                results_path=os.path.join(output_dir, 'tuning_results.csv')
+            )
+        else:
+            best_params = {
+                'max_depth': 6,
+                'learning_rate': 0.1,
+                'subsample': 0.8,
+                'colsample_bytree': 0.8,
+                'objective': 'reg:squarederror'
+            }
+            model = train_xgboost_model(X_train, y_train, X_val, y_val, best_params, dmatrices)
+    
+    with stage('evaluate'):
+        metrics = evaluate_model(model, X_train, X_val, X_test, y_train, y_val, y_test, dmatrices)
+    feature_importance = None
+    if plots:
+        with stage('plots'):
+            feature_importance = plot_feature_importance(model, X, os.path.join(output_dir, 'plots'))
+            plot_predictions(y_test, model.predict(dmatrices['test']), 
+                            'Test Set Predictions', 
+                            os.path.join(output_dir, 'plots', 'predictions.png'))
+    
+    with stage('save'):
+        model_path = save_model(model, metrics, best_params, X, 
+                              os.path.join(output_dir, 'models'))
+    
+    print("\nStage timings:")
+    for name, seconds in STAGE_TIMES.items():
+        print(f"{name:<12} {seconds:>8.2f}s")
+    print(f"{'total':<12} {sum(STAGE_TIMES.values()):>8.2f}s")
     
     print("\nTraining completed successfully!")
     print(f"Model saved to: {model_path}")
@@ -313,11 +542,17 @@ if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description='Train XGBoost model')
     parser.add_argument('--data_dir', default='data', help='Data directory')
-    parser.add_argument('--file_name', required=True, help='CSV filename')
+    parser.add_argument('--file_name', required=True, help='CSV, .parquet or npy directory name')
     parser.add_argument('--target', required=True, help='Target column')
     parser.add_argument('--drop', nargs='+', default=None, help='Columns to drop')
     parser.add_argument('--tune', action='store_true', help='Enable tuning')
     parser.add_argument('--output_dir', default='output', help='Output directory')
+    parser.add_argument('--tune_jobs', type=int, default=None, help='Concurrent tuning trials')
+    parser.add_argument('--tune_backend', choices=['thread', 'process'], default='thread', help='Tuning executor')
+    parser.add_argument('--no_halving', action='store_true', help='Give every tuning trial the full budget')
+    parser.add_argument('--cache_dir', default=None, help='Preprocessed data cache (default: <output_dir>/cache)')
+    parser.add_argument('--no_cache', action='store_true', help='Always re-read and re-encode the CSV')
+    parser.add_argument('--no_plots', action='store_true', help='Skip the plots (and importing matplotlib)')
     
     args = parser.parse_args()
     file_path = os.path.join(args.data_dir, args.file_name)
@@ -326,4 +561,6 @@ if __name__ == "__main__":
         print(f"Error: {file_path} not found!")
         exit(1)
     
-    main(file_path, args.target, args.drop, args.tune, args.output_dir)
\ No newline at end of file
+    cache_dir = None if args.no_cache else (args.cache_dir or os.path.join(args.output_dir, 'cache'))
+    main(file_path, args.target, args.drop, args.tune, args.output_dir,
+         args.tune_jobs, args.tune_backend, not args.no_halving, cache_dir, not args.no_plots)
\ No newline at end of file
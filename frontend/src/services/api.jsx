@@ -2,14 +2,8 @@ import axios from 'axios';
 
 const API_BASE = import.meta.env.VITE_API_BASE_URL || 'https://flightfarepredictor-5osz.onrender.com';
 
-const TIME_MAPPING = {
-  'Early_Morning': 0,
-  'Morning': 8,
-  'Afternoon': 12,
-  'Evening': 14,
-  'Night': 18,
-  'Late_Night': 22
-};
+// Time slots the model knows, sent by name
+const TIME_SLOTS = ['Early_Morning', 'Morning', 'Afternoon', 'Evening', 'Night', 'Late_Night'];
 
 const CITY_MAPPING = {
   "CHHATRAPATI S MAHARAJ": "Mumbai",
@@ -20,69 +14,44 @@ const CITY_MAPPING = {
   "CHENNAI INTERNATIONAL": "Chennai"
 };
 
-const AIRLINES = ["AirAsia", "Air_India", "GO_FIRST", "Indigo", "SpiceJet", "Vistara"];
-const CITIES = ['Bangalore', 'Chennai', 'Delhi', 'Hyderabad', 'Kolkata', 'Mumbai'];
-const CLASSES = ['Business', 'Economy'];
-const STOPS = ['one', 'two_or_more', 'zero'];
-
 const STOPS_MAPPING = {
   "0": "zero",
   "1": "one",
   "2+": "two_or_more"
 };
 
-// ✅ Updated function to correctly calculate days_left and send departure_date
+// Local YYYY-MM-DD (toISOString would shift the date to UTC)
+const formatDate = (date) => {
+  const pad = (n) => String(n).padStart(2, '0');
+  return `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(date.getDate())}`;
+};
+
+// Compact (v2) request: plain category values, encoded by the server.
+// The server also works out days_left from departure_date.
 const buildPayload = (formData) => {
   const departureDate = new Date(formData.departureDate);
   if (isNaN(departureDate)) {
     throw new Error("Invalid departure date");
   }
 
-  // Corrected: Ensure days_left is at least 0 (not 1)
-  const today = new Date();
-  const daysLeft = Math.max(Math.ceil((departureDate - today) / (1000 * 60 * 60 * 24)), 0);
-
-  const payload = {
-    departure_date: departureDate.toISOString().split('T')[0], // ✅ Sending correct format
-    days_left: daysLeft,
+  return {
+    departure_date: formatDate(departureDate),
     duration: parseFloat(formData.duration) || 0,
-    departure_time: TIME_MAPPING[formData.departureTime],
-    arrival_time: TIME_MAPPING[formData.arrivalTime],
+    departure_time: formData.departureTime,
+    arrival_time: formData.arrivalTime,
+    airline: formData.airline,
+    source_city: CITY_MAPPING[formData.source_city] || formData.source_city,
+    destination_city: CITY_MAPPING[formData.destination_city] || formData.destination_city,
+    class: formData.travelClass,
+    stops: STOPS_MAPPING[formData.stops],
   };
-
-  // Airline encoding
-  AIRLINES.forEach(airline => {
-    payload[`airline_${airline}`] = formData.airline === airline ? 1 : 0;
-  });
-
-  // City encoding
-  const sourceCity = CITY_MAPPING[formData.source_city] || formData.source_city;
-  const destCity = CITY_MAPPING[formData.destination_city] || formData.destination_city;
-  
-  CITIES.forEach(city => {
-    payload[`source_city_${city}`] = sourceCity === city ? 1 : 0;
-    payload[`destination_city_${city}`] = destCity === city ? 1 : 0;
-  });
-
-  // Class encoding
-  CLASSES.forEach(cls => {
-    payload[`class_${cls.replace(' ', '_')}`] = formData.travelClass === cls ? 1 : 0;
-  });
-
-  // Stops encoding
-  const stopKey = STOPS_MAPPING[formData.stops];
-  STOPS.forEach(stop => {
-    payload[`stops_${stop}`] = stopKey === stop ? 1 : 0;
-  });
-
-  return payload;
 };
 
 export const predictFlightFare = async (formData) => {
   try {
     console.log("Received formData:", formData);
     
-    if (!formData.departureTime || TIME_MAPPING[formData.departureTime] === undefined) {
+    if (!TIME_SLOTS.includes(formData.departureTime)) {
       throw new Error("Missing required field: departure_time");
     }
 
@@ -102,7 +71,7 @@ export const predictFlightTrend = async (formData) => {
   try {
     console.log("Received formData for trend prediction:", formData);
     
-    if (!formData.departureTime || TIME_MAPPING[formData.departureTime] === undefined) {
+    if (!TIME_SLOTS.includes(formData.departureTime)) {
       throw new Error("Missing required field: departure_time");
     }
 